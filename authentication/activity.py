@@ -0,0 +1,135 @@
+"""
+Write-behind tracking of UserSession activity.
+
+Instead of writing `last_activity` on every authenticated request, the
+tracking middleware records a touch in process memory. Pending touches are
+coalesced per session (only the latest one is kept) and written in a single
+bulk UPDATE once USER_SESSION_ACTIVITY_FLUSH_SIZE sessions are pending, at the
+latest USER_SESSION_ACTIVITY_FLUSH_INTERVAL seconds after the first pending
+touch, and when the process exits. The interval is enforced by a timer thread
+armed by the first pending touch, so an idle worker does not hold on to its
+touches until the next request.
+
+A cache marker records that a session went through the full tracking pass
+(UserSession creation, geographic info, suspicious activity checks). While
+the marker is set (USER_SESSION_ACTIVITY_INTERVAL seconds), requests for that
+session make no database queries besides the periodic flush.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Case, DateTimeField, TextField, Value, When
+from django.utils import timezone
+
+from .models import UserSession
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def marker_key(session_key):
+    return f"user_session_activity:{session_key}"
+
+
+class ActivityTracker:
+    """Coalesces last-activity touches and flushes them in bulk."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def is_fresh(self, session_key):
+        """Return True if the session was fully tracked less than the interval ago."""
+        return cache.get(marker_key(session_key)) is not None
+
+    def mark_fresh(self, session_key):
+        cache.set(
+            marker_key(session_key), True, _setting("USER_SESSION_ACTIVITY_INTERVAL", 60)
+        )
+
+    def forget(self, session_key):
+        """Drop the marker and any pending touch, e.g. when a session ends."""
+        cache.delete(marker_key(session_key))
+        with self._lock:
+            self._pending.pop(session_key, None)
+
+    def touch(self, session_key, user_agent="", when=None):
+        """Record activity for a session; flushes when a threshold is reached."""
+        interval = _setting("USER_SESSION_ACTIVITY_FLUSH_INTERVAL", 30)
+        with self._lock:
+            self._pending[session_key] = (when or timezone.now(), user_agent)
+            due = len(self._pending) >= _setting(
+                "USER_SESSION_ACTIVITY_FLUSH_SIZE", 100
+            ) or time.monotonic() - self._last_flush >= interval
+            if not due and self._timer is None:
+                self._timer = threading.Timer(interval, self._flush_later)
+                self._timer.daemon = True
+                self._timer.start()
+        if due:
+            self.flush()
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _flush_later(self):
+        """Timer callback: flush from the timer thread, then release its connections."""
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+    def flush(self):
+        """Write all pending touches in one UPDATE; return the number of rows updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            timer, self._timer = self._timer, None
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+        if not pending:
+            return 0
+
+        try:
+            return UserSession.objects.filter(session_key__in=list(pending)).update(
+                last_activity=Case(
+                    *[When(session_key=key, then=Value(when)) for key, (when, _) in pending.items()],
+                    output_field=DateTimeField(),
+                ),
+                user_agent=Case(
+                    *[
+                        When(session_key=key, then=Value(user_agent))
+                        for key, (_, user_agent) in pending.items()
+                    ],
+                    output_field=TextField(),
+                ),
+            )
+        except Exception as e:
+            logger.error(f"Error flushing session activity: {e}")
+            # Keep the touches for the next flush unless newer ones arrived meanwhile
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending.setdefault(key, value)
+            return 0
+
+
+tracker = ActivityTracker()
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        tracker.flush()
+    except Exception:
+        pass
@@ -158,11 +158,11 @@ class UserSessionAdmin(admin.ModelAdmin):
         "created_at",
     )
     search_fields = ("user__email", "ip_address", "user_agent")
-    readonly_fields = ("created_at", "last_activity", "session")
+    readonly_fields = ("created_at", "last_activity", "session_key")
     date_hierarchy = "created_at"
 
     fieldsets = (
-        (_("User Information"), {"fields": ("user", "session")}),
+        (_("User Information"), {"fields": ("user", "session_key")}),
         (
             _("Session Details"),
             {"fields": ("ip_address", "user_agent", "login_method")},
@@ -0,0 +1,178 @@
+"""
+Geolocation of session IP addresses.
+
+A single GeoIP2 reader is shared by the whole process (the database is
+memory-mapped once) and lookups are memoized in an LRU cache with a TTL.
+One `city()` lookup per IP gives both the country and the city. A reader
+that cannot be opened (e.g. GeoIP2 installed without a database) is treated
+as unavailable until reset(), instead of being retried on every lookup.
+
+For tests and offline development, USER_SESSION_GEOIP_STUB replaces the
+GeoIP2 database with a stub: a mapping of IP addresses or networks to
+{"country_name": ..., "city": ...} records, or the path to a JSON file
+containing that mapping.
+"""
+
+import ipaddress
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+# Try to import GeoIP2, but handle if it's not available
+try:
+    from django.contrib.gis.geoip2 import GeoIP2
+
+    GEOIP2_AVAILABLE = True
+except (ImportError, ModuleNotFoundError):
+    GEOIP2_AVAILABLE = False
+    GeoIP2 = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_SIZE = 10000
+CACHE_TTL = 24 * 60 * 60
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class StubGeoReader:
+    """Offline stand-in for GeoIP2 backed by a mapping of networks to records."""
+
+    def __init__(self, records):
+        if isinstance(records, str):
+            with open(records) as f:
+                records = json.load(f)
+        self.networks = [
+            (ipaddress.ip_network(network, strict=False), record)
+            for network, record in records.items()
+        ]
+
+    def city(self, ip):
+        address = ipaddress.ip_address(ip)
+        for network, record in self.networks:
+            if address.version == network.version and address in network:
+                return {
+                    "country_name": record.get("country_name", ""),
+                    "city": record.get("city", ""),
+                }
+        raise LookupError(f"{ip} not found in the stub database")
+
+
+class LocationCache:
+    """Thread-safe LRU cache of IP -> (country, city) with a TTL."""
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, ip):
+        with self._lock:
+            entry = self._entries.get(ip)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[ip]
+                return None
+            self._entries.move_to_end(ip)
+            return value
+
+    def set(self, ip, value):
+        with self._lock:
+            self._entries[ip] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(ip)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_reader = None
+_reader_error = None
+_reader_lock = threading.Lock()
+locations = LocationCache(
+    _setting("USER_SESSION_GEOIP_CACHE_SIZE", CACHE_SIZE),
+    _setting("USER_SESSION_GEOIP_CACHE_TTL", CACHE_TTL),
+)
+
+
+def get_reader():
+    """
+    Return the process-wide reader, or None when geolocation is unavailable.
+    A failure to open the reader is remembered and not retried.
+    """
+    global _reader, _reader_error
+    if _reader is None and _reader_error is None:
+        with _reader_lock:
+            if _reader is None and _reader_error is None:
+                stub = _setting("USER_SESSION_GEOIP_STUB", None)
+                try:
+                    if stub:
+                        _reader = StubGeoReader(stub)
+                    elif GEOIP2_AVAILABLE:
+                        _reader = GeoIP2(cache=GeoIP2.MODE_MMAP)
+                except Exception as e:
+                    _reader_error = e
+                    logger.warning(f"GeoIP2 reader unavailable: {e}")
+    return _reader
+
+
+def reset():
+    """Drop the shared reader, its failure and cached locations (settings changes, tests)."""
+    global _reader, _reader_error
+    with _reader_lock:
+        _reader = None
+        _reader_error = None
+    locations.clear()
+
+
+def is_public(ip):
+    try:
+        return ipaddress.ip_address(ip).is_global
+    except ValueError:
+        return False
+
+
+def lookup(ip):
+    """
+    Return (country, city) for an IP address, or None when it cannot be
+    geolocated. Results, including failures, are cached per IP.
+    """
+    if not ip or not is_public(ip):
+        return None
+
+    cached = locations.get(ip)
+    if cached is not None:
+        return cached or None
+
+    reader = get_reader()
+    if reader is None:
+        logger.debug("GeoIP2 not available, skipping geographic info")
+        return None
+
+    try:
+        record = reader.city(ip)
+        location = (
+            (record.get("country_name") or "")[:100],
+            (record.get("city") or "")[:100],
+        )
+    except Exception as e:
+        # GeoIP2 might not be configured or IP might be invalid
+        logger.debug(f"Could not get geographic info for IP {ip}: {e}")
+        location = ()
+
+    locations.set(ip, location)
+    return location or None
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+
+from authentication import geo
+from authentication.models import UserSession
+
+
+class Command(BaseCommand):
+    help = "Geolocate historical user sessions that have no country"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of sessions updated per query (default: 500)",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Show how many sessions would be updated without saving",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(options["batch_size"], 1)
+        dry_run = options["dry_run"]
+
+        if geo.get_reader() is None:
+            self.stdout.write(self.style.ERROR("GeoIP2 is not available"))
+            return
+
+        pending = UserSession.objects.filter(country="").only("ip_address")
+        self.stdout.write(f"Geolocating {pending.count()} sessions...")
+
+        # Rows stay in the queryset when an IP cannot be located: walk by primary key
+        last_pk = 0
+        updated = skipped = 0
+        while True:
+            batch = list(pending.filter(pk__gt=last_pk).order_by("pk")[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            located = []
+            for user_session in batch:
+                # Lookups are cached: each distinct IP hits the database once
+                location = geo.lookup(user_session.ip_address)
+                if location is None or not location[0]:
+                    skipped += 1
+                    continue
+                user_session.country, user_session.city = location
+                located.append(user_session)
+
+            if located and not dry_run:
+                UserSession.objects.bulk_update(located, ["country", "city"])
+            updated += len(located)
+
+        verb = "Would update" if dry_run else "Updated"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {updated} sessions ({skipped} could not be geolocated)"
+            )
+        )
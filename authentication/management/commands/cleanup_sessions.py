@@ -51,7 +51,7 @@ class Command(BaseCommand):
 
         # Mark UserSessions as inactive for expired Django sessions
         user_sessions_to_deactivate = UserSession.objects.filter(
-            session__in=expired_sessions, is_active=True
+            session_key__in=expired_sessions.values("session_key"), is_active=True
         )
         deactivated_count = user_sessions_to_deactivate.update(is_active=False)
 
@@ -0,0 +1,61 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from tasks.queue import default_worker_id
+
+from authentication.sweeper import BATCH_SIZE, TIME_BUDGET, run_sweep
+
+
+class Command(BaseCommand):
+    help = "Mark expired user sessions as inactive in bounded batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=BATCH_SIZE,
+            help=f"Sessions updated per query (default: {BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=float,
+            default=TIME_BUDGET,
+            help=f"Maximum duration of a sweep in seconds (default: {TIME_BUDGET})",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep sweeping every --interval seconds",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=300,
+            help="Seconds between sweeps with --loop (default: 300)",
+        )
+
+    def handle(self, *args, **options):
+        worker_id = default_worker_id()
+        self.stopping = False
+        if options["loop"]:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        while not self.stopping:
+            if run_sweep(worker_id, max(options["batch_size"], 1), options["time_budget"]):
+                self.stdout.write(self.style.SUCCESS("Expired sessions swept"))
+            else:
+                self.stdout.write(
+                    self.style.WARNING("Sweep skipped: another process is already sweeping")
+                )
+
+            if not options["loop"]:
+                break
+            deadline = time.monotonic() + options["interval"]
+            while not self.stopping and time.monotonic() < deadline:
+                time.sleep(1)
+
+    def stop(self, signum, frame):
+        """Finish the current sweep before stopping"""
+        self.stopping = True
@@ -54,7 +54,9 @@ class Command(BaseCommand):
                 continue
 
             # Vérifier si UserSession existe déjà
-            existing_user_session = UserSession.objects.filter(session=session).first()
+            existing_user_session = UserSession.objects.filter(
+                session_key=session.session_key
+            ).first()
 
             if existing_user_session and not force:
                 skipped_count += 1
@@ -95,7 +97,9 @@ class Command(BaseCommand):
                 self.stdout.write(f"🔄 Mise à jour: Session pour {user.email}")
             else:
                 # Créer
-                user_session = UserSession.objects.create(session=session, **defaults)
+                user_session = UserSession.objects.create(
+                    session_key=session.session_key, **defaults
+                )
                 created_count += 1
                 self.stdout.write(f"✅ Création: Nouvelle session pour {user.email}")
 
@@ -113,7 +117,10 @@ class Command(BaseCommand):
         # Nettoyer les sessions expirées
         if not dry_run:
             expired_user_sessions = UserSession.objects.filter(
-                session__expire_date__lt=timezone.now(), is_active=True
+                session_key__in=Session.objects.filter(
+                    expire_date__lt=timezone.now()
+                ).values("session_key"),
+                is_active=True,
             )
             expired_count = expired_user_sessions.count()
             expired_user_sessions.update(is_active=False)
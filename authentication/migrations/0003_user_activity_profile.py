@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0002_alter_userprofile_gender'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserActivityProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('known_countries', models.JSONField(blank=True, default=list, verbose_name='Known Countries')),
+                ('recent_ips', models.JSONField(blank=True, default=list, help_text='[ip, ISO timestamp] pairs within the sliding window.', verbose_name='Recent IP Addresses')),
+                ('user_agent_families', models.JSONField(blank=True, default=list, help_text='Browser/OS fingerprints seen for this user.', verbose_name='User Agent Families')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='activity_profile', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'User Activity Profile',
+                'verbose_name_plural': 'User Activity Profiles',
+                'db_table': 'auth_user_activity_profile',
+            },
+        ),
+    ]
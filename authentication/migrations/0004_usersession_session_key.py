@@ -0,0 +1,64 @@
+from django.db import migrations, models
+
+
+def copy_session_keys(apps, schema_editor):
+    UserSession = apps.get_model("authentication", "UserSession")
+    UserSession.objects.update(session_key=models.F("session_id"))
+
+
+def restore_sessions(apps, schema_editor):
+    UserSession = apps.get_model("authentication", "UserSession")
+    Session = apps.get_model("sessions", "Session")
+    # Rows whose session no longer exists in the database cannot be linked back
+    UserSession.objects.exclude(
+        session_key__in=Session.objects.values("session_key")
+    ).delete()
+    UserSession.objects.update(session_id=models.F("session_key"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("authentication", "0003_user_activity_profile"),
+        ("sessions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="usersession",
+            name="session_key",
+            field=models.CharField(
+                default="",
+                help_text="Key of the Django session, whatever the session engine.",
+                max_length=40,
+                verbose_name="Session Key",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name="usersession",
+            name="session",
+            field=models.OneToOneField(
+                null=True,
+                on_delete=models.deletion.CASCADE,
+                related_name="user_session_info",
+                to="sessions.session",
+                verbose_name="Django Session",
+            ),
+        ),
+        migrations.RunPython(copy_session_keys, restore_sessions),
+        migrations.RemoveField(
+            model_name="usersession",
+            name="session",
+        ),
+        migrations.AlterField(
+            model_name="usersession",
+            name="session_key",
+            field=models.CharField(
+                help_text="Key of the Django session, whatever the session engine.",
+                max_length=40,
+                unique=True,
+                verbose_name="Session Key",
+            ),
+        ),
+    ]
@@ -1,5 +1,7 @@
+from importlib import import_module
+
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser, BaseUserManager
-from django.contrib.sessions.models import Session
 from django.db import models
 from django.utils import timezone
 from django.core.validators import RegexValidator
@@ -190,11 +192,11 @@ class UserSession(models.Model):
         related_name="user_sessions",
         verbose_name="User",
     )
-    session = models.OneToOneField(
-        Session,
-        on_delete=models.CASCADE,
-        related_name="user_session_info",
-        verbose_name="Django Session",
+    session_key = models.CharField(
+        max_length=40,
+        unique=True,
+        verbose_name="Session Key",
+        help_text="Key of the Django session, whatever the session engine.",
     )
 
     # Session Information
@@ -245,16 +247,60 @@ class UserSession(models.Model):
         """Calculate session duration."""
         return self.last_activity - self.created_at
 
+    def get_session_store(self):
+        """Return the session store of the configured SESSION_ENGINE for this key."""
+        engine = import_module(settings.SESSION_ENGINE)
+        return engine.SessionStore(session_key=self.session_key)
+
     def is_expired(self):
-        """Check if session is expired based on Django session expiry."""
-        return self.session.expire_date < timezone.now()
+        """Check if the session is expired or was evicted from the session store."""
+        # load() returns an empty dict for missing or expired sessions, whatever the engine
+        return not self.get_session_store().load()
 
     def terminate_session(self):
         """Terminate the session and mark as inactive."""
         self.is_active = False
         self.save()
         # Delete the Django session
-        self.session.delete()
+        self.get_session_store().delete(self.session_key)
+
+
+class UserActivityProfile(models.Model):
+    """
+    Rolling summary of a user's recent sessions used for suspicious activity
+    detection, updated incrementally so checks do not re-read session history.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="activity_profile",
+        verbose_name="User",
+    )
+    known_countries = models.JSONField(
+        default=list, blank=True, verbose_name="Known Countries"
+    )
+    recent_ips = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name="Recent IP Addresses",
+        help_text="[ip, ISO timestamp] pairs within the sliding window.",
+    )
+    user_agent_families = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name="User Agent Families",
+        help_text="Browser/OS fingerprints seen for this user.",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "User Activity Profile"
+        verbose_name_plural = "User Activity Profiles"
+        db_table = "auth_user_activity_profile"
+
+    def __str__(self):
+        return f"{self.user.email}'s Activity Profile"
 
 
 # Signal handlers to automatically create/update profiles
@@ -0,0 +1,212 @@
+"""
+Suspicious activity detection based on per-user rolling profiles.
+
+Each user has a UserActivityProfile summarizing recent activity: known
+countries, a sliding window of recent IP addresses and user agent families
+(browser/OS fingerprints). A session is evaluated against the profile and
+then recorded into it, so detection cost does not depend on the number of
+sessions a user has.
+
+Detection runs in the task queue (see tasks/queue.py). It is scheduled on
+login, when the tracking middleware sees a new session, or when a session's
+IP address or user agent family changes.
+"""
+
+import logging
+import re
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from tasks.queue import enqueue
+
+from .models import UserActivityProfile, UserSession
+
+logger = logging.getLogger(__name__)
+
+DETECT_TASK = "authentication.detect_suspicious_activity"
+
+# Sessions used to build a missing profile
+HISTORY_DAYS = 30
+
+# More distinct IPs than this in the window is suspicious
+RECENT_IP_WINDOW = timedelta(hours=1)
+MAX_RECENT_IPS = 3
+
+# Bounds on the stored lists
+MAX_TRACKED_IPS = 20
+MAX_COUNTRIES = 50
+MAX_USER_AGENT_FAMILIES = 20
+
+# Last observation scheduled for detection, per session
+OBSERVED_TIMEOUT = 24 * 60 * 60
+
+BROWSER_PATTERNS = [
+    ("Edge", re.compile(r"Edg(?:e|A|iOS)?/")),
+    ("Opera", re.compile(r"OPR/|Opera")),
+    ("Firefox", re.compile(r"Firefox/|FxiOS/")),
+    ("Chrome", re.compile(r"Chrome/|CriOS/")),
+    ("Safari", re.compile(r"Safari/")),
+]
+OS_PATTERNS = [
+    ("Android", re.compile(r"Android")),
+    ("iOS", re.compile(r"iPhone|iPad|iPod")),
+    ("Windows", re.compile(r"Windows")),
+    ("macOS", re.compile(r"Mac OS X|Macintosh")),
+    ("Linux", re.compile(r"Linux|X11")),
+]
+
+
+def user_agent_family(user_agent):
+    """Return a coarse "Browser/OS" fingerprint of a user agent string."""
+    if not user_agent:
+        return ""
+    browser = next(
+        (name for name, pattern in BROWSER_PATTERNS if pattern.search(user_agent)),
+        user_agent.split("/", 1)[0].strip()[:30] or "Other",
+    )
+    system = next(
+        (name for name, pattern in OS_PATTERNS if pattern.search(user_agent)), "Other"
+    )
+    return f"{browser}/{system}"
+
+
+def _recent_ips(profile, now):
+    cutoff = now - RECENT_IP_WINDOW
+    return [
+        [ip, seen]
+        for ip, seen in profile.recent_ips
+        if (parse_datetime(seen) or cutoff) > cutoff
+    ]
+
+
+def evaluate(profile, ip_address, country, family, now=None):
+    """Return the reasons an observation looks suspicious for this profile."""
+    now = now or timezone.now()
+    reasons = []
+
+    # 1. Login from new country
+    if country and profile.known_countries and country not in profile.known_countries:
+        reasons.append(f"new country {country}")
+
+    # 2. Multiple IPs in short time
+    other_ips = {ip for ip, _ in _recent_ips(profile, now) if ip != ip_address}
+    if len(other_ips) > MAX_RECENT_IPS:
+        reasons.append("multiple IPs in the last hour")
+
+    # 3. Unusual user agent
+    if (
+        family
+        and profile.user_agent_families
+        and family not in profile.user_agent_families
+    ):
+        reasons.append(f"unusual user agent {family}")
+
+    return reasons
+
+
+def record(profile, ip_address, country, family, now=None):
+    """Add an observation to the profile (not saved)."""
+    now = now or timezone.now()
+
+    if country and country not in profile.known_countries:
+        profile.known_countries = (profile.known_countries + [country])[-MAX_COUNTRIES:]
+
+    recent = [entry for entry in _recent_ips(profile, now) if entry[0] != ip_address]
+    if ip_address:
+        recent.append([ip_address, now.isoformat()])
+    profile.recent_ips = recent[-MAX_TRACKED_IPS:]
+
+    if family and family not in profile.user_agent_families:
+        profile.user_agent_families = (profile.user_agent_families + [family])[
+            -MAX_USER_AGENT_FAMILIES:
+        ]
+
+
+def build_profile(profile, exclude=None):
+    """Fill a new profile from its user's recent session history (not saved)."""
+    sessions = (
+        UserSession.objects.filter(
+            user_id=profile.user_id,
+            created_at__gte=timezone.now() - timedelta(days=HISTORY_DAYS),
+        )
+        .exclude(pk=exclude.pk if exclude else None)
+        .only("ip_address", "country", "user_agent", "created_at")
+        .order_by("created_at")
+    )
+    for session in sessions.iterator():
+        record(
+            profile,
+            session.ip_address,
+            session.country,
+            user_agent_family(session.user_agent),
+            now=session.created_at,
+        )
+
+
+def detect_session(user_session_id, ip_address=None, user_agent=None):
+    """
+    Evaluate a session observation against its user's profile, flag the
+    session if suspicious and record the observation. Returns the reasons.
+    """
+    user_session = (
+        UserSession.objects.select_related("user").filter(pk=user_session_id).first()
+    )
+    if user_session is None:
+        return []
+
+    ip_address = ip_address or user_session.ip_address
+    family = user_agent_family(
+        user_session.user_agent if user_agent is None else user_agent
+    )
+    user = user_session.user
+
+    with transaction.atomic():
+        # Concurrent first detections: get_or_create lets one of them insert
+        # the profile, the other ones wait for it and then lock it
+        profile, created = UserActivityProfile.objects.get_or_create(user=user)
+        if created:
+            build_profile(profile, exclude=user_session)
+        else:
+            profile = UserActivityProfile.objects.select_for_update().get(user=user)
+        reasons = evaluate(profile, ip_address, user_session.country, family)
+        record(profile, ip_address, user_session.country, family)
+        profile.save()
+
+        if reasons and not user_session.is_suspicious:
+            UserSession.objects.filter(pk=user_session.pk).update(is_suspicious=True)
+
+    for reason in reasons:
+        logger.warning(f"Suspicious activity for user {user.email}: {reason}")
+    return reasons
+
+
+def observed_key(user_session_id):
+    return f"user_session_observed:{user_session_id}"
+
+
+def schedule_detection(user_session, ip_address, user_agent, force=False):
+    """
+    Queue detection for a session when it is new (force) or when its IP
+    address or user agent family differs from the last one scheduled.
+    """
+    observation = [ip_address, user_agent_family(user_agent)]
+    key = observed_key(user_session.pk)
+    previous = cache.get(key)
+    if previous is None and not force:
+        previous = [user_session.ip_address, user_agent_family(user_session.user_agent)]
+    if not force and previous == observation:
+        return None
+
+    cache.set(key, observation, OBSERVED_TIMEOUT)
+    return enqueue(
+        DETECT_TASK,
+        {
+            "user_session_id": user_session.pk,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+        },
+        idempotency_key=f"{DETECT_TASK}:{user_session.pk}:{ip_address}:{observation[1]}",
+    )
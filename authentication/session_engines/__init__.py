@@ -0,0 +1,51 @@
+"""
+Session engines that keep UserSession tracking in sync with the session store.
+
+UserSession rows reference sessions by key, so any engine works; these
+engines add an end-of-session hook. A session deleted by the application
+(logout, key rotation, termination) or found missing when a request loads
+it (expired, or evicted from the cache) marks its UserSession inactive.
+
+- authentication.session_engines.cached_db: sessions are read from the
+  cache, and the database row is only written when the session data
+  changes or every SESSION_DB_REFRESH_INTERVAL seconds, instead of on every
+  request with SESSION_SAVE_EVERY_REQUEST
+- authentication.session_engines.cache: sessions live in the cache only
+
+Both require a cache shared by all workers (CACHE_BACKEND).
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def session_ended(session_key):
+    """Mark the UserSession of a session that no longer exists as inactive."""
+    from ..activity import tracker
+    from ..models import UserSession
+
+    try:
+        tracker.forget(session_key)
+        UserSession.objects.filter(session_key=session_key, is_active=True).update(
+            is_active=False
+        )
+    except Exception as e:
+        logger.error(f"Error ending user session: {e}")
+
+
+class TrackedSessionMixin:
+    """Calls session_ended() when a session is deleted or cannot be loaded."""
+
+    def load(self):
+        session_key = self.session_key
+        data = super().load()
+        if session_key and not data:
+            session_ended(session_key)
+        return data
+
+    def delete(self, session_key=None):
+        session_key = session_key or self.session_key
+        super().delete(session_key)
+        if session_key:
+            session_ended(session_key)
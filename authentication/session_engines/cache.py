@@ -0,0 +1,7 @@
+from django.contrib.sessions.backends import cache
+
+from . import TrackedSessionMixin
+
+
+class SessionStore(TrackedSessionMixin, cache.SessionStore):
+    """Cache-only sessions with UserSession end-of-session tracking."""
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+
+from . import TrackedSessionMixin
+
+
+class SessionStore(TrackedSessionMixin, cached_db.SessionStore):
+    """
+    Cached, database-backed sessions that skip the database write when only
+    the expiry is refreshed (SESSION_SAVE_EVERY_REQUEST).
+
+    Modified sessions are always written through, so a session evicted from
+    the cache is reloaded from the database with its current data; only its
+    expiry date may lag behind by up to SESSION_DB_REFRESH_INTERVAL.
+    """
+
+    @property
+    def db_marker_key(self):
+        return f"{self.cache_key}:db"
+
+    def save(self, must_create=False):
+        if (
+            must_create
+            or self.session_key is None
+            or self.modified
+            or self._cache.get(self.db_marker_key) is None
+        ):
+            super().save(must_create)
+            self._cache.set(
+                self.db_marker_key,
+                True,
+                getattr(settings, "SESSION_DB_REFRESH_INTERVAL", 5 * 60),
+            )
+            return
+
+        # Unchanged session: only the cached copy and its expiry are refreshed
+        self._cache.set(self.cache_key, self._session, self.get_expiry_age())
@@ -1,9 +1,10 @@
 import logging
 from django.contrib.auth.signals import user_logged_in, user_logged_out
-from django.contrib.sessions.models import Session
 from django.dispatch import receiver
 from django.utils import timezone
+from .activity import tracker
 from .models import UserSession
+from .security import schedule_detection
 from django.db.models.signals import post_save
 from django.contrib.auth import get_user_model
 
@@ -23,9 +24,6 @@ def on_user_logged_in(sender, request, user, **kwargs):
         if not hasattr(request, "session") or not request.session.session_key:
             request.session.save()  # Force session creation
 
-        # Get the Django session object
-        session_obj = Session.objects.get(session_key=request.session.session_key)
-
         # Get client information
         ip_address = get_client_ip(request)
         user_agent = get_user_agent(request)
@@ -33,7 +31,7 @@ def on_user_logged_in(sender, request, user, **kwargs):
 
         # Create or update UserSession
         user_session, created = UserSession.objects.get_or_create(
-            session=session_obj,
+            session_key=request.session.session_key,
             defaults={
                 "user": user,
                 "ip_address": ip_address,
@@ -53,6 +51,9 @@ def on_user_logged_in(sender, request, user, **kwargs):
             user_session.last_activity = timezone.now()
             user_session.save()
 
+        # Update the user's activity profile and check the login off the request path
+        schedule_detection(user_session, ip_address, user_agent, force=True)
+
         # Log successful login
         logger.info(f"User {user.email} logged in from {ip_address}")
 
@@ -61,8 +62,6 @@ def on_user_logged_in(sender, request, user, **kwargs):
         request.session["login_ip"] = ip_address
         request.session["login_time"] = timezone.now().isoformat()
 
-    except Session.DoesNotExist:
-        logger.error(f"Session not found during login for user {user.email}")
     except Exception as e:
         logger.error(f"Error handling user login signal: {e}")
 
@@ -74,6 +73,10 @@ def on_user_logged_out(sender, request, user, **kwargs):
     Marks UserSession as inactive.
     """
     try:
+        # Drop buffered activity so it does not outlive the logout
+        if hasattr(request, "session") and request.session.session_key:
+            tracker.forget(request.session.session_key)
+
         # Get session info from Django session
         user_session_id = request.session.get("user_session_id")
 
@@ -84,15 +87,9 @@ def on_user_logged_out(sender, request, user, **kwargs):
             )
         elif hasattr(request, "session") and request.session.session_key:
             # Fallback: find by session key
-            try:
-                session_obj = Session.objects.get(
-                    session_key=request.session.session_key
-                )
-                UserSession.objects.filter(session=session_obj).update(
-                    is_active=False, last_activity=timezone.now()
-                )
-            except Session.DoesNotExist:
-                pass
+            UserSession.objects.filter(session_key=request.session.session_key).update(
+                is_active=False, last_activity=timezone.now()
+            )
 
         # Log logout
         if user:
@@ -114,7 +111,6 @@ def on_user_created(sender, instance, created, **kwargs):
             # Check if this is a shell/script creation (no active request)
             from django.core.management import get_random_secret_key
             from django.contrib.sessions.backends.db import SessionStore
-            from django.contrib.sessions.models import Session
 
             # Only create session for superusers/staff created via shell
             if instance.is_superuser or instance.is_staff:
@@ -130,12 +126,10 @@ def on_user_created(sender, instance, created, **kwargs):
                 )
                 session.save()
 
-                session_obj = Session.objects.get(session_key=session.session_key)
-
                 # Create UserSession
                 UserSession.objects.create(
                     user=instance,
-                    session=session_obj,
+                    session_key=session.session_key,
                     ip_address="127.0.0.1",  # Local creation
                     user_agent="Shell/Management Command",
                     login_method="shell",
@@ -0,0 +1,94 @@
+"""
+Background sweep of expired user sessions.
+
+UserSession rows of expired sessions are marked inactive by UPDATE
+statements over bounded batches, until nothing is left or the time budget
+is spent. A session is considered expired when its database row expired,
+or, for cache-based session engines, when it has been idle for longer than
+SESSION_COOKIE_AGE.
+
+The sweep runs as the authentication.sweep_sessions task (see
+tasks/queue.py). Its idempotency key allows a single pending sweep, a job
+is only executed by the worker that claimed it, and run_sweep() backs off
+while another sweep is running, so processes do not sweep concurrently.
+A sweep that runs out of time queues a follow-up sweep for the rest. Use
+the sweep_sessions command to run it from cron or as a loop.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db.models import Q
+from django.utils import timezone
+from tasks.queue import enqueue, is_running, run_job_now
+
+from .models import UserSession
+
+logger = logging.getLogger(__name__)
+
+SWEEP_TASK = "authentication.sweep_sessions"
+
+BATCH_SIZE = 1000
+TIME_BUDGET = 5.0
+
+
+def expired_sessions(now=None):
+    """Active UserSession rows whose session has expired."""
+    now = now or timezone.now()
+    idle_since = now - timedelta(seconds=settings.SESSION_COOKIE_AGE)
+    return UserSession.objects.filter(is_active=True).filter(
+        Q(
+            session_key__in=Session.objects.filter(expire_date__lt=now).values(
+                "session_key"
+            )
+        )
+        | Q(last_activity__lt=idle_since)
+    )
+
+
+def sweep_expired_sessions(batch_size=BATCH_SIZE, time_budget=TIME_BUDGET):
+    """
+    Mark expired sessions inactive, one UPDATE per batch of `batch_size`
+    rows; stops after `time_budget` seconds. Returns (updated, complete).
+    """
+    started = time.monotonic()
+    updated = 0
+    while True:
+        now = timezone.now()
+        batch = expired_sessions(now).order_by("pk").values("pk")[:batch_size]
+        count = UserSession.objects.filter(pk__in=batch).update(is_active=False)
+        updated += count
+        if count < batch_size:
+            complete = True
+            break
+        if time.monotonic() - started >= time_budget:
+            complete = False
+            break
+
+    if updated:
+        logger.info(f"Marked {updated} expired user sessions as inactive")
+    return updated, complete
+
+
+def schedule_sweep(batch_size=BATCH_SIZE, time_budget=TIME_BUDGET, run_at=None):
+    """Queue a sweep; returns the pending sweep job if one already exists."""
+    return enqueue(
+        SWEEP_TASK,
+        {"batch_size": batch_size, "time_budget": time_budget},
+        idempotency_key=SWEEP_TASK,
+        run_at=run_at,
+    )
+
+
+def run_sweep(worker_id, batch_size=BATCH_SIZE, time_budget=TIME_BUDGET):
+    """
+    Queue a sweep and run it in this process; returns False when another
+    process already holds the sweep.
+    """
+    if is_running(SWEEP_TASK):
+        return False
+    job = schedule_sweep(batch_size, time_budget)
+    return run_job_now(job.pk, worker_id)
@@ -0,0 +1,22 @@
+"""
+Authentication tasks run by the tasks queue (see tasks/queue.py).
+"""
+
+from tasks.queue import task
+
+from . import security, sweeper
+
+
+@task(security.DETECT_TASK, max_attempts=3)
+def detect_suspicious_activity(user_session_id, ip_address=None, user_agent=None):
+    """Evaluate a session against its user's activity profile."""
+    security.detect_session(user_session_id, ip_address, user_agent)
+
+
+@task(sweeper.SWEEP_TASK, max_attempts=1)
+def sweep_sessions(batch_size=sweeper.BATCH_SIZE, time_budget=sweeper.TIME_BUDGET):
+    """Mark expired user sessions inactive, queueing a follow-up if out of time."""
+    _, complete = sweeper.sweep_expired_sessions(batch_size, time_budget)
+    if not complete:
+        # This job is running, not pending, so a new sweep job is queued
+        sweeper.schedule_sweep(batch_size, time_budget)
@@ -1,10 +1,19 @@
-from django.test import TestCase, RequestFactory
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.contrib.sessions.models import Session
 from django.contrib.sessions.backends.db import SessionStore
 from unittest.mock import patch, MagicMock
-from .models import UserSession
-from .middleware import UserSessionTrackingMiddleware, GEOIP2_AVAILABLE
+from .activity import ActivityTracker
+from .models import UserActivityProfile, UserSession
+from .security import DETECT_TASK, detect_session, user_agent_family
+from . import geo
+from .middleware import UserSessionTrackingMiddleware
 
 User = get_user_model()
 
@@ -79,27 +88,19 @@ class UserSessionTrackingMiddlewareTest(TestCase):
         # Should not raise any exceptions
         self.middleware.process_request(request)
 
-    @patch("authentication.middleware.GeoIP2")
-    def test_add_geographic_info_success(self, mock_geoip):
+    @override_settings(
+        USER_SESSION_GEOIP_STUB={"8.8.8.0/24": {"country_name": "France", "city": "Paris"}}
+    )
+    def test_add_geographic_info_success(self):
         """Test successful geographic info addition."""
-        if not GEOIP2_AVAILABLE:
-            self.skipTest("GeoIP2 not available")
-
-        # Mock GeoIP2 responses
-        mock_geoip.return_value.country.return_value = {"country_name": "France"}
-        mock_geoip.return_value.city.return_value = {"city": "Paris"}
+        geo.reset()
+        self.addCleanup(geo.reset)
 
         # Create a UserSession
         session = SessionStore()
-        session.save()
-        session_obj = Session.objects.create(
-            session_key=session.session_key,
-            session_data=session.encode({}),
-            expire_date=session.get_expiry_date(),
-        )
-
+        session.create()
         user_session = UserSession.objects.create(
-            user=self.user, session=session_obj, ip_address="8.8.8.8"
+            user=self.user, session_key=session.session_key, ip_address="8.8.8.8"
         )
 
         request = self.factory.get("/")
@@ -111,25 +112,16 @@ class UserSessionTrackingMiddlewareTest(TestCase):
         self.assertEqual(user_session.country, "France")
         self.assertEqual(user_session.city, "Paris")
 
-    @patch("authentication.middleware.GeoIP2")
-    def test_add_geographic_info_failure(self, mock_geoip):
-        """Test geographic info addition with GeoIP2 failure."""
-        if not GEOIP2_AVAILABLE:
-            self.skipTest("GeoIP2 not available")
-
-        # Mock GeoIP2 to raise an exception
-        mock_geoip.side_effect = Exception("GeoIP2 not configured")
+    @override_settings(USER_SESSION_GEOIP_STUB={"1.1.1.0/24": {"country_name": "Australia"}})
+    def test_add_geographic_info_failure(self):
+        """Test geographic info addition for an IP missing from the database."""
+        geo.reset()
+        self.addCleanup(geo.reset)
 
         session = SessionStore()
-        session.save()
-        session_obj = Session.objects.create(
-            session_key=session.session_key,
-            session_data=session.encode({}),
-            expire_date=session.get_expiry_date(),
-        )
-
+        session.create()
         user_session = UserSession.objects.create(
-            user=self.user, session=session_obj, ip_address="8.8.8.8"
+            user=self.user, session_key=session.session_key, ip_address="8.8.8.8"
         )
 
         request = self.factory.get("/")
@@ -145,39 +137,25 @@ class UserSessionTrackingMiddlewareTest(TestCase):
         """Test suspicious activity detection for new country."""
         # Create existing session from France
         session1 = SessionStore()
-        session1.save()
-        session_obj1 = Session.objects.create(
-            session_key=session1.session_key,
-            session_data=session1.encode({}),
-            expire_date=session1.get_expiry_date(),
-        )
-
+        session1.create()
         UserSession.objects.create(
             user=self.user,
-            session=session_obj1,
+            session_key=session1.session_key,
             ip_address="192.168.1.1",
             country="France",
         )
 
-        # Create new session from different country with unique session key
+        # Create new session from different country
         session2 = SessionStore()
-        session2.save()
-        session_obj2 = Session.objects.create(
-            session_key=session2.session_key,
-            session_data=session2.encode({}),
-            expire_date=session2.get_expiry_date(),
-        )
-
+        session2.create()
         user_session = UserSession.objects.create(
             user=self.user,
-            session=session_obj2,
+            session_key=session2.session_key,
             ip_address="8.8.8.8",
             country="United States",
         )
 
-        request = self.factory.get("/")
-
-        self.middleware.check_suspicious_activity(user_session, request)
+        detect_session(user_session.pk)
 
         user_session.refresh_from_db()
         self.assertTrue(user_session.is_suspicious)
@@ -191,3 +169,402 @@ class UserSessionTrackingMiddlewareTest(TestCase):
         except Exception:
             # Ignore cleanup errors in tests
             pass
+
+
+@override_settings(
+    USER_SESSION_ACTIVITY_FLUSH_INTERVAL=3600, USER_SESSION_ACTIVITY_FLUSH_SIZE=100
+)
+class ActivityTrackerTest(TestCase):
+    """Test suite for write-behind session activity tracking."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(
+            email="tracked@example.com", password="testpass123"
+        )
+        self.tracker = ActivityTracker()
+        # Cancels the flush timer armed by pending touches
+        self.addCleanup(self.tracker.flush)
+        self.middleware = UserSessionTrackingMiddleware(lambda r: None)
+
+        session = SessionStore()
+        session.create()
+        self.session_key = session.session_key
+        self.user_session = UserSession.objects.create(
+            user=self.user, session_key=self.session_key, ip_address="127.0.0.1"
+        )
+
+    def _request(self):
+        request = self.factory.get("/", HTTP_USER_AGENT="Test Browser")
+        request.user = self.user
+        request.session = SessionStore(session_key=self.session_key)
+        return request
+
+    def test_touches_are_coalesced_into_one_update(self):
+        """Test pending touches are written in a single UPDATE with the latest values."""
+        earlier = timezone.now() - timedelta(minutes=5)
+        latest = timezone.now() - timedelta(minutes=1)
+        self.tracker.touch(self.session_key, "Old Browser", when=earlier)
+        self.tracker.touch(self.session_key, "New Browser", when=latest)
+        self.tracker.touch("unknown-session", "", when=latest)
+        self.assertEqual(self.tracker.pending_count(), 2)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.tracker.flush(), 1)
+        self.assertEqual(len(queries), 1)
+
+        self.user_session.refresh_from_db()
+        self.assertEqual(self.user_session.last_activity, latest)
+        self.assertEqual(self.user_session.user_agent, "New Browser")
+        self.assertEqual(self.tracker.pending_count(), 0)
+
+    @override_settings(USER_SESSION_ACTIVITY_FLUSH_SIZE=2)
+    def test_flush_size_triggers_write(self):
+        """Test reaching the flush size writes pending touches."""
+        self.tracker.touch(self.session_key, "Test Browser")
+        self.assertEqual(self.tracker.pending_count(), 1)
+        self.tracker.touch("other-session", "Test Browser")
+        self.assertEqual(self.tracker.pending_count(), 0)
+
+    def test_idle_worker_flushes_after_the_interval(self):
+        """Test the first pending touch arms a timer that flushes without new requests."""
+        latest = timezone.now() - timedelta(minutes=1)
+        self.tracker.touch(self.session_key, "Test Browser", when=latest)
+        self.tracker.touch(self.session_key, "Test Browser", when=latest)
+
+        timer = self.tracker._timer
+        self.assertEqual(timer.interval, 3600)
+        self.assertTrue(timer.daemon)
+
+        # Run the timer callback now, in the test thread
+        timer.cancel()
+        with patch("authentication.activity.connections.close_all") as close_all:
+            timer.function()
+        close_all.assert_called_once()
+
+        self.user_session.refresh_from_db()
+        self.assertEqual(self.user_session.last_activity, latest)
+        self.assertIsNone(self.tracker._timer)
+
+    def test_recently_tracked_session_costs_no_queries(self):
+        """Test requests within the activity interval make no database queries."""
+        with patch("authentication.middleware.tracker", self.tracker):
+            self.middleware.process_request(self._request())
+
+            request = self._request()
+            with CaptureQueriesContext(connection) as queries:
+                self.middleware.process_request(request)
+                self.middleware.process_response(request, None)
+            self.assertEqual(len(queries), 0)
+            self.assertEqual(self.tracker.pending_count(), 1)
+
+
+class SuspiciousActivityProfileTest(TestCase):
+    """Test suite for profile-based suspicious activity detection."""
+
+    CHROME = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+    )
+    FIREFOX = "Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0"
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(
+            email="profiled@example.com", password="testpass123"
+        )
+        self.middleware = UserSessionTrackingMiddleware(lambda r: None)
+
+    def _session(self, **fields):
+        session = SessionStore()
+        session.create()
+        return UserSession.objects.create(
+            user=self.user, session_key=session.session_key, **fields
+        )
+
+    def test_user_agent_family(self):
+        """Test user agents are reduced to browser/OS fingerprints."""
+        self.assertEqual(user_agent_family(self.CHROME), "Chrome/Windows")
+        self.assertEqual(user_agent_family(self.FIREFOX), "Firefox/Linux")
+        self.assertEqual(user_agent_family(""), "")
+
+    def test_new_country_and_user_agent_are_flagged(self):
+        """Test a session from an unknown country and browser is flagged."""
+        self._session(ip_address="192.168.1.1", country="France", user_agent=self.CHROME)
+        user_session = self._session(
+            ip_address="8.8.8.8", country="United States", user_agent=self.FIREFOX
+        )
+
+        reasons = detect_session(user_session.pk)
+
+        self.assertEqual(len(reasons), 2)
+        user_session.refresh_from_db()
+        self.assertTrue(user_session.is_suspicious)
+
+        profile = UserActivityProfile.objects.get(user=self.user)
+        self.assertEqual(profile.known_countries, ["France", "United States"])
+        self.assertEqual(profile.user_agent_families, ["Chrome/Windows", "Firefox/Linux"])
+
+        # Known afterwards: same observation is no longer suspicious
+        self.assertEqual(detect_session(user_session.pk), [])
+
+    def test_detection_is_queued_only_on_change(self):
+        """Test the middleware queues detection for new sessions and IP changes only."""
+        from tasks.models import Job
+
+        user_session = self._session(ip_address="10.0.0.1", user_agent=self.CHROME)
+        request = self.factory.get("/", HTTP_USER_AGENT=self.CHROME, REMOTE_ADDR="10.0.0.1")
+
+        self.middleware.check_suspicious_activity(user_session, request)
+        self.assertFalse(Job.objects.filter(name=DETECT_TASK).exists())
+
+        request.META["REMOTE_ADDR"] = "10.0.0.2"
+        self.middleware.check_suspicious_activity(user_session, request)
+        self.middleware.check_suspicious_activity(user_session, request)
+        job = Job.objects.get(name=DETECT_TASK)
+        self.assertEqual(job.payload["ip_address"], "10.0.0.2")
+
+
+@override_settings(
+    USER_SESSION_GEOIP_STUB={
+        "8.8.8.0/24": {"country_name": "United States", "city": "Mountain View"},
+        "2a01:cb00::/32": {"country_name": "France", "city": "Paris"},
+    }
+)
+class GeoLookupTest(TestCase):
+    """Test suite for cached GeoIP lookups and the geo backfill command."""
+
+    def setUp(self):
+        """Set up test data."""
+        geo.reset()
+        self.addCleanup(geo.reset)
+
+    def test_lookup_is_cached_per_ip(self):
+        """Test the shared reader is queried once per IP address."""
+        reader = geo.get_reader()
+        self.assertIs(geo.get_reader(), reader)
+
+        with patch.object(reader, "city", wraps=reader.city) as city:
+            self.assertEqual(geo.lookup("8.8.8.8"), ("United States", "Mountain View"))
+            self.assertEqual(geo.lookup("8.8.8.8"), ("United States", "Mountain View"))
+            self.assertIsNone(geo.lookup("9.9.9.9"))
+            self.assertIsNone(geo.lookup("9.9.9.9"))
+            self.assertIsNone(geo.lookup("192.168.1.1"))
+        self.assertEqual(city.call_count, 2)
+
+    @override_settings(USER_SESSION_GEOIP_STUB=None)
+    def test_reader_failure_is_remembered(self):
+        """Test GeoIP2 without a database is tried once and reported as unavailable."""
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        with patch.object(geo, "GEOIP2_AVAILABLE", True), patch.object(
+            geo, "GeoIP2", side_effect=Exception("GeoIP path must be valid")
+        ) as reader:
+            self.assertIsNone(geo.lookup("8.8.8.8"))
+            self.assertIsNone(geo.lookup("8.8.4.4"))
+            self.assertIsNone(geo.get_reader())
+
+            out = StringIO()
+            call_command("backfill_session_geo", stdout=out)
+        self.assertEqual(reader.call_count, 1)
+        self.assertIn("GeoIP2 is not available", out.getvalue())
+
+    def test_location_cache_evicts_least_recently_used(self):
+        """Test the LRU cache keeps at most maxsize entries."""
+        locations = geo.LocationCache(maxsize=2, ttl=60)
+        locations.set("a", ("A", ""))
+        locations.set("b", ("B", ""))
+        locations.get("a")
+        locations.set("c", ("C", ""))
+        self.assertIsNone(locations.get("b"))
+        self.assertEqual(locations.get("a"), ("A", ""))
+
+    def test_backfill_session_geo(self):
+        """Test historical sessions are geolocated in batches."""
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        user = User.objects.create_user(email="geo@example.com", password="testpass123")
+        addresses = ["8.8.8.8", "8.8.8.8", "2a01:cb00::1", "127.0.0.1"]
+        for ip_address in addresses:
+            session = SessionStore()
+            session.create()
+            UserSession.objects.create(
+                user=user, session_key=session.session_key, ip_address=ip_address
+            )
+
+        call_command("backfill_session_geo", batch_size=2, stdout=StringIO())
+
+        self.assertEqual(
+            sorted(UserSession.objects.values_list("country", flat=True)),
+            ["", "France", "United States", "United States"],
+        )
+
+
+class SessionEngineTest(TestCase):
+    """Test suite for the tracked session engines."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="engine@example.com", password="testpass123"
+        )
+
+    def _track(self, session_key):
+        return UserSession.objects.create(
+            user=self.user, session_key=session_key, ip_address="127.0.0.1"
+        )
+
+    def test_unmodified_session_is_not_written_to_database(self):
+        """Test saving an unchanged cached_db session only refreshes the cache."""
+        from .session_engines.cached_db import SessionStore as CachedDBStore
+
+        session = CachedDBStore()
+        session["_auth_user_id"] = str(self.user.pk)
+        session.save()
+
+        session = CachedDBStore(session_key=session.session_key)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(session["_auth_user_id"], str(self.user.pk))
+            session.save()
+        self.assertEqual(len(queries), 0)
+
+        session["theme"] = "dark"
+        with CaptureQueriesContext(connection) as queries:
+            session.save()
+        self.assertTrue(queries)
+
+        # Evicted from the cache: reloaded from the database with its current data
+        cache.clear()
+        session = CachedDBStore(session_key=session.session_key)
+        self.assertEqual(session["theme"], "dark")
+
+    def test_deleted_session_is_marked_inactive(self):
+        """Test deleting a session marks its UserSession inactive."""
+        from .session_engines.cached_db import SessionStore as CachedDBStore
+
+        session = CachedDBStore()
+        session.create()
+        user_session = self._track(session.session_key)
+
+        session.flush()
+
+        user_session.refresh_from_db()
+        self.assertFalse(user_session.is_active)
+
+    @override_settings(SESSION_ENGINE="authentication.session_engines.cache")
+    def test_evicted_session_is_marked_inactive(self):
+        """Test a cache session missing on load marks its UserSession inactive."""
+        from .session_engines.cache import SessionStore as CacheStore
+
+        session = CacheStore()
+        session["_auth_user_id"] = str(self.user.pk)
+        session.save()
+        user_session = self._track(session.session_key)
+        self.assertFalse(user_session.is_expired())
+
+        cache.clear()
+        self.assertEqual(CacheStore(session_key=session.session_key).load(), {})
+
+        user_session.refresh_from_db()
+        self.assertFalse(user_session.is_active)
+
+
+class SessionSweeperTest(TestCase):
+    """Test suite for the expired session sweeper."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = User.objects.create_user(
+            email="sweep@example.com", password="testpass123"
+        )
+
+    def _track(self, expired=False, **fields):
+        session = SessionStore()
+        session.create()
+        if expired:
+            Session.objects.filter(session_key=session.session_key).update(
+                expire_date=timezone.now() - timedelta(days=1)
+            )
+        return UserSession.objects.create(
+            user=self.user, session_key=session.session_key, ip_address="127.0.0.1", **fields
+        )
+
+    def test_expired_sessions_are_swept_in_batches(self):
+        """Test expired and long-idle sessions are marked inactive batch by batch."""
+        from .sweeper import sweep_expired_sessions
+
+        expired = [self._track(expired=True) for _ in range(3)]
+        idle = self._track()
+        UserSession.objects.filter(pk=idle.pk).update(
+            last_activity=timezone.now() - timedelta(days=30)
+        )
+        current = self._track()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(sweep_expired_sessions(batch_size=2), (4, True))
+        self.assertEqual(len(queries), 3)
+
+        self.assertEqual(
+            set(UserSession.objects.filter(is_active=False).values_list("pk", flat=True)),
+            {user_session.pk for user_session in expired} | {idle.pk},
+        )
+        current.refresh_from_db()
+        self.assertTrue(current.is_active)
+
+    def test_sweep_stops_when_time_budget_is_spent(self):
+        """Test a sweep reports incomplete work once its budget is spent."""
+        from .sweeper import sweep_expired_sessions
+
+        for _ in range(3):
+            self._track(expired=True)
+
+        self.assertEqual(sweep_expired_sessions(batch_size=1, time_budget=0), (1, False))
+
+    def test_incomplete_sweep_queues_a_follow_up(self):
+        """Test a sweep task that runs out of time queues the rest of the work."""
+        from tasks.models import Job, JobStatus
+        from tasks.queue import run_pending
+
+        from .sweeper import SWEEP_TASK, schedule_sweep
+
+        for _ in range(3):
+            self._track(expired=True)
+
+        schedule_sweep(batch_size=1, time_budget=0)
+        run_pending()
+        self.assertEqual(UserSession.objects.filter(is_active=False).count(), 1)
+        self.assertEqual(
+            Job.objects.filter(name=SWEEP_TASK, status=JobStatus.PENDING).count(), 1
+        )
+
+        # The follow-ups sweep the remaining sessions, then stop queueing
+        run_pending()
+        run_pending()
+        self.assertFalse(UserSession.objects.filter(is_active=True).exists())
+        run_pending()
+        self.assertFalse(Job.objects.filter(name=SWEEP_TASK, status=JobStatus.PENDING).exists())
+
+    def test_only_one_process_sweeps_at_a_time(self):
+        """Test a sweep held by another worker is not run again."""
+        from tasks.models import Job, JobStatus
+
+        from .sweeper import SWEEP_TASK, run_sweep, schedule_sweep
+
+        job = schedule_sweep()
+        Job.objects.filter(pk=job.pk).update(
+            status=JobStatus.RUNNING, locked_at=timezone.now(), locked_by="other"
+        )
+        self.assertFalse(run_sweep("this-worker"))
+
+        Job.objects.filter(pk=job.pk).update(status=JobStatus.SUCCEEDED, locked_at=None)
+        self.assertTrue(run_sweep("this-worker"))
+        self.assertEqual(Job.objects.filter(name=SWEEP_TASK).count(), 2)
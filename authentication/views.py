@@ -37,7 +37,7 @@ def terminate_session(request, session_id):
     )
 
     # Don't allow terminating current session via this method
-    if user_session.session.session_key == request.session.session_key:
+    if user_session.session_key == request.session.session_key:
         if request.headers.get("X-Requested-With") == "XMLHttpRequest":
             return JsonResponse(
                 {
@@ -78,7 +78,7 @@ def terminate_all_sessions(request):
 
     sessions_to_terminate = UserSession.objects.filter(
         user=request.user, is_active=True
-    ).exclude(session__session_key=current_session_key)
+    ).exclude(session_key=current_session_key)
 
     count = 0
     for user_session in sessions_to_terminate:
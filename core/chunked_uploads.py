@@ -0,0 +1,255 @@
+"""
+Upload par morceaux des grandes images CKEditor5 (exports de maquettes).
+
+Le client envoie le fichier en parties de taille fixe, chacune dans le corps
+d'une requête POST avec un en-tête `Content-Range: bytes <début>-<fin>/<total>`.
+Chaque partie est écrite en flux dans un fichier temporaire, si bien que la
+mémoire utilisée par upload reste bornée quelle que soit la taille du fichier.
+
+- Reprise : GET retourne le nombre d'octets reçus ; une partie qui ne commence
+  pas à cet endroit est refusée (409) avec la position attendue
+- Concurrence : chaque POST verrouille le fichier temporaire (flock) pendant
+  la vérification de la position et l'écriture ; une partie reçue pendant
+  qu'une autre requête écrit dans le même fichier (nouvel essai du client) est
+  refusée (409)
+- Fin : à la réception de la dernière partie, l'image est vérifiée et son envoi
+  à Cloudinary par morceaux (upload_large, via le registre des envois, voir
+  projects/uploads.py) est mis en file (tâche "core.finish_chunked_upload",
+  202) : aucun worker web n'est occupé pendant cet envoi. Le client interroge
+  GET jusqu'à obtenir l'URL de l'image, enregistrée par la tâche dans un
+  fichier <upload>.json. Si la tâche échoue définitivement,
+  `Content-Range: bytes */<total>` la relance sans renvoyer les parties
+- Les fichiers temporaires abandonnés et les résultats sont supprimés après
+  CHUNKED_UPLOAD_STALE_AFTER
+"""
+
+import fcntl
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+from PIL import Image, UnidentifiedImageError
+from projects.uploads import upload_image
+from tasks.models import Job
+from tasks.queue import enqueue, is_running
+
+from .direct_uploads import CKEDITOR_OPTIONS
+
+logger = logging.getLogger(__name__)
+
+FINISH_TASK = "core.finish_chunked_upload"
+
+UPLOAD_ID_RE = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+CONTENT_RANGE_RE = re.compile(r"^bytes (?:(\d+)-(\d+)|\*)/(\d+)$")
+
+# Taille des lectures du corps de la requête
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Taille maximale d'une partie et des morceaux envoyés à Cloudinary
+PART_SIZE = 5 * 1024 * 1024
+CLOUDINARY_CHUNK_SIZE = 20 * 1024 * 1024
+
+CHUNKED_UPLOAD_STALE_AFTER = 24 * 60 * 60
+
+# Formats Pillow acceptés
+ALLOWED_FORMATS = {"JPEG", "PNG", "GIF", "BMP", "WEBP", "TIFF"}
+
+UPLOAD_OPTIONS = {
+    "folder": CKEDITOR_OPTIONS["folder"],
+    **CKEDITOR_OPTIONS["transformation"],
+    "resource_type": "image",
+    "use_filename": True,
+    "unique_filename": True,
+}
+
+
+def upload_dir():
+    path = Path(getattr(settings, "CHUNKED_UPLOAD_DIR", None) or Path(tempfile.gettempdir()) / "chunked_uploads")
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def max_size():
+    return getattr(settings, "CHUNKED_UPLOAD_MAX_SIZE", 100 * 1024 * 1024)
+
+
+def part_path(user_id, upload_id):
+    return upload_dir() / f"{user_id}_{upload_id}.part"
+
+
+def result_path(user_id, upload_id):
+    return upload_dir() / f"{user_id}_{upload_id}.json"
+
+
+def finish_key(user_id, upload_id):
+    return f"{FINISH_TASK}:{user_id}:{upload_id}"
+
+
+def is_finishing(user_id, upload_id):
+    """L'envoi à Cloudinary d'un fichier reçu est en file ou en cours"""
+    key = finish_key(user_id, upload_id)
+    return Job.objects.pending().filter(idempotency_key=key).exists() or is_running(key)
+
+
+def cleanup_stale_parts():
+    """Supprime les fichiers temporaires des uploads abandonnés et les résultats anciens"""
+    limit = time.time() - CHUNKED_UPLOAD_STALE_AFTER
+    for path in [*upload_dir().glob("*.part"), *upload_dir().glob("*.json")]:
+        try:
+            if path.stat().st_mtime < limit:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _error(message, status=400, **extra):
+    return JsonResponse({"uploaded": False, "error": {"message": message}, **extra}, status=status)
+
+
+@contextmanager
+def locked_part(path):
+    """
+    Fichier temporaire ouvert en ajout et verrouillé pour la requête, ou None
+    si une autre requête le verrouille déjà
+    """
+    with open(path, "ab") as part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield None
+        else:
+            yield part
+
+
+def write_part(request, part, offset, length):
+    """Écrit le corps de la requête en flux à la suite du fichier ; retourne True si complet"""
+    written = 0
+    while written < length:
+        chunk = request.read(min(STREAM_CHUNK_SIZE, length - written))
+        if not chunk:
+            break
+        part.write(chunk)
+        written += len(chunk)
+    part.flush()
+    if written != length:
+        # Partie interrompue : le fichier revient à la dernière partie complète
+        part.truncate(offset)
+    return written == length
+
+
+def schedule_finish(request, path, upload_id):
+    """Vérifie l'image reçue et met en file son envoi à Cloudinary"""
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        image_format = None
+    if image_format not in ALLOWED_FORMATS:
+        path.unlink(missing_ok=True)
+        return _error(f"Type de fichier non supporté. Types autorisés: {', '.join(sorted(ALLOWED_FORMATS))}")
+
+    user_id = request.user.pk
+    if not is_finishing(user_id, upload_id):
+        enqueue(
+            FINISH_TASK,
+            {
+                "user_id": user_id,
+                "upload_id": upload_id,
+                "filename": request.headers.get("X-File-Name") or path.name,
+            },
+            idempotency_key=finish_key(user_id, upload_id),
+        )
+    return JsonResponse({"offset": path.stat().st_size, "processing": True}, status=202)
+
+
+def finish_upload(user_id, upload_id, filename):
+    """
+    Envoie à Cloudinary par morceaux un fichier entièrement reçu (tâche de la
+    file) et enregistre l'URL de l'image pour le client. Les erreurs sont
+    propagées : la tâche est retentée et le fichier reçu conservé.
+    """
+    path = part_path(user_id, upload_id)
+    if not path.exists():
+        return
+
+    with open(path, "rb") as source:
+        result = upload_image(
+            source,
+            large=True,
+            chunk_size=CLOUDINARY_CHUNK_SIZE,
+            filename=filename,
+            **UPLOAD_OPTIONS,
+        )
+
+    result_path(user_id, upload_id).write_text(json.dumps({"url": result["secure_url"]}))
+    path.unlink(missing_ok=True)
+    logger.info(f"Upload CKEditor5 par morceaux réussi: {result.get('public_id', 'unknown')}")
+
+
+@staff_member_required
+@require_http_methods(["GET", "POST"])
+def chunked_upload(request, upload_id):
+    """
+    Reçoit une partie d'un upload (POST) ou indique la position de reprise et
+    l'état de l'envoi à Cloudinary (GET)
+    """
+    if not UPLOAD_ID_RE.match(upload_id):
+        return _error("Identifiant d'upload invalide")
+
+    path = part_path(request.user.pk, upload_id)
+    if request.method == "GET":
+        result = result_path(request.user.pk, upload_id)
+        if result.exists():
+            return JsonResponse({"uploaded": True, **json.loads(result.read_text())})
+        return JsonResponse({
+            "offset": path.stat().st_size if path.exists() else 0,
+            "processing": is_finishing(request.user.pk, upload_id),
+        })
+
+    match = CONTENT_RANGE_RE.match(request.headers.get("Content-Range", ""))
+    if not match:
+        return _error("En-tête Content-Range manquant ou invalide")
+    total = int(match.group(3))
+    if total > max_size():
+        return _error(
+            f"Fichier trop volumineux. Taille maximale: {max_size() // (1024*1024)}MB", status=413
+        )
+
+    if match.group(1) is None:
+        if not path.exists():
+            return _error("Upload incomplet", status=409, offset=0)
+    else:
+        start, end = int(match.group(1)), int(match.group(2))
+        if end < start or end >= total or end - start + 1 > PART_SIZE:
+            return _error("Partie invalide")
+        if start == 0:
+            cleanup_stale_parts()
+
+    with locked_part(path) as part:
+        if part is None:
+            return _error("Partie en cours de réception", status=409, offset=path.stat().st_size)
+        offset = os.fstat(part.fileno()).st_size
+
+        # "bytes */<total>" : relance de l'envoi à Cloudinary d'un fichier déjà reçu
+        if match.group(1) is None:
+            if offset != total:
+                return _error("Upload incomplet", status=409, offset=offset)
+            return schedule_finish(request, path, upload_id)
+
+        if start != offset:
+            return _error("Partie inattendue", status=409, offset=offset)
+        if not write_part(request, part, offset, end - start + 1):
+            return _error("Partie incomplète", offset=offset)
+
+        if end + 1 < total:
+            return JsonResponse({"offset": end + 1})
+        return schedule_finish(request, path, upload_id)
@@ -11,6 +11,7 @@ from django.views.decorators.http import require_http_methods
 import cloudinary
 import cloudinary.uploader
 import cloudinary.exceptions
+from projects.uploads import upload_image
 
 logger = logging.getLogger(__name__)
 
@@ -72,8 +73,8 @@ def upload_file(request):
         # S'assurer qu'on lit depuis le début du fichier
         upload_file.seek(0)
         
-        # Upload vers Cloudinary
-        result = cloudinary.uploader.upload(
+        # Upload vers Cloudinary (une image identique déjà envoyée est réutilisée)
+        result = upload_image(
             upload_file,
             **upload_options
         )
@@ -10,6 +10,7 @@ from django.contrib.auth.decorators import login_required
 import cloudinary
 import cloudinary.uploader
 import cloudinary.exceptions
+from projects.uploads import upload_image
 
 logger = logging.getLogger(__name__)
 
@@ -64,8 +65,8 @@ def ckeditor_upload_file(request):
             # Lire le contenu du fichier
             upload_file.seek(0)  # S'assurer qu'on lit depuis le début
             
-            # Upload vers Cloudinary
-            result = cloudinary.uploader.upload(
+            # Upload vers Cloudinary (une image identique déjà envoyée est réutilisée)
+            result = upload_image(
                 upload_file,
                 **upload_options
             )
@@ -0,0 +1,305 @@
+"""
+Envois d'images directs du navigateur vers Cloudinary (uploads signés).
+
+Les octets des images ne transitent plus par les workers de l'application :
+
+1. `upload_signature` émet les paramètres signés d'un envoi pour un profil
+   (éditeur CKEditor5 ou champ image d'un modèle : dossier, formats
+   autorisés, transformation à l'envoi). Si le navigateur transmet
+   l'empreinte SHA-256 du fichier et qu'une image identique figure au
+   registre des envois (projects/uploads.py), elle est réutilisée sans envoi.
+   Cette empreinte n'est pas vérifiable : les envois directs ne sont pas
+   ajoutés au registre, qui ne contient que des empreintes calculées par le
+   serveur
+2. le navigateur envoie le fichier directement à Cloudinary
+   (static/js/direct_upload.js)
+3. `upload_callback` vérifie la signature de la réponse de Cloudinary, puis
+   contrôle l'image décrite par l'API Cloudinary (dossier, format, taille,
+   ancienneté). Un envoi refusé est supprimé par la boîte d'envoi des
+   suppressions s'il a été créé après l'émission du jeton d'envoi : une
+   ancienne réponse signée rejouée est refusée sans supprimer l'image
+
+Les deux étapes sont liées par des jetons signés (django.core.signing) :
+celui de `upload_signature` fixe l'utilisateur, le profil et la date
+d'émission de l'envoi ; celui de `upload_callback` (ou d'une image réutilisée) est placé
+dans le champ caché "<champ>_direct_upload" du formulaire d'administration,
+qui n'accepte que les jetons émis pour le même utilisateur et le même champ
+(voir apply_direct_uploads).
+"""
+
+import json
+import logging
+import re
+import time
+from datetime import timedelta
+
+import cloudinary
+import cloudinary.api
+import cloudinary.utils
+from cloudinary import CloudinaryResource
+from django import forms
+from django.apps import apps
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core import signing
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_POST
+from projects.deletions import schedule_deletion
+from projects.image_backends import upload_metadata
+from projects.images import METADATA_FIELD, source_key
+from projects.uploads import field_options, find_upload
+from projects.variants import VARIANT_SPECS
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_FORMATS = ["jpg", "jpeg", "png", "gif", "bmp", "webp"]
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Durée de validité du jeton d'un envoi vérifié (formulaire ouvert)
+RECORD_TIMEOUT = 24 * 60 * 60
+
+# Sels des jetons d'envoi (signature -> callback) et des jetons de formulaire
+UPLOAD_SALT = "core.direct_uploads.upload"
+RECORD_SALT = "core.direct_uploads.record"
+
+# Profil des images insérées dans CKEditor5 (mêmes options que l'upload par le serveur)
+CKEDITOR_PROFILE = "ckeditor"
+CKEDITOR_OPTIONS = {
+    "folder": "ckeditor5/uploads",
+    "transformation": {
+        "crop": "limit",
+        "width": 1200,
+        "height": 800,
+        "quality": "auto",
+        "fetch_format": "auto",
+        "flags": "progressive",
+    },
+}
+
+
+def upload_profiles():
+    """
+    Profils d'envoi : CKEditor5 et champs image originaux des modèles ;
+    "options" sont les options de l'envoi équivalent par le serveur (clé du
+    registre des envois)
+    """
+    profiles = {
+        CKEDITOR_PROFILE: {
+            **CKEDITOR_OPTIONS,
+            "options": {**CKEDITOR_OPTIONS["transformation"], "resource_type": "image"},
+        }
+    }
+    for label, field in VARIANT_SPECS:
+        model_field = apps.get_model(label)._meta.get_field(field)
+        profiles[f"{label}.{field}"] = {
+            "folder": model_field.options["folder"],
+            "options": field_options(model_field),
+        }
+    return profiles
+
+
+def max_age():
+    return getattr(settings, "CLOUDINARY_DIRECT_UPLOAD_MAX_AGE", 15 * 60)
+
+
+def signed_upload_params(profile):
+    """Paramètres d'envoi signés d'un profil, à transmettre tels quels à Cloudinary"""
+    options = upload_profiles()[profile]
+    config = cloudinary.config()
+    params = {
+        "timestamp": int(time.time()),
+        "folder": options["folder"],
+        "allowed_formats": ",".join(ALLOWED_FORMATS),
+    }
+    if options.get("transformation"):
+        params["transformation"] = cloudinary.utils.generate_transformation_string(
+            **options["transformation"]
+        )[0]
+
+    params["signature"] = cloudinary.utils.api_sign_request(
+        params, config.api_secret, config.signature_algorithm
+    )
+    params["api_key"] = config.api_key
+    return params
+
+
+def _error(message, status=400):
+    return JsonResponse({"uploaded": False, "error": {"message": message}}, status=status)
+
+
+def _uploaded(user, profile, result, **extra):
+    """
+    Réponse d'un envoi accepté : URL de l'image (CKEditor5), valeur du champ
+    image et jeton signé à placer dans le champ caché du formulaire
+    """
+    resource = CloudinaryResource(
+        result["public_id"],
+        version=str(result["version"]) if result.get("version") else None,
+        format=result["format"],
+        resource_type="image",
+    )
+    value = resource.get_prep_value()
+    metadata = dict(upload_metadata(result), source=source_key(resource))
+    token = signing.dumps(
+        {"user": user.pk, "profile": profile, "value": value, "metadata": metadata},
+        salt=RECORD_SALT,
+    )
+    return JsonResponse({"uploaded": True, "url": result["secure_url"], "value": value, "token": token, **extra})
+
+
+@staff_member_required
+@require_POST
+def upload_signature(request):
+    """
+    Émet les paramètres signés d'un envoi direct à Cloudinary, ou l'image
+    identique déjà envoyée si l'empreinte transmise figure au registre
+    """
+    profile = request.POST.get("profile", CKEDITOR_PROFILE)
+    sha256 = request.POST.get("sha256", "").lower()
+    if profile not in upload_profiles():
+        return _error(f"Profil d'envoi inconnu: {profile}")
+    if sha256 and not SHA256_RE.match(sha256):
+        return _error("Empreinte invalide")
+
+    if sha256:
+        existing = find_upload(sha256, upload_profiles()[profile]["options"])
+        if existing is not None and existing["resource_type"] == "image":
+            logger.info(f"Image déjà envoyée, réutilisée: {existing['public_id']}")
+            return _uploaded(request.user, profile, existing, reused=True)
+
+    if not cloudinary.config().api_secret:
+        return _error("Configuration Cloudinary incomplète", status=503)
+
+    return JsonResponse({
+        "upload_url": cloudinary.utils.cloudinary_api_url("upload", resource_type="image"),
+        "fields": signed_upload_params(profile),
+        "token": signing.dumps(
+            {"user": request.user.pk, "profile": profile, "issued_at": int(time.time())},
+            salt=UPLOAD_SALT,
+        ),
+        "max_file_size": MAX_FILE_SIZE,
+        "allowed_formats": ALLOWED_FORMATS,
+    })
+
+
+def validate_upload(profile, resource):
+    """Motif de refus d'une image décrite par l'API Cloudinary, ou None"""
+    folder = upload_profiles()[profile]["folder"]
+    created_at = parse_datetime(resource.get("created_at") or "")
+
+    if resource.get("resource_type") != "image":
+        return "Type de ressource non supporté"
+    if not resource["public_id"].startswith(f"{folder}/"):
+        return "Dossier d'envoi inattendu"
+    if (resource.get("format") or "").lower() not in ALLOWED_FORMATS:
+        return f"Format non supporté: {resource.get('format')}"
+    if (resource.get("bytes") or 0) > MAX_FILE_SIZE:
+        return f"Fichier trop volumineux. Taille maximale: {MAX_FILE_SIZE // (1024*1024)}MB"
+    if created_at is None or timezone.now() - created_at > timedelta(seconds=max_age()):
+        return "Envoi expiré"
+    return None
+
+
+@staff_member_required
+@require_POST
+def upload_callback(request):
+    """
+    Vérifie et enregistre un envoi direct ; retourne l'URL de l'image
+    (CKEditor5) et le jeton du champ image (formulaires d'administration)
+    """
+    try:
+        payload = json.loads(request.body)
+        upload = signing.loads(payload["token"], salt=UPLOAD_SALT, max_age=max_age())
+        result = payload["result"]
+        public_id, version = result["public_id"], result["version"]
+    except signing.BadSignature:
+        return _error("Jeton d'envoi invalide ou expiré", status=403)
+    except (ValueError, KeyError, TypeError):
+        return _error("Réponse d'envoi invalide")
+
+    profile = upload["profile"]
+    if upload["user"] != request.user.pk or profile not in upload_profiles():
+        return _error("Jeton d'envoi invalide ou expiré", status=403)
+
+    # Seule une réponse signée par Cloudinary est prise en compte
+    if not cloudinary.utils.verify_api_response_signature(public_id, version, result.get("signature")):
+        logger.warning(f"Signature d'envoi direct invalide pour {public_id}")
+        return _error("Signature invalide", status=403)
+
+    # Taille, format et date d'envoi ne sont pas signés : ils sont lus auprès de Cloudinary
+    try:
+        resource = cloudinary.api.resource(public_id, resource_type="image", colors=True)
+    except Exception as e:
+        logger.error(f"Envoi direct introuvable sur Cloudinary ({public_id}): {e}")
+        return _error("Envoi introuvable sur Cloudinary", status=502)
+
+    reason = validate_upload(profile, resource)
+    if reason is None and str(resource.get("version")) != str(version):
+        reason = "Version inattendue"
+    if reason:
+        # Seule une image envoyée avec ce jeton est supprimée, pas une image rejouée
+        created_at = parse_datetime(resource.get("created_at") or "")
+        if created_at is not None and created_at.timestamp() >= upload["issued_at"]:
+            schedule_deletion([public_id])
+        logger.warning(f"Envoi direct refusé pour {public_id}: {reason}")
+        return _error(reason)
+
+    logger.info(f"Envoi direct enregistré: {public_id}")
+    return _uploaded(request.user, profile, resource)
+
+
+def direct_upload_field_name(field):
+    return f"{field}_direct_upload"
+
+
+def direct_upload_form(form, model):
+    """
+    Formulaire avec un champ caché "<champ>_direct_upload" par champ image
+    envoyé directement : un formulaire dont seule l'image a été envoyée est
+    ainsi modifié, et enregistré, y compris une nouvelle ligne d'un inline
+    """
+    fields = {
+        direct_upload_field_name(field): forms.CharField(
+            required=False,
+            widget=forms.HiddenInput,
+            label=model._meta.get_field(field).verbose_name,
+        )
+        for label, field in VARIANT_SPECS
+        if label == model._meta.label_lower
+    }
+    return type(form.__name__, (form,), fields) if fields else form
+
+
+def apply_direct_uploads(request, form):
+    """
+    Affecte à l'instance d'un formulaire validé les images envoyées
+    directement à Cloudinary, transmises par les jetons des champs cachés ;
+    retourne les champs modifiés
+    """
+    instance = form.instance
+    applied = []
+    for label, field in VARIANT_SPECS:
+        if label != instance._meta.label_lower:
+            continue
+        token = getattr(form, "cleaned_data", {}).get(direct_upload_field_name(field))
+        if not token:
+            continue
+        # Seuls les envois vérifiés par le callback pour cet utilisateur et ce champ sont acceptés
+        try:
+            upload = signing.loads(token, salt=RECORD_SALT, max_age=RECORD_TIMEOUT)
+        except signing.BadSignature:
+            logger.warning(f"Jeton d'envoi direct invalide pour {label}.{field}")
+            continue
+        if upload["user"] != request.user.pk or upload["profile"] != f"{label}.{field}":
+            logger.warning(f"Jeton d'envoi direct refusé pour {label}.{field}")
+            continue
+
+        setattr(instance, field, instance._meta.get_field(field).to_python(upload["value"]))
+        metadata = {**(getattr(instance, METADATA_FIELD) or {}), field: upload["metadata"]}
+        setattr(instance, METADATA_FIELD, metadata)
+        applied.append(field)
+    return applied
@@ -72,7 +72,6 @@ MIDDLEWARE = [
     "authentication.middleware.UserSessionTrackingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "authentication.middleware.SessionCleanupMiddleware",
     "core.middleware.SiteURLMiddleware",
 ]
 
@@ -109,6 +108,52 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# En production avec plusieurs workers gunicorn, utiliser un backend partagé
+# (Redis, Memcached, base de données) pour que les invalidations soient globales
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", "webtech-solutions"),
+    }
+}
+
+# Durée de vie des réponses JSON mises en cache par l'app projects (secondes)
+PROJECTS_API_CACHE_TIMEOUT = 60 * 60
+# Durée de vie de l'instantané des statistiques (API et tableau de bord admin)
+PROJECTS_STATS_CACHE_TIMEOUT = 5 * 60
+# Durée de vie des fragments en cache de la page projet (clés versionnées)
+PROJECTS_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+# Versions d'images (large, miniature) dérivées de l'original par transformation
+# d'URL au lieu de copies envoyées à Cloudinary (voir projects/images.py)
+PROJECTS_VIRTUAL_IMAGE_VARIANTS = os.getenv("PROJECTS_VIRTUAL_IMAGE_VARIANTS", "False") == "True"
+# Backend de génération des versions d'images (voir projects/image_backends.py) :
+# CloudinaryBackend, ou PillowBackend pour un calcul local (dev, CI, hors ligne)
+PROJECTS_IMAGE_BACKEND = {
+    "BACKEND": os.getenv(
+        "PROJECTS_IMAGE_BACKEND", "projects.image_backends.CloudinaryBackend"
+    ),
+    "OPTIONS": {},
+}
+# Largeurs (px) proposées dans les srcset des images responsives
+PROJECTS_RESPONSIVE_WIDTHS = [320, 640, 960, 1280, 1920]
+
+
+# File de tâches (app tasks, worker : python manage.py run_worker)
+# En mode eager, les tâches sont exécutées dans le processus web après la
+# validation de la transaction (développement sans worker)
+TASKS_EAGER = os.getenv("TASKS_EAGER", "False") == "True"
+# Délai après lequel une tâche "running" sans nouvelles est de nouveau réclamable
+TASKS_LOCK_TIMEOUT = 10 * 60
+# Délai avant nouvelle tentative : base * 2^(tentatives - 1), plafonné
+TASKS_RETRY_BASE_DELAY = 30
+TASKS_RETRY_MAX_DELAY = 60 * 60
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -197,6 +242,25 @@ SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = "Lax"
 SESSION_SAVE_EVERY_REQUEST = True  # Update session on every request
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
+# With a cache shared by all workers, sessions are read from the cache and the
+# session row is no longer written on every request (see authentication/session_engines)
+SESSION_ENGINE = os.getenv(
+    "SESSION_ENGINE",
+    "authentication.session_engines.cached_db"
+    if os.getenv("CACHE_BACKEND")
+    else "django.contrib.sessions.backends.db",
+)
+SESSION_DB_REFRESH_INTERVAL = 5 * 60  # max lag of the session row expiry date
+
+# UserSession activity tracking (see authentication/activity.py)
+USER_SESSION_ACTIVITY_INTERVAL = 60  # seconds between full tracking passes per session
+USER_SESSION_ACTIVITY_FLUSH_INTERVAL = 30  # seconds between bulk last_activity writes
+USER_SESSION_ACTIVITY_FLUSH_SIZE = 100  # pending touches that force a write
+
+# Session geolocation (see authentication/geo.py)
+USER_SESSION_GEOIP_CACHE_SIZE = 10000  # IP addresses kept in the LRU cache
+USER_SESSION_GEOIP_CACHE_TTL = 24 * 60 * 60
+USER_SESSION_GEOIP_STUB = os.getenv("USER_SESSION_GEOIP_STUB")  # offline JSON database
 
 # Security Settings for Sessions
 SECURE_BROWSER_XSS_FILTER = True
@@ -265,6 +329,13 @@ try:
 except ImportError:
     pass  # En cas d'erreur d'import, ignorer silencieusement
 
+# Envois directs vers Cloudinary : ancienneté maximale d'un envoi vérifié (secondes)
+CLOUDINARY_DIRECT_UPLOAD_MAX_AGE = 15 * 60
+
+# Upload par morceaux des grandes images CKEditor5 (dossier partagé par les workers)
+CHUNKED_UPLOAD_DIR = os.getenv("CHUNKED_UPLOAD_DIR")
+CHUNKED_UPLOAD_MAX_SIZE = 100 * 1024 * 1024  # 100MB
+
 # Cloudinary URL pour les medias
 CLOUDINARY_URL = f"cloudinary://{os.getenv('CLOUDINARY_API_KEY')}:{os.getenv('CLOUDINARY_API_SECRET')}@{os.getenv('CLOUDINARY_CLOUD_NAME')}"
 
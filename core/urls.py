@@ -23,6 +23,8 @@ from django.conf.urls.static import static
 from . import views
 from .ckeditor_cloudinary import ckeditor_upload_file, test_cloudinary_config
 from .ckeditor5_views import upload_file as ckeditor5_upload
+from .direct_uploads import upload_callback, upload_signature
+from .chunked_uploads import chunked_upload
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -32,6 +34,11 @@ urlpatterns = [
     path("ckeditor5/image_upload/", ckeditor5_upload, name='ckeditor5_upload_override'),
     path("ckeditor5/", include('django_ckeditor_5.urls')),
     path("ckeditor5/upload/", ckeditor_upload_file, name='ckeditor5_upload'),
+    # Upload par morceaux des grandes images (reprise possible)
+    path("ckeditor5/upload/chunked/<str:upload_id>/", chunked_upload, name='ckeditor5_chunked_upload'),
+    # Envois directs du navigateur vers Cloudinary (paramètres signés puis vérification)
+    path("uploads/signature/", upload_signature, name='direct_upload_signature'),
+    path("uploads/callback/", upload_callback, name='direct_upload_callback'),
     path("test-cloudinary/", test_cloudinary_config, name='test_cloudinary'),
     path("", views.index, name="index"),
 ]
@@ -13,7 +13,12 @@ from .models import (
     ProjectTeamMember,
     ProjectTestimonial,
     ProjectMetrics,
+    CloudinaryDeletion,
 )
+from .deletions import flush_deletions
+from .variants import VARIANT_SPECS
+from core.direct_uploads import apply_direct_uploads, direct_upload_form
+from .signals import refresh_after_bulk_update
 
 
 class ColoredTextWidget(TextInput):
@@ -24,8 +29,45 @@ class ColoredTextWidget(TextInput):
         self.attrs.update({"type": "color"})
 
 
+
+class DirectUploadMixin:
+    """
+    Envoi des images directement du navigateur vers Cloudinary (voir
+    core/direct_uploads.py) : les champs image et CKEditor5 sont pris en
+    charge par static/js/direct_upload.js
+    """
+
+    class Media:
+        js = ["js/direct_upload.js"]
+
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_dbfield(db_field, request, **kwargs)
+        key = (self.model._meta.label_lower, db_field.name)
+        if formfield is not None and key in VARIANT_SPECS:
+            formfield.widget.attrs["data-direct-upload"] = ".".join(key)
+        return formfield
+
+    def get_form(self, request, obj=None, **kwargs):
+        kwargs.setdefault("form", direct_upload_form(self.form, self.model))
+        return super().get_form(request, obj, **kwargs)
+
+    def get_formset(self, request, obj=None, **kwargs):
+        kwargs.setdefault("form", direct_upload_form(self.form, self.model))
+        return super().get_formset(request, obj, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        apply_direct_uploads(request, form)
+        super().save_model(request, obj, form, change)
+
+    def save_formset(self, request, form, formset, change):
+        # Les formulaires avec un envoi direct sont modifiés (champ caché) : enregistrés par le formset
+        for inline_form in formset.forms:
+            apply_direct_uploads(request, inline_form)
+        super().save_formset(request, form, formset, change)
+
+
 @admin.register(ProjectCategory)
-class ProjectCategoryAdmin(admin.ModelAdmin):
+class ProjectCategoryAdmin(DirectUploadMixin, admin.ModelAdmin):
     list_display = ["name", "color_preview", "description_short", "created_at"]
     list_filter = ["created_at", "updated_at"]
     search_fields = ["name", "description"]
@@ -74,7 +116,7 @@ class ProjectCategoryAdmin(admin.ModelAdmin):
     description_short.short_description = "Description"
 
 
-class ProjectImageInline(admin.TabularInline):
+class ProjectImageInline(DirectUploadMixin, admin.TabularInline):
     model = ProjectImage
     extra = 1
     fields = ["image_preview", "image", "title", "order"]
@@ -106,7 +148,7 @@ class ProjectTeamMemberInline(admin.TabularInline):
         return super().get_queryset(request).select_related("user")
 
 
-class ProjectTestimonialInline(admin.StackedInline):
+class ProjectTestimonialInline(DirectUploadMixin, admin.StackedInline):
     model = ProjectTestimonial
     fields = [
         "client_photo_preview",
@@ -145,7 +187,7 @@ class ProjectMetricsInline(admin.StackedInline):
 
 
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
+class ClientAdmin(DirectUploadMixin, admin.ModelAdmin):
     list_display = [
         "name",
         "logo_preview",
@@ -291,7 +333,9 @@ class ClientAdmin(admin.ModelAdmin):
     # Actions personnalisées
     def mark_clients_as_active(modeladmin, request, queryset):
         """Marque les clients sélectionnés comme actifs"""
+        pks = list(queryset.values_list("pk", flat=True))
         updated = queryset.update(is_active=True)
+        refresh_after_bulk_update(Client, pks)
         modeladmin.message_user(
             request, f"{updated} client(s) marqué(s) comme actif(s).", level="success"
         )
@@ -300,7 +344,9 @@ class ClientAdmin(admin.ModelAdmin):
 
     def mark_clients_as_inactive(modeladmin, request, queryset):
         """Marque les clients sélectionnés comme inactifs"""
+        pks = list(queryset.values_list("pk", flat=True))
         updated = queryset.update(is_active=False)
+        refresh_after_bulk_update(Client, pks)
         modeladmin.message_user(
             request, f"{updated} client(s) marqué(s) comme inactif(s).", level="success"
         )
@@ -311,7 +357,7 @@ class ClientAdmin(admin.ModelAdmin):
 
 
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(DirectUploadMixin, admin.ModelAdmin):
     list_display = [
         "title",
         "order",
@@ -529,7 +575,9 @@ class ProjectAdmin(admin.ModelAdmin):
     # Actions personnalisées
     def mark_as_published(modeladmin, request, queryset):
         """Marque les projets sélectionnés comme publiés"""
+        pks = list(queryset.values_list("pk", flat=True))
         updated = queryset.update(is_published=True)
+        refresh_after_bulk_update(Project, pks)
         modeladmin.message_user(
             request, f"{updated} projet(s) marqué(s) comme publié(s).", level="success"
         )
@@ -538,7 +586,9 @@ class ProjectAdmin(admin.ModelAdmin):
 
     def mark_as_unpublished(modeladmin, request, queryset):
         """Marque les projets sélectionnés comme non publiés"""
+        pks = list(queryset.values_list("pk", flat=True))
         updated = queryset.update(is_published=False)
+        refresh_after_bulk_update(Project, pks)
         modeladmin.message_user(
             request,
             f"{updated} projet(s) marqué(s) comme non publié(s).",
@@ -549,7 +599,9 @@ class ProjectAdmin(admin.ModelAdmin):
 
     def mark_as_featured(modeladmin, request, queryset):
         """Marque les projets sélectionnés comme mis en avant"""
+        pks = list(queryset.values_list("pk", flat=True))
         updated = queryset.update(is_featured=True)
+        refresh_after_bulk_update(Project, pks)
         modeladmin.message_user(
             request,
             f"{updated} projet(s) marqué(s) comme mis en avant.",
@@ -560,7 +612,9 @@ class ProjectAdmin(admin.ModelAdmin):
 
     def unmark_as_featured(modeladmin, request, queryset):
         """Enlève la mise en avant des projets sélectionnés"""
+        pks = list(queryset.values_list("pk", flat=True))
         updated = queryset.update(is_featured=False)
+        refresh_after_bulk_update(Project, pks)
         modeladmin.message_user(
             request,
             f"{updated} projet(s) retiré(s) de la mise en avant.",
@@ -578,7 +632,7 @@ class ProjectAdmin(admin.ModelAdmin):
 
 
 @admin.register(ProjectImage)
-class ProjectImageAdmin(admin.ModelAdmin):
+class ProjectImageAdmin(DirectUploadMixin, admin.ModelAdmin):
     list_display = ["project", "image_preview", "title", "order", "created_at"]
     list_filter = ["project", "created_at"]
     search_fields = ["title", "description", "project__title"]
@@ -638,7 +692,7 @@ class ProjectTeamMemberAdmin(admin.ModelAdmin):
 
 
 @admin.register(ProjectTestimonial)
-class ProjectTestimonialAdmin(admin.ModelAdmin):
+class ProjectTestimonialAdmin(DirectUploadMixin, admin.ModelAdmin):
     list_display = [
         "client_name",
         "project",
@@ -754,6 +808,27 @@ class ProjectMetricsAdmin(admin.ModelAdmin):
     performance_summary.short_description = "Résumé performances"
 
 
+
+@admin.register(CloudinaryDeletion)
+class CloudinaryDeletionAdmin(admin.ModelAdmin):
+    list_display = ["public_id", "attempts", "last_error", "created_at", "updated_at"]
+    search_fields = ["public_id", "last_error"]
+    readonly_fields = ["public_id", "attempts", "last_error", "created_at", "updated_at"]
+    actions = ["flush_now"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def flush_now(self, request, queryset):
+        """Supprime immédiatement les images sélectionnées"""
+        deleted, failed = flush_deletions(queryset)
+        self.message_user(
+            request, f"{deleted} images supprimées, {failed} en échec."
+        )
+
+    flush_now.short_description = "Supprimer maintenant de Cloudinary"
+
+
 # Configuration de l'admin
 admin.site.site_header = "Administration WebTech Solutions"
 admin.site.site_title = "WebTech Admin"
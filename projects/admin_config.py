@@ -17,25 +17,25 @@ class ProjectsAdminSite(AdminSite):
         """Personnalise la page d'accueil de l'admin"""
         extra_context = extra_context or {}
         
-        # Ajouter des statistiques rapides
-        from .models import Project, Client, ProjectCategory, ProjectImage
+        # Statistiques rapides, lues depuis l'instantané partagé avec l'API
+        from .models import Project
+        from .stats import get_stats
         
+        snapshot = get_stats()
         stats = {
-            'total_projects': Project.objects.count(),
-            'published_projects': Project.objects.filter(is_published=True).count(),
-            'featured_projects': Project.objects.filter(is_featured=True).count(),
-            'total_clients': Client.objects.filter(is_active=True).count(),
-            'total_categories': ProjectCategory.objects.count(),
-            'total_images': ProjectImage.objects.count(),
+            'total_projects': snapshot['total_projects'],
+            'published_projects': snapshot['published_projects'],
+            'featured_projects': snapshot['all_featured_projects'],
+            'total_clients': snapshot['active_clients'],
+            'total_categories': snapshot['total_categories'],
+            'total_images': snapshot['total_images'],
         }
         
         # Projets récents
         recent_projects = Project.objects.select_related('client').order_by('-created_at')[:5]
         
         # Projets par statut
-        project_status_stats = {}
-        for status in Project.objects.values_list('status', flat=True).distinct():
-            project_status_stats[status] = Project.objects.filter(status=status).count()
+        project_status_stats = snapshot['by_status']
         
         extra_context.update({
             'stats': stats,
@@ -56,6 +56,7 @@ STATUS_COLORS = {
 }
 
 # Configuration des transformations d'images
+# (préréglages des versions virtuelles, voir projects/images.py)
 IMAGE_TRANSFORMATIONS = {
     'thumbnail': {
         'width': 300,
@@ -78,6 +79,49 @@ IMAGE_TRANSFORMATIONS = {
         'quality': 'auto',
         'fetch_format': 'auto',
     },
+    'project_thumbnail': {
+        'width': 400,
+        'height': 300,
+        'crop': 'fill',
+        'quality': 'auto',
+        'fetch_format': 'auto',
+    },
+    'project_large': {
+        'width': 1200,
+        'height': 800,
+        'crop': 'fill',
+        'quality': 'auto',
+        'fetch_format': 'auto',
+    },
+    'logo_thumbnail': {
+        'width': 150,
+        'height': 150,
+        'crop': 'fit',
+        'quality': 'auto',
+        'fetch_format': 'auto',
+    },
+    'logo_large': {
+        'width': 400,
+        'crop': 'limit',
+        'quality': 'auto',
+        'fetch_format': 'auto',
+    },
+    'testimonial_thumbnail': {
+        'width': 80,
+        'height': 80,
+        'crop': 'fill',
+        'gravity': 'face',
+        'quality': 'auto',
+        'fetch_format': 'auto',
+    },
+    'testimonial_large': {
+        'width': 200,
+        'height': 200,
+        'crop': 'fill',
+        'gravity': 'face',
+        'quality': 'auto',
+        'fetch_format': 'auto',
+    },
 }
 
 # Configuration des permissions
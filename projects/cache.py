@@ -0,0 +1,144 @@
+"""
+Cache versionné pour les APIs JSON des projets.
+
+Chaque espace de noms (namespace) possède un compteur de génération qui est
+incrémenté par les signaux d'écriture (voir projects/signals.py). Les clés de
+cache incluent la génération courante : une seule écriture suffit donc à
+invalider toutes les réponses mises en cache pour cet espace de noms.
+
+Les payloads sont stockés déjà sérialisés (bytes JSON) avec leur ETag, ce qui
+évite toute reconstruction ou sérialisation lors d'un hit.
+"""
+
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+CACHE_KEY_PREFIX = "projects"
+
+# Espaces de noms disponibles
+PORTFOLIO_NAMESPACE = "portfolio"  # project_portfolio_api
+CATALOG_NAMESPACE = "catalog"  # clients_api, project_categories_api
+STATS_NAMESPACE = "stats"  # project_stats_api, tableau de bord de l'admin
+
+
+def get_cache_timeout():
+    """Durée de vie des payloads en cache (la génération assure l'invalidation)"""
+    return getattr(settings, "PROJECTS_API_CACHE_TIMEOUT", 60 * 60)
+
+
+def _generation_key(namespace):
+    return f"{CACHE_KEY_PREFIX}:{namespace}:generation"
+
+
+def _updated_at_key(namespace):
+    return f"{CACHE_KEY_PREFIX}:{namespace}:updated_at"
+
+
+def _seed_version():
+    """
+    Version initiale d'un compteur absent (premier accès ou éviction) : un
+    horodatage en millisecondes, supérieur aux versions déjà utilisées (moins
+    d'un incrément par milliseconde), si bien qu'un compteur évincé ne ressert
+    pas d'anciens payloads
+    """
+    return int(time.time() * 1000)
+
+
+def get_generation(namespace=PORTFOLIO_NAMESPACE):
+    """
+    Retourne la génération courante d'un espace de noms sous la forme
+    {"version": int, "updated_at": datetime}
+    """
+    key, updated_key = _generation_key(namespace), _updated_at_key(namespace)
+    values = cache.get_many([key, updated_key])
+    version, updated_at = values.get(key), values.get(updated_key)
+    if version is None:
+        # add() est atomique : si un autre processus a initialisé la clé
+        # entre-temps, on relit sa valeur
+        seed = _seed_version()
+        version = seed if cache.add(key, seed, None) else (cache.get(key) or seed)
+    if updated_at is None:
+        updated_at = timezone.now()
+        if not cache.add(updated_key, updated_at, None):
+            updated_at = cache.get(updated_key) or updated_at
+    return {"version": version, "updated_at": updated_at}
+
+
+def _bump(namespaces):
+    for namespace in namespaces:
+        key = _generation_key(namespace)
+        try:
+            # incr() est atomique sur les backends partagés (Redis, Memcached)
+            cache.incr(key)
+        except ValueError:
+            # Compteur absent : une nouvelle graine invalide déjà les anciennes clés
+            if not cache.add(key, _seed_version(), None):
+                cache.incr(key)
+        cache.set(_updated_at_key(namespace), timezone.now(), None)
+
+
+def bump_generation(*namespaces):
+    """
+    Incrémente la génération des espaces de noms donnés, après la validation
+    de la transaction en cours : une requête concurrente ne peut donc pas
+    mettre en cache des données non validées sous la nouvelle génération
+    """
+    namespaces = namespaces or (PORTFOLIO_NAMESPACE,)
+    transaction.on_commit(lambda: _bump(namespaces))
+
+
+def make_cache_key(namespace, key_parts):
+    """Construit la clé de cache d'un payload pour la génération courante"""
+    generation = get_generation(namespace)
+    digest = hashlib.md5(repr(tuple(key_parts)).encode("utf-8")).hexdigest()
+    return f"{CACHE_KEY_PREFIX}:{namespace}:v{generation['version']}:{digest}"
+
+
+def get_cached_payload(namespace, key_parts, build_payload):
+    """
+    Retourne l'entrée de cache {"body", "etag", "last_modified"} correspondant
+    aux paramètres normalisés `key_parts`, en appelant `build_payload()` pour la
+    construire en cas d'absence.
+    """
+    generation = get_generation(namespace)
+    key = make_cache_key(namespace, key_parts)
+    entry = cache.get(key)
+    if entry is None:
+        body = json.dumps(build_payload(), cls=DjangoJSONEncoder).encode("utf-8")
+        entry = {
+            "body": body,
+            "etag": f'"{hashlib.md5(body).hexdigest()}"',
+            "last_modified": generation["updated_at"],
+        }
+        cache.set(key, entry, get_cache_timeout())
+    return entry
+
+
+def cached_json_response(request, namespace, key_parts, build_payload):
+    """
+    Sert un payload JSON pré-sérialisé depuis le cache avec les en-têtes
+    ETag/Last-Modified, et répond 304 si le client possède déjà cette version.
+    """
+    entry = get_cached_payload(namespace, key_parts, build_payload)
+    last_modified = int(entry["last_modified"].timestamp())
+
+    response = HttpResponse(entry["body"], content_type="application/json")
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(last_modified)
+
+    return get_conditional_response(
+        request,
+        etag=entry["etag"],
+        last_modified=last_modified,
+        response=response,
+    )
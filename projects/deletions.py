@@ -0,0 +1,223 @@
+"""
+Suppression différée des images Cloudinary (boîte d'envoi).
+
+Les receivers pre_delete n'appellent plus Cloudinary : ils enregistrent les
+identifiants à supprimer dans la table CloudinaryDeletion, dans la transaction
+de suppression, et mettent en file la tâche "projects.flush_cloudinary_deletions".
+Cette tâche, exécutée après validation, supprime les images par lots de
+DELETE_BATCH_SIZE avec l'API `delete_resources` :
+
+- Déduplication : un identifiant n'est enregistré qu'une fois (contrainte
+  d'unicité), même si plusieurs suppressions le visent
+- Nouvelles tentatives : les lignes d'un lot en échec sont conservées avec leur
+  erreur et la tâche est retentée par la file (délai exponentiel) ; la commande
+  flush_cloudinary_deletions vide la boîte d'envoi à la demande
+- Une annulation de la transaction annule aussi les suppressions prévues
+"""
+
+import logging
+
+import cloudinary.api
+from django.apps import apps
+from django.db.models import F, Q
+from django.utils import timezone
+from tasks.queue import enqueue
+
+from .models import CloudinaryDeletion
+from .uploads import forget_uploads
+from .variants import VARIANT_SPECS
+
+logger = logging.getLogger(__name__)
+
+FLUSH_DELETIONS_TASK = "projects.flush_cloudinary_deletions"
+
+# Nombre maximal d'identifiants par appel à delete_resources
+DELETE_BATCH_SIZE = 100
+
+# Réponses de delete_resources pour lesquelles l'image n'existe plus
+DELETED_STATUSES = {"deleted", "not_found"}
+
+
+def _original_public_id(instance, field):
+    """public_id de l'original enregistré dans un CloudinaryField"""
+    value = getattr(instance, field)
+    if isinstance(value, str) and value:
+        value = instance._meta.get_field(field).to_python(value)
+    return getattr(value, "public_id", None) or ""
+
+
+def _spec_public_ids(spec, field, instance):
+    """
+    Identifiants de l'original (champ image et colonne de son identifiant,
+    seule renseignée après la génération des versions) et des versions
+    large/miniature, ces dernières préfixées par leur dossier d'envoi (voir
+    variants.upload_variants)
+    """
+    identifier = spec.identifier(instance)
+    return [
+        _original_public_id(instance, field),
+        getattr(instance, spec.public_id_field),
+        f"{spec.large_folder}/{identifier}_large",
+        f"{spec.thumb_folder}/{identifier}_thumb",
+    ]
+
+
+def image_public_ids(instance):
+    """Identifiants Cloudinary des images d'une instance"""
+    public_ids = []
+    for (label, field), spec in VARIANT_SPECS.items():
+        if label != instance._meta.label_lower:
+            continue
+        if getattr(instance, field) or getattr(instance, spec.public_id_field):
+            public_ids.extend(_spec_public_ids(spec, field, instance))
+    return public_ids
+
+
+# Champs lus par l'identifiant de chaque VariantSpec (voir referenced_public_ids)
+IDENTIFIER_FIELDS = {
+    "projects.project": ["slug"],
+    "projects.client": ["slug"],
+    "projects.projectimage": ["project__slug"],
+    "projects.projecttestimonial": ["project__slug"],
+}
+
+
+def referenced_public_ids(chunk_size=2000):
+    """
+    Ensemble des identifiants Cloudinary référencés par la base : originaux
+    (lus dans les champs image eux-mêmes, les colonnes d'identifiant n'étant
+    renseignées qu'après la génération des versions, jamais en mode versions
+    virtuelles) et versions. Chaque champ image est lu en une requête
+    parcourue par morceaux, limitée aux colonnes utilisées.
+    """
+    referenced = set()
+    for (label, field), spec in VARIANT_SPECS.items():
+        model = apps.get_model(label)
+        fields = IDENTIFIER_FIELDS[label]
+        queryset = (
+            model.objects.filter(
+                (Q(**{f"{field}__isnull": False}) & ~Q(**{field: ""}))
+                | (Q(**{f"{spec.public_id_field}__isnull": False}) & ~Q(**{spec.public_id_field: ""}))
+            )
+            .select_related(*{name.split("__")[0] for name in fields if "__" in name})
+            .only("pk", field, spec.public_id_field, *fields)
+            .order_by()
+        )
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            referenced.update(_spec_public_ids(spec, field, instance))
+    referenced.discard("")
+    referenced.discard(None)
+    return referenced
+
+
+def schedule_deletion(public_ids):
+    """
+    Enregistre des images à supprimer et met en file leur suppression, qui
+    n'a lieu qu'après validation de la transaction courante
+    """
+    public_ids = list(dict.fromkeys(public_id for public_id in public_ids if public_id))
+    if not public_ids:
+        return None
+    CloudinaryDeletion.objects.bulk_create(
+        [CloudinaryDeletion(public_id=public_id) for public_id in public_ids],
+        ignore_conflicts=True,
+    )
+    return enqueue(FLUSH_DELETIONS_TASK, idempotency_key=FLUSH_DELETIONS_TASK)
+
+
+def delete_public_ids(public_ids):
+    """
+    Supprime des images en un appel à delete_resources (DELETE_BATCH_SIZE
+    identifiants au plus) ; retourne (identifiants supprimés, erreur)
+    """
+    try:
+        result = cloudinary.api.delete_resources(list(public_ids), resource_type="image")
+    except Exception as e:
+        return [], str(e)
+    statuses = result.get("deleted", {})
+    done = [public_id for public_id in public_ids if statuses.get(public_id) in DELETED_STATUSES]
+    forget_uploads(done)
+    error = "" if len(done) == len(public_ids) else "Suppression non confirmée par Cloudinary"
+    return done, error
+
+
+def _field_public_ids(model, field, public_ids):
+    """
+    Identifiants de `public_ids` présents dans un CloudinaryField : la colonne
+    contient "image/upload/v<version>/<public_id>.<format>", elle est filtrée
+    par sous-chaîne puis relue en CloudinaryResource pour comparer exactement
+    """
+    contains = Q()
+    for public_id in public_ids:
+        contains |= Q(**{f"{field}__contains": public_id})
+    values = model.objects.filter(contains).values_list(field, flat=True)
+    return {value.public_id for value in values if value} & set(public_ids)
+
+
+def public_ids_in_use(public_ids):
+    """
+    Identifiants encore référencés par un champ image (original ou colonne de
+    son identifiant) : un original dédupliqué (voir projects/uploads.py) peut
+    être partagé par plusieurs lignes
+    """
+    public_ids = list(public_ids)
+    in_use = set()
+    if not public_ids:
+        return in_use
+    for (label, field), spec in VARIANT_SPECS.items():
+        model = apps.get_model(label)
+        in_use.update(
+            model.objects.filter(**{f"{spec.public_id_field}__in": public_ids})
+            .values_list(spec.public_id_field, flat=True)
+        )
+        in_use.update(_field_public_ids(model, field, public_ids))
+    return in_use
+
+
+def delete_batch(deletions):
+    """
+    Supprime un lot d'images de la boîte d'envoi en un appel ; retourne les
+    lignes en échec (les autres sont retirées de la boîte d'envoi, de même
+    que les images encore référencées, qui sont conservées)
+    """
+    in_use = public_ids_in_use([deletion.public_id for deletion in deletions])
+    if in_use:
+        CloudinaryDeletion.objects.filter(public_id__in=in_use).delete()
+        deletions = [deletion for deletion in deletions if deletion.public_id not in in_use]
+        if not deletions:
+            return []
+
+    done, error = delete_public_ids([deletion.public_id for deletion in deletions])
+    failed = [deletion for deletion in deletions if deletion.public_id not in done]
+
+    CloudinaryDeletion.objects.filter(public_id__in=done).delete()
+    if failed:
+        logger.error(f"Erreur lors de la suppression de {len(failed)} images Cloudinary: {error}")
+        CloudinaryDeletion.objects.filter(pk__in=[deletion.pk for deletion in failed]).update(
+            attempts=F("attempts") + 1,
+            last_error=error,
+            updated_at=timezone.now(),
+        )
+    for public_id in done:
+        logger.info(f"Image Cloudinary supprimée: {public_id}")
+    return failed
+
+
+def flush_deletions(queryset=None, batch_size=DELETE_BATCH_SIZE):
+    """
+    Supprime par lots les images de la boîte d'envoi (ou de `queryset`) ;
+    retourne (supprimées, en échec)
+    """
+    if queryset is None:
+        queryset = CloudinaryDeletion.objects.all()
+    deleted = failed = 0
+    last_pk = 0
+    while True:
+        batch = list(queryset.filter(pk__gt=last_pk).order_by("pk")[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        errors = delete_batch(batch)
+        deleted += len(batch) - len(errors)
+        failed += len(errors)
+    return deleted, failed
@@ -0,0 +1,361 @@
+"""
+Backends de génération des versions d'images (voir projects/variants.py).
+
+Un backend crée les versions d'une image (`create_variants`) et décrit
+l'original (`describe` : dimensions, poids, format, couleur dominante et
+aperçu LQIP). Le backend est choisi par le réglage PROJECTS_IMAGE_BACKEND :
+
+- CloudinaryBackend (par défaut) : chaque version est un envoi Cloudinary de
+  l'original avec une transformation ; l'original est décrit par sa réponse
+  d'envoi (registre des envois, voir projects/uploads.py) et l'aperçu LQIP
+  calculé à partir d'une version de quelques dizaines de pixels téléchargée
+- PillowBackend : les versions sont calculées localement avec Pillow à partir
+  des mêmes dictionnaires de transformation, dans un pool de processus, puis
+  enregistrées par l'API de stockage de Django (développement, CI,
+  déploiements sans accès réseau)
+"""
+
+import base64
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from urllib.request import urlopen
+
+import cloudinary.uploader
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from .models import UploadedImage
+
+DEFAULT_BACKEND = "projects.image_backends.CloudinaryBackend"
+
+# Largeur maximale de l'aperçu flou (LQIP) intégré en data URI
+PLACEHOLDER_SIZE = 16
+
+# Largeur de la version Cloudinary téléchargée pour calculer l'aperçu
+RENDITION_SIZE = 64
+
+
+def placeholder(image):
+    """
+    Couleur dominante ("#rrggbb") et aperçu LQIP (data URI WebP de quelques
+    centaines d'octets au plus) d'une image Pillow
+    """
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    color = "#{:02x}{:02x}{:02x}".format(*image.resize((1, 1), Image.BOX).getpixel((0, 0)))
+
+    preview = image.copy()
+    preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.BOX)
+    buffer = BytesIO()
+    preview.save(buffer, "WEBP", quality=40)
+    lqip = "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+    return color, lqip
+
+
+def image_metadata(width, height, size, image_format, preview):
+    """Métadonnées d'une image ; `preview` est une image Pillow (même réduite)"""
+    color, lqip = placeholder(preview)
+    return {
+        "width": width,
+        "height": height,
+        "bytes": size,
+        "format": (image_format or "").lower(),
+        "color": color,
+        "lqip": lqip,
+    }
+
+
+def dominant_color(result):
+    """Couleur dominante d'une réponse d'envoi, présente si l'envoi l'a demandée (colors)"""
+    colors = result.get("colors") or []
+    return result.get("color") or (colors[0][0].lower() if colors else "")
+
+
+def upload_metadata(result):
+    """
+    Métadonnées d'une image Cloudinary tirées de sa réponse d'envoi, sans
+    aperçu LQIP : il est ajouté par describe (tâche de génération ou commande
+    backfill_image_metadata), voir needs_metadata
+    """
+    return {
+        "width": result.get("width"),
+        "height": result.get("height"),
+        "bytes": result.get("bytes"),
+        "format": (result.get("format") or "").lower(),
+        "color": dominant_color(result),
+    }
+
+
+def rendition_placeholder(original):
+    """
+    Couleur dominante et aperçu LQIP (data URI) d'une image Cloudinary,
+    calculés à partir d'une version de RENDITION_SIZE pixels de large
+    """
+    url = original.build_url(width=RENDITION_SIZE, crop="scale", format="png", secure=True)
+    with urlopen(url, timeout=10) as response:
+        source = response.read()
+    with Image.open(BytesIO(source)) as image:
+        return placeholder(image)
+
+
+class BaseImageBackend:
+    """
+    Interface d'un backend : `create_variants` reçoit l'image originale et une
+    liste de versions {"folder", "public_id", "transformation"} et retourne
+    l'URL de chacune, dans le même ordre. Les erreurs sont propagées.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+
+    def create_variant(self, original, folder, public_id, transformation):
+        raise NotImplementedError
+
+    def create_variants(self, original, variants):
+        return [self.create_variant(original, **variant) for variant in variants]
+
+    def describe(self, original):
+        """Métadonnées de l'original (voir image_metadata)"""
+        raise NotImplementedError
+
+
+class CloudinaryBackend(BaseImageBackend):
+    """Envoie l'original à Cloudinary avec la transformation de chaque version"""
+
+    def create_variant(self, original, folder, public_id, transformation):
+        result = cloudinary.uploader.upload(
+            original.url,
+            folder=folder,
+            public_id=public_id,
+            transformation=transformation,
+            overwrite=True,
+        )
+        return result["secure_url"]
+
+    def describe(self, original):
+        # Réponse enregistrée par le registre des envois ; à défaut (image
+        # envoyée hors registre), explicit renvoie la réponse d'envoi d'une
+        # image existante. Seul l'aperçu est calculé à partir d'un téléchargement.
+        uploaded = (
+            UploadedImage.objects.filter(public_id=original.public_id)
+            .exclude(width=None)
+            .values("width", "height", "bytes", "format", "color")
+            .first()
+        )
+        result = uploaded or cloudinary.uploader.explicit(
+            original.public_id, type="upload", resource_type="image", colors=True
+        )
+        metadata = upload_metadata(result)
+        color, metadata["lqip"] = rendition_placeholder(original)
+        metadata["color"] = metadata["color"] or color
+        return metadata
+
+
+# ===============================
+# BACKEND LOCAL (PILLOW)
+# ===============================
+
+# Centrage du recadrage "fill" selon la gravité Cloudinary ; sans détection de
+# visage, "face" privilégie le haut de l'image
+GRAVITY_CENTERING = {
+    "north": (0.5, 0.0),
+    "south": (0.5, 1.0),
+    "east": (1.0, 0.5),
+    "west": (0.0, 0.5),
+    "face": (0.5, 0.35),
+}
+
+# Extension et format Pillow des formats de sortie
+OUTPUT_FORMATS = {
+    "webp": ("webp", "WEBP"),
+    "avif": ("avif", "AVIF"),
+    "jpg": ("jpg", "JPEG"),
+    "jpeg": ("jpg", "JPEG"),
+    "png": ("png", "PNG"),
+}
+
+DEFAULT_QUALITY = 80
+
+
+def _flatten(transformation):
+    """Fusionne une transformation chaînée ([{...}, {...}]) en un seul dictionnaire"""
+    if isinstance(transformation, dict):
+        return dict(transformation)
+    options = {}
+    for step in transformation:
+        options.update(step)
+    return options
+
+
+def _resize(image, width, height, crop, gravity):
+    if not width and not height:
+        return image
+
+    if crop == "fill" and width and height:
+        centering = GRAVITY_CENTERING.get(gravity, (0.5, 0.5))
+        return ImageOps.fit(image, (width, height), Image.LANCZOS, centering=centering)
+
+    box = (width or image.width * height // image.height, height or image.height * width // image.width)
+    if crop == "limit":
+        # Réduction seulement, proportions conservées
+        image = image.copy()
+        image.thumbnail(box, Image.LANCZOS)
+        return image
+    if crop == "fit":
+        return ImageOps.contain(image, box, Image.LANCZOS)
+    return image.resize(box, Image.LANCZOS)
+
+
+def render_variant(source, transformation, default_format, default_quality=DEFAULT_QUALITY):
+    """
+    Calcule une version à partir des octets de l'original ; retourne
+    (extension, octets). Exécutée dans les processus du pool.
+    """
+    options = _flatten(transformation)
+
+    output = options.get("fetch_format") or options.get("format") or "auto"
+    if output == "auto":
+        output = default_format
+    extension, pillow_format = OUTPUT_FORMATS[output]
+
+    quality = options.get("quality", "auto")
+    quality = default_quality if quality == "auto" else int(quality)
+
+    with Image.open(BytesIO(source)) as image:
+        image = ImageOps.exif_transpose(image)
+        image = _resize(
+            image,
+            options.get("width"),
+            options.get("height"),
+            options.get("crop", "scale"),
+            options.get("gravity"),
+        )
+        if pillow_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA")
+
+        buffer = BytesIO()
+        image.save(buffer, pillow_format, quality=quality)
+    return extension, buffer.getvalue()
+
+
+class PillowBackend(BaseImageBackend):
+    """
+    Calcule les versions avec Pillow et les enregistre par l'API de stockage.
+
+    Options : `storage` (classe de stockage, default: FileSystemStorage, soit
+    MEDIA_ROOT), `storage_options` (arguments de cette classe),
+    `format` (webp, avif, jpg ; utilisé pour fetch_format "auto", default: webp),
+    `workers` (taille du pool de processus, 0 pour calculer dans le processus
+    courant, default: nombre de processeurs)
+    """
+
+    def __init__(
+        self,
+        storage="django.core.files.storage.FileSystemStorage",
+        storage_options=None,
+        format="webp",
+        workers=None,
+        **options,
+    ):
+        super().__init__(**options)
+        self.storage = import_string(storage)(**(storage_options or {}))
+        self.format = format
+        self.workers = os.cpu_count() if workers is None else workers
+        self._pool = None
+
+        if format not in OUTPUT_FORMATS:
+            raise ImproperlyConfigured(f"Format d'image non pris en charge: {format}")
+        if format == "avif":
+            Image.init()
+            try:
+                import pillow_avif  # noqa: F401 (enregistre le format AVIF)
+            except ImportError:
+                if "AVIF" not in Image.SAVE:
+                    raise ImproperlyConfigured(
+                        "Le format AVIF nécessite pillow-avif-plugin ou Pillow >= 11.2"
+                    )
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def read_source(self, original):
+        """Octets de l'image originale (fichier, URL ou nom dans le stockage)"""
+        if hasattr(original, "read"):
+            original.seek(0)
+            return original.read()
+
+        url = original if isinstance(original, str) else original.url
+        if url.startswith(("http://", "https://")):
+            with urlopen(url, timeout=30) as response:
+                return response.read()
+
+        base_url = getattr(self.storage, "base_url", None)
+        if base_url and url.startswith(base_url):
+            url = url[len(base_url):]
+        with self.storage.open(url) as source:
+            return source.read()
+
+    def create_variant(self, original, folder, public_id, transformation):
+        return self.create_variants(
+            original, [{"folder": folder, "public_id": public_id, "transformation": transformation}]
+        )[0]
+
+    def create_variants(self, original, variants):
+        source = self.read_source(original)
+
+        # Redimensionnement (CPU) en parallèle dans le pool de processus
+        if self.workers:
+            rendered = list(
+                self.pool.map(
+                    render_variant,
+                    [source] * len(variants),
+                    [variant["transformation"] for variant in variants],
+                    [self.format] * len(variants),
+                )
+            )
+        else:
+            rendered = [
+                render_variant(source, variant["transformation"], self.format)
+                for variant in variants
+            ]
+
+        urls = []
+        for variant, (extension, content) in zip(variants, rendered):
+            name = f"{variant['folder']}/{variant['public_id']}.{extension}"
+            # Équivalent de overwrite=True
+            if self.storage.exists(name):
+                self.storage.delete(name)
+            name = self.storage.save(name, ContentFile(content))
+            urls.append(self.storage.url(name))
+        return urls
+
+    def describe(self, original):
+        source = self.read_source(original)
+        with Image.open(BytesIO(source)) as image:
+            width, height = ImageOps.exif_transpose(image).size
+            return image_metadata(width, height, len(source), image.format, image)
+
+
+@functools.lru_cache(maxsize=None)
+def get_backend():
+    """Backend configuré par PROJECTS_IMAGE_BACKEND (instance partagée)"""
+    config = getattr(settings, "PROJECTS_IMAGE_BACKEND", {})
+    backend_class = import_string(config.get("BACKEND", DEFAULT_BACKEND))
+    return backend_class(**config.get("OPTIONS", {}))
+
+
+@receiver(setting_changed)
+def reset_backend(setting, **kwargs):
+    if setting == "PROJECTS_IMAGE_BACKEND":
+        get_backend.cache_clear()
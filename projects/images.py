@@ -0,0 +1,313 @@
+"""
+Résolution mémorisée des URL d'images Cloudinary.
+
+Le descripteur ImageURLs remplace les propriétés *_urls des modèles : le
+dictionnaire {"original", "large", "thumbnail"} n'est construit qu'une fois par
+instance tant que les champs sources ne changent pas. Il est aussi enregistré
+dans la colonne JSON `resolved_image_urls` du modèle, si bien qu'une instance
+chargée depuis la base ne construit plus aucune URL Cloudinary.
+
+Chaque entrée est associée à une clé dérivée des valeurs des champs sources
+(public_id, version, format) : une entrée dont la clé ne correspond plus aux
+champs est ignorée et recalculée.
+
+Les versions générées par un backend (voir projects/image_backends.py) sont
+des URL, enregistrées dans la colonne JSON `image_variants` et non dans les
+CloudinaryField *_large/*_thumbnail, qui ne peuvent relire qu'un identifiant
+Cloudinary. Ces champs restent réservés aux versions envoyées à la main et
+ont priorité sur les versions générées.
+
+Versions virtuelles (PROJECTS_VIRTUAL_IMAGE_VARIANTS) : les versions large et
+miniature ne sont plus des copies envoyées à Cloudinary mais des URL de
+transformation de l'original, construites à partir des préréglages nommés de
+admin_config.IMAGE_TRANSFORMATIONS. Les préréglages utilisés font partie de la
+clé, si bien que changer de mode invalide les entrées enregistrées.
+
+Le descripteur ResponsiveImage fonctionne de la même façon et fournit les
+attributs d'une image responsive (src, srcset, width, height) : une échelle de
+largeurs (PROJECTS_RESPONSIVE_WIDTHS) transformées par Cloudinary avec
+f_auto,q_auto, complétée par les métadonnées de l'original (dimensions,
+couleur dominante, aperçu LQIP) quand elles correspondent à l'image actuelle.
+"""
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+from .admin_config import IMAGE_TRANSFORMATIONS
+
+RESOLVED_URLS_FIELD = "resolved_image_urls"
+
+# Colonne JSON des métadonnées d'images (voir projects/variants.py) :
+# {champ: {"width", "height", "bytes", "format", "color", "lqip", "source"}}
+METADATA_FIELD = "image_metadata"
+
+# Colonne JSON des versions générées (voir projects/variants.py) :
+# {champ: {"large", "thumbnail", "source"}}
+VARIANTS_FIELD = "image_variants"
+
+_MEMO_ATTRIBUTE = "_image_urls_memo"
+
+
+def virtual_variants_enabled():
+    """Les versions sont-elles dérivées de l'original par transformation d'URL ?"""
+    return getattr(settings, "PROJECTS_VIRTUAL_IMAGE_VARIANTS", False)
+
+
+def source_key(value):
+    """Représentation stable d'une valeur de CloudinaryField"""
+    if not value:
+        return ""
+    if hasattr(value, "get_prep_value"):
+        return value.get_prep_value() or ""
+    return str(value)
+
+
+def current_variants(original, variants, field):
+    """Versions générées d'un champ, si elles ont été créées à partir de l'original actuel"""
+    entry = (variants or {}).get(field) or {}
+    return entry if original and entry.get("source") == source_key(original) else {}
+
+
+class ImageDescriptor:
+    """
+    Base des descripteurs mémorisés : la valeur calculée à partir de `fields`
+    est conservée par instance et enregistrée dans `resolved_image_urls`
+    """
+
+    fields = ()
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def cache_key(self, values):
+        return [source_key(value) for value in values]
+
+    def compute(self, values):
+        raise NotImplementedError
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        # Lecture directe de __dict__ : un champ différé ne déclenche pas de requête
+        values = [instance.__dict__.get(field) for field in self.fields]
+        values = [
+            instance._meta.get_field(field).to_python(value)
+            if isinstance(value, str) and value
+            else value
+            for field, value in zip(self.fields, values)
+        ]
+        key = self.cache_key(values)
+
+        memo = instance.__dict__.setdefault(_MEMO_ATTRIBUTE, {})
+        entry = memo.get(self.name)
+        if entry is None:
+            entry = (instance.__dict__.get(RESOLVED_URLS_FIELD) or {}).get(self.name)
+        if entry is not None and entry["key"] == key:
+            memo[self.name] = entry
+            return entry["urls"]
+
+        entry = {"key": key, "urls": self.compute(values)}
+        memo[self.name] = entry
+        return entry["urls"]
+
+
+class ImageURLs(ImageDescriptor):
+    """
+    Descripteur retournant les URL des versions d'une image à partir de trois
+    champs : l'original, la version large et la miniature, complétés par les
+    versions générées (colonne `image_variants`) puis par l'original.
+    `presets` nomme les préréglages (large, miniature) utilisés en mode
+    versions virtuelles.
+    """
+
+    def __init__(self, original, large, thumbnail, presets=None):
+        self.fields = (original, large, thumbnail, VARIANTS_FIELD)
+        self.presets = presets
+        self.name = None
+
+    @property
+    def virtual(self):
+        return bool(self.presets) and virtual_variants_enabled()
+
+    def _generated(self, values):
+        return current_variants(values[0], values[3], self.fields[0])
+
+    def cache_key(self, values):
+        generated = self._generated(values)
+        key = super().cache_key(values[:3]) + [
+            generated.get("large", ""),
+            generated.get("thumbnail", ""),
+        ]
+        if self.virtual:
+            key.append("|".join(self.presets))
+        return key
+
+    def compute(self, values):
+        if self.virtual:
+            return self.build_virtual(values[0], *self.presets)
+        return self.build(*values[:3], generated=self._generated(values))
+
+    @staticmethod
+    def build(original, large, thumbnail, generated=None):
+        """Construit les URL à partir des valeurs des trois champs et des versions générées"""
+        generated = generated or {}
+        urls = {"original": "", "large": "", "thumbnail": ""}
+
+        if original:
+            urls["original"] = original.url
+
+        if large:
+            urls["large"] = large.url
+        else:
+            urls["large"] = generated.get("large") or urls["original"]
+
+        if thumbnail:
+            urls["thumbnail"] = thumbnail.url
+        else:
+            urls["thumbnail"] = generated.get("thumbnail") or urls["original"]
+
+        return urls
+
+    @staticmethod
+    def build_virtual(original, large_preset, thumbnail_preset):
+        """Construit les URL des versions par transformation de l'original"""
+        if not original:
+            return {"original": "", "large": "", "thumbnail": ""}
+        return {
+            "original": original.url,
+            "large": original.build_url(**IMAGE_TRANSFORMATIONS[large_preset]),
+            "thumbnail": original.build_url(**IMAGE_TRANSFORMATIONS[thumbnail_preset]),
+        }
+
+
+def responsive_widths():
+    """Échelle de largeurs des srcset (PROJECTS_RESPONSIVE_WIDTHS)"""
+    return list(getattr(settings, "PROJECTS_RESPONSIVE_WIDTHS", [320, 640, 960, 1280, 1920]))
+
+
+class ResponsiveImage(ImageDescriptor):
+    """
+    Descripteur retournant {"src", "srcset", "width", "height", "color",
+    "lqip"} pour un champ image : une URL Cloudinary par largeur de l'échelle (plafonnée à
+    `max_width`), au format et à la qualité automatiques. Avec `aspect_ratio`
+    ("3:2"), l'image est recadrée (`crop`) et sa hauteur intrinsèque est connue,
+    ce qui évite les décalages de mise en page. Sinon les dimensions viennent
+    des métadonnées de l'image, qui fournissent aussi "color" et "lqip".
+    """
+
+    def __init__(self, field, max_width=None, aspect_ratio=None, crop="limit", gravity=None):
+        self.fields = (field, METADATA_FIELD)
+        self.max_width = max_width
+        self.aspect_ratio = aspect_ratio
+        self.crop = crop
+        self.gravity = gravity
+        self.name = None
+
+    def widths(self):
+        widths = responsive_widths()
+        if self.max_width:
+            widths = [width for width in widths if width < self.max_width] + [self.max_width]
+        return widths
+
+    def transformation(self):
+        transformation = {"crop": self.crop, "quality": "auto", "fetch_format": "auto"}
+        if self.aspect_ratio:
+            transformation["aspect_ratio"] = self.aspect_ratio
+        if self.gravity:
+            transformation["gravity"] = self.gravity
+        return transformation
+
+    def _metadata(self, values):
+        """Métadonnées du champ, si elles décrivent bien l'image actuelle"""
+        original, metadata = values
+        if not original:
+            return {}
+        entry = (metadata or {}).get(self.fields[0]) or {}
+        return entry if entry.get("source") == source_key(original) else {}
+
+    def cache_key(self, values):
+        # Clé comparée à sa version JSON enregistrée : listes uniquement
+        return [source_key(values[0]), self._metadata(values).get("source", "")] + [
+            self.widths(),
+            [[name, value] for name, value in sorted(self.transformation().items())],
+        ]
+
+    def compute(self, values):
+        original = values[0]
+        metadata = self._metadata(values)
+        image = {
+            "src": "",
+            "srcset": "",
+            "width": metadata.get("width"),
+            "height": metadata.get("height"),
+            "color": metadata.get("color", ""),
+            "lqip": metadata.get("lqip", ""),
+        }
+        if not original:
+            return image
+
+        widths = self.widths()
+        transformation = self.transformation()
+        urls = [original.build_url(width=width, **transformation) for width in widths]
+
+        image["src"] = urls[-1]
+        image["srcset"] = ", ".join(f"{url} {width}w" for url, width in zip(urls, widths))
+        if self.aspect_ratio:
+            ratio_width, ratio_height = (float(part) for part in self.aspect_ratio.split(":"))
+            image["width"] = widths[-1]
+            image["height"] = round(widths[-1] * ratio_height / ratio_width)
+        return image
+
+
+def image_url_descriptors(model):
+    """Descripteurs mémorisés (ImageURLs, ResponsiveImage) déclarés sur un modèle"""
+    return [
+        value
+        for klass in reversed(model.__mro__)
+        for value in vars(klass).values()
+        if isinstance(value, ImageDescriptor)
+    ]
+
+
+def resolve_image_urls(instance):
+    """
+    Résout toutes les URL d'images d'une instance et les place dans sa colonne
+    `resolved_image_urls` (à enregistrer par l'appelant)
+    """
+    resolved = {}
+    for descriptor in image_url_descriptors(type(instance)):
+        # Un fichier pas encore envoyé à Cloudinary n'a pas d'URL
+        if any(
+            isinstance(instance.__dict__.get(field), UploadedFile)
+            for field in descriptor.fields
+        ):
+            continue
+        descriptor.__get__(instance)
+        resolved[descriptor.name] = instance.__dict__[_MEMO_ATTRIBUTE][descriptor.name]
+    setattr(instance, RESOLVED_URLS_FIELD, resolved)
+    return resolved
+
+
+def backfill_resolved_image_urls(model, batch_size=500, using="default", only_missing=True):
+    """
+    Enregistre les URL résolues des instances qui n'en ont pas encore (ou de
+    toutes les instances si `only_missing` est faux)
+    """
+    queryset = model.objects.using(using)
+    if only_missing:
+        queryset = queryset.filter(**{RESOLVED_URLS_FIELD: {}})
+
+    pending = []
+    updated = 0
+    for instance in queryset.iterator():
+        resolve_image_urls(instance)
+        pending.append(instance)
+        if len(pending) >= batch_size:
+            model.objects.using(using).bulk_update(pending, [RESOLVED_URLS_FIELD])
+            updated += len(pending)
+            pending = []
+    if pending:
+        model.objects.using(using).bulk_update(pending, [RESOLVED_URLS_FIELD])
+        updated += len(pending)
+    return updated
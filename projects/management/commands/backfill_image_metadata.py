@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from projects import variants
+from projects.images import resolve_image_urls
+from projects.image_backends import get_backend
+from projects.signals import refresh_after_bulk_update
+import logging
+
+logger = logging.getLogger(__name__)
+
+MODEL_CHOICES = {
+    'project': 'projects.project',
+    'client': 'projects.client',
+    'testimonial': 'projects.projecttestimonial',
+    'projectimage': 'projects.projectimage',
+}
+
+
+class Command(BaseCommand):
+    help = 'Renseigne les métadonnées (dimensions, poids, format, couleur, aperçu LQIP) des images existantes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            type=str,
+            choices=[*MODEL_CHOICES, 'all'],
+            default='all',
+            help='Spécifie quel modèle traiter (default: all)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Recalcule les métadonnées même si elles sont à jour'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Nombre d\'images décrites en parallèle (default: 4)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Nombre d\'images enregistrées par bulk_update (default: 100)'
+        )
+
+    def handle(self, *args, **options):
+        model_choice = options['model']
+        force = options['force']
+        batch_size = max(options['batch_size'], 1)
+        backend = get_backend()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'🚀 Début de la capture des métadonnées d\'images pour: {model_choice}')
+        )
+
+        processed = failed = 0
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as executor:
+            for label, field in variants.VARIANT_SPECS:
+                if model_choice != 'all' and MODEL_CHOICES[model_choice] != label:
+                    continue
+                model = apps.get_model(label)
+                ok, ko = self.capture(executor, backend, model, field, force, batch_size)
+                processed += ok
+                failed += ko
+
+        self.stdout.write(f'📊 {processed} images décrites, {failed} erreurs')
+        self.stdout.write(
+            self.style.SUCCESS('✅ Capture des métadonnées terminée!')
+        )
+
+    def capture(self, executor, backend, model, field, force, batch_size):
+        """Décrit les images d'un champ ; retourne (réussies, échouées)"""
+        queryset = (
+            model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''}).order_by('pk')
+        )
+        self.stdout.write(f'🖼️  {model._meta.verbose_name_plural} ({field})')
+
+        processed = failed = 0
+        for batch in self.batches(queryset, field, force, batch_size):
+            futures = [
+                (instance, executor.submit(variants.capture_metadata, instance, field, backend))
+                for instance in batch
+            ]
+
+            # Les échecs sont enregistrés aussi : ils ne sont retentés que par cette commande
+            for instance, future in futures:
+                metadata = future.result()
+                resolve_image_urls(instance)
+                if 'error' in metadata:
+                    self.stdout.write(
+                        self.style.ERROR(f'   ❌ Erreur pour {instance}: {metadata["error"]}')
+                    )
+                    logger.error(f'Erreur de capture des métadonnées pour {instance}: {metadata["error"]}')
+                    failed += 1
+                else:
+                    processed += 1
+
+            model.objects.bulk_update(batch, [variants.METADATA_FIELD, 'resolved_image_urls'])
+            refresh_after_bulk_update(model, [instance.pk for instance in batch])
+            self.stdout.write(f'   ✅ [{processed + failed}]')
+
+        return processed, failed
+
+    @staticmethod
+    def batches(queryset, field, force, batch_size):
+        """Lots d'instances à décrire, lues par morceaux (iterator)"""
+        batch = []
+        for instance in queryset.iterator(chunk_size=batch_size):
+            if not (force or variants.needs_metadata(instance, field, retry_errors=True)):
+                continue
+            batch.append(instance)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
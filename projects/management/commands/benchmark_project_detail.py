@@ -0,0 +1,80 @@
+import time
+
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from projects.models import Project
+from projects.views import ProjectDetailView
+
+
+class Command(BaseCommand):
+    help = 'Mesure le temps de rendu de la page projet sans et avec les fragments en cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'slug',
+            nargs='?',
+            help='Slug du projet à mesurer (default: premier projet publié)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=50,
+            help='Nombre de rendus par mesure (default: 50)'
+        )
+
+    def handle(self, *args, **options):
+        slug = options['slug']
+        iterations = max(options['iterations'], 1)
+
+        if not slug:
+            slug = Project.objects.filter(is_published=True).values_list('slug', flat=True).first()
+            if not slug:
+                raise CommandError('Aucun projet publié à mesurer')
+
+        view = ProjectDetailView.as_view()
+        request = RequestFactory().get(f'/projects/{slug}/')
+
+        fragment_keys = []
+
+        def render():
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = view(request, slug=slug)
+                response.render()
+                elapsed = time.perf_counter() - start
+            context = response.context_data
+            fragment_keys[:] = [
+                make_template_fragment_key(f'project_{name}', [context['project'].pk, version])
+                for name, version in context['fragment_versions'].items()
+            ]
+            return elapsed, len(queries)
+
+        self.stdout.write(f'⏱️  Rendu de "{slug}" ({iterations} itérations)')
+
+        # Sans cache : les fragments sont reconstruits à chaque rendu ; seules
+        # leurs clés, connues après un premier rendu, sont supprimées (le cache
+        # est partagé avec les sessions)
+        render()
+        cold = []
+        for _ in range(iterations):
+            cache.delete_many(fragment_keys)
+            cold.append(render())
+
+        # Avec cache : un premier rendu remplit les fragments
+        render()
+        warm = [render() for _ in range(iterations)]
+
+        for label, results in (('Sans cache', cold), ('Avec cache', warm)):
+            average_ms = sum(elapsed for elapsed, _ in results) / len(results) * 1000
+            queries = results[-1][1]
+            self.stdout.write(f'   📊 {label}: {average_ms:.2f} ms/rendu, {queries} requêtes')
+
+        cold_ms = sum(elapsed for elapsed, _ in cold)
+        warm_ms = sum(elapsed for elapsed, _ in warm)
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Gain: x{cold_ms / warm_ms:.1f}')
+        )
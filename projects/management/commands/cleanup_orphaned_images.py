@@ -1,11 +1,18 @@
+from datetime import timedelta
+
 from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import cloudinary.api
-import cloudinary.uploader
-from projects.models import Project, ProjectImage, ProjectTestimonial, Client
+from projects.deletions import DELETE_BATCH_SIZE, delete_public_ids, referenced_public_ids
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Taille maximale d'une page de l'API resources
+PAGE_SIZE = 500
+
 
 class Command(BaseCommand):
     help = 'Nettoie les images orphelines sur Cloudinary'
@@ -21,15 +28,23 @@ class Command(BaseCommand):
             type=str,
             help='Spécifie un dossier spécifique à nettoyer'
         )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=60,
+            help='Ignore les images envoyées depuis moins de N minutes (default: 60)'
+        )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         folder = options['folder']
-        
+        # Un envoi récent peut ne pas encore être enregistré en base
+        self.uploaded_before = timezone.now() - timedelta(minutes=max(options['min_age'], 0))
+
         self.stdout.write(
             self.style.SUCCESS('🧹 Début du nettoyage des images orphelines sur Cloudinary')
         )
-        
+
         if dry_run:
             self.stdout.write(
                 self.style.WARNING('⚠️  Mode DRY-RUN: Aucune suppression ne sera effectuée')
@@ -37,99 +52,104 @@ class Command(BaseCommand):
 
         folders_to_check = [
             'projects/featured',
-            'projects/gallery', 
+            'projects/gallery',
             'clients/logos',
             'testimonials'
         ] if not folder else [folder]
 
+        # Identifiants utilisés, collectés une seule fois pour tous les dossiers
+        self.used_public_ids = referenced_public_ids()
+        self.stdout.write(f'🔗 {len(self.used_public_ids)} identifiants référencés en base')
+
+        totals = {'scanned': 0, 'orphaned': 0, 'deleted': 0, 'errors': 0, 'bytes': 0}
         for folder_path in folders_to_check:
-            self.cleanup_folder(folder_path, dry_run)
+            for key, value in self.cleanup_folder(folder_path, dry_run).items():
+                totals[key] += value
 
+        verb = 'seraient libérés' if dry_run else 'libérés'
+        self.stdout.write(
+            f"📊 {totals['scanned']} images parcourues, {totals['orphaned']} orphelines, "
+            f"{totals['deleted']} supprimées, {totals['errors']} erreurs, "
+            f"{filesizeformat(totals['bytes'])} {verb}"
+        )
         self.stdout.write(
             self.style.SUCCESS('✅ Nettoyage terminé!')
         )
 
+    def iter_resources(self, folder_path):
+        """Parcourt toutes les images d'un dossier, page par page (next_cursor)"""
+        cursor = None
+        while True:
+            params = {'type': 'upload', 'prefix': folder_path, 'max_results': PAGE_SIZE}
+            if cursor:
+                params['next_cursor'] = cursor
+            page = cloudinary.api.resources(**params)
+            yield from page['resources']
+            cursor = page.get('next_cursor')
+            if not cursor:
+                return
+
+    def is_orphaned(self, resource):
+        if resource['public_id'] in self.used_public_ids:
+            return False
+        created_at = parse_datetime(resource.get('created_at') or '')
+        return created_at is None or created_at < self.uploaded_before
+
     def cleanup_folder(self, folder_path, dry_run=False):
-        """Nettoie un dossier spécifique"""
+        """
+        Nettoie un dossier spécifique ; seules les images d'une page et le lot
+        d'orphelines en cours sont gardés en mémoire
+        """
         self.stdout.write(f'📁 Vérification du dossier: {folder_path}')
-        
+        stats = {'scanned': 0, 'orphaned': 0, 'deleted': 0, 'errors': 0, 'bytes': 0}
+        batch = {}
+
         try:
-            # Récupérer toutes les images du dossier
-            resources = cloudinary.api.resources(
-                type="upload",
-                prefix=folder_path,
-                max_results=500
-            )
-            
-            total_images = len(resources['resources'])
-            self.stdout.write(f'   {total_images} images trouvées')
-            
-            if total_images == 0:
-                return
-            
-            # Collecter les public_ids utilisés dans la base de données
-            used_public_ids = set()
-            
-            # Projects
-            for project in Project.objects.all():
-                if project.featured_image_cloudinary_public_id:
-                    used_public_ids.add(project.featured_image_cloudinary_public_id)
-                    used_public_ids.add(f"{project.slug}_large")
-                    used_public_ids.add(f"{project.slug}_thumb")
-            
-            # Project Images
-            for img in ProjectImage.objects.all():
-                if img.image_cloudinary_public_id:
-                    used_public_ids.add(img.image_cloudinary_public_id)
-                    used_public_ids.add(f"{img.project.slug}_gallery_{img.id}_large")
-                    used_public_ids.add(f"{img.project.slug}_gallery_{img.id}_thumb")
-            
-            # Clients
-            for client in Client.objects.all():
-                if client.logo_cloudinary_public_id:
-                    used_public_ids.add(client.logo_cloudinary_public_id)
-                    used_public_ids.add(f"{client.slug}_logo_large")
-                    used_public_ids.add(f"{client.slug}_logo_thumb")
-                
-                if client.logo_white_cloudinary_public_id:
-                    used_public_ids.add(client.logo_white_cloudinary_public_id)
-                    used_public_ids.add(f"{client.slug}_logo_white_large")
-                    used_public_ids.add(f"{client.slug}_logo_white_thumb")
-            
-            # Testimonials
-            for testimonial in ProjectTestimonial.objects.all():
-                if testimonial.client_photo_cloudinary_public_id:
-                    used_public_ids.add(testimonial.client_photo_cloudinary_public_id)
-                    used_public_ids.add(f"{testimonial.project.slug}_testimonial_large")
-                    used_public_ids.add(f"{testimonial.project.slug}_testimonial_thumb")
-            
-            # Identifier les images orphelines
-            orphaned_images = []
-            for resource in resources['resources']:
-                public_id = resource['public_id']
-                if public_id not in used_public_ids:
-                    orphaned_images.append(public_id)
-            
-            orphaned_count = len(orphaned_images)
-            self.stdout.write(f'   {orphaned_count} images orphelines trouvées')
-            
-            if orphaned_count == 0:
-                return
-            
-            # Afficher ou supprimer les images orphelines
-            for i, public_id in enumerate(orphaned_images, 1):
-                if dry_run:
-                    self.stdout.write(f'   🗑️  [{i}/{orphaned_count}] SERAIT SUPPRIMÉ: {public_id}')
-                else:
-                    try:
-                        cloudinary.uploader.destroy(public_id, resource_type="image")
-                        self.stdout.write(f'   ✅ [{i}/{orphaned_count}] SUPPRIMÉ: {public_id}')
-                    except Exception as e:
-                        self.stdout.write(
-                            self.style.ERROR(f'   ❌ [{i}/{orphaned_count}] ERREUR pour {public_id}: {str(e)}')
-                        )
-            
+            for resource in self.iter_resources(folder_path):
+                stats['scanned'] += 1
+                if stats['scanned'] % PAGE_SIZE == 0:
+                    self.stdout.write(
+                        f"   ⏳ {stats['scanned']} images parcourues, {stats['orphaned']} orphelines"
+                    )
+                if not self.is_orphaned(resource):
+                    continue
+
+                stats['orphaned'] += 1
+                batch[resource['public_id']] = resource.get('bytes', 0)
+                if len(batch) >= DELETE_BATCH_SIZE:
+                    self.delete_orphans(batch, stats, dry_run)
+                    batch = {}
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f'Erreur lors du nettoyage du dossier {folder_path}: {str(e)}')
             )
+
+        # Les orphelines déjà trouvées sont traitées même après une erreur de parcours
+        if batch:
+            self.delete_orphans(batch, stats, dry_run)
+
+        self.stdout.write(
+            f"   {stats['scanned']} images trouvées, {stats['orphaned']} images orphelines"
+        )
+        return stats
+
+    def delete_orphans(self, orphans, stats, dry_run):
+        """Supprime un lot d'images orphelines {public_id: octets} en un appel"""
+        if dry_run:
+            for public_id in orphans:
+                self.stdout.write(f'   🗑️  SERAIT SUPPRIMÉ: {public_id}')
+            stats['bytes'] += sum(orphans.values())
+            return
+
+        deleted, error = delete_public_ids(list(orphans))
+        stats['deleted'] += len(deleted)
+        stats['bytes'] += sum(orphans[public_id] for public_id in deleted)
+        self.stdout.write(f'   ✅ {len(deleted)} images supprimées')
+
+        failed = len(orphans) - len(deleted)
+        if failed:
+            stats['errors'] += failed
+            self.stdout.write(
+                self.style.ERROR(f'   ❌ {failed} images non supprimées: {error}')
+            )
+            logger.error(f'Erreur lors de la suppression des images orphelines: {error}')
@@ -6,7 +6,7 @@ from django.core.management.base import BaseCommand
 from django.utils.text import slugify
 from django.core.files import File
 from django.utils import timezone
-from cloudinary.uploader import upload
+from projects.uploads import upload_image
 from projects.models import Project, Client, ProjectCategory, ProjectStatus
 import logging
 
@@ -214,8 +214,8 @@ class Command(BaseCommand):
 
                 # Télécharger l'image sur Cloudinary
                 with open(image_path, "rb") as img_file:
-                    # Upload vers Cloudinary
-                    upload_result = upload(
+                    # Upload vers Cloudinary (réutilisée si déjà envoyée lors d'une exécution précédente)
+                    upload_result = upload_image(
                         img_file,
                         folder="projects/featured/original",
                         public_id=f"{slug}_original",
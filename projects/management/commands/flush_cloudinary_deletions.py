@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from projects.deletions import DELETE_BATCH_SIZE, flush_deletions
+from projects.models import CloudinaryDeletion
+
+
+class Command(BaseCommand):
+    help = 'Supprime de Cloudinary les images en attente dans la boîte d\'envoi'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DELETE_BATCH_SIZE,
+            help=f'Nombre d\'images par appel à delete_resources (default: {DELETE_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = min(max(options['batch_size'], 1), DELETE_BATCH_SIZE)
+
+        pending = CloudinaryDeletion.objects.count()
+        self.stdout.write(f'🗑️  {pending} images en attente de suppression')
+
+        deleted, failed = flush_deletions(batch_size=batch_size)
+
+        self.stdout.write(f'📊 {deleted} images supprimées, {failed} erreurs')
+        if failed:
+            self.stdout.write(
+                self.style.WARNING('⚠️  Les images en échec restent dans la boîte d\'envoi')
+            )
+        self.stdout.write(self.style.SUCCESS('✅ Suppression terminée!'))
@@ -1,11 +1,53 @@
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db.models import Q
+from projects import variants
+from projects.image_backends import get_backend
 from projects.models import Project, ProjectImage, ProjectTestimonial, Client
-import cloudinary.uploader
+from projects.signals import refresh_after_bulk_update
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Étapes dans l'ordre de traitement : (choix --model, modèle, champ, libellé)
+STEPS = [
+    ('project', Project, 'featured_image', '📸 Images principales des projets'),
+    ('client', Client, 'logo', '🏢 Logos principaux des clients'),
+    ('client', Client, 'logo_white', '🏢 Logos blancs des clients'),
+    ('testimonial', ProjectTestimonial, 'client_photo', '💬 Photos des témoignages'),
+    ('projectimage', ProjectImage, 'image', '🖼️  Images de galerie'),
+]
+
+# Relations lues par l'identifiant Cloudinary, chargées avant l'envoi aux threads
+SELECT_RELATED = {
+    ProjectTestimonial: ['project'],
+    ProjectImage: ['project'],
+}
+
+
+class TimedBackend:
+    """Enveloppe le backend d'images en mesurant la durée de génération de chaque image"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.latencies = []
+
+    def create_variants(self, original, variants):
+        start = time.perf_counter()
+        try:
+            return self.backend.create_variants(original, variants)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+    def describe(self, original):
+        return self.backend.describe(original)
+
 
 class Command(BaseCommand):
     help = 'Génère les versions optimisées pour toutes les images existantes'
@@ -23,326 +65,186 @@ class Command(BaseCommand):
             action='store_true',
             help='Force la régénération même si les versions existent déjà'
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Nombre d\'images traitées en parallèle (default: 1)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Nombre d\'images enregistrées par bulk_update (default: 50)'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default=str(Path(settings.BASE_DIR) / 'logs' / 'generate_image_versions.json'),
+            help='Fichier de reprise d\'une exécution interrompue'
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore le fichier de reprise existant'
+        )
 
     def handle(self, *args, **options):
         model_choice = options['model']
         force = options['force']
-        
+        workers = max(options['workers'], 1)
+        batch_size = max(options['batch_size'], 1)
+        self.checkpoint_path = Path(options['checkpoint'])
+
+        # Versions virtuelles : les versions sont des URL de transformation, aucune copie à envoyer
+        if variants.virtual_variants_enabled():
+            self.stdout.write(
+                self.style.WARNING(
+                    '⚠️  Versions virtuelles actives (PROJECTS_VIRTUAL_IMAGE_VARIANTS) : '
+                    'aucune version à générer. Utilisez migrate_virtual_image_variants.'
+                )
+            )
+            return
+
+        self.checkpoint = {} if options['restart'] else self.load_checkpoint()
+        if self.checkpoint:
+            self.stdout.write(f'⏩ Reprise depuis {self.checkpoint_path}')
+
         self.stdout.write(
             self.style.SUCCESS(f'🚀 Début de la génération des versions d\'images pour: {model_choice}')
         )
 
-        if model_choice in ['project', 'all']:
-            self.generate_project_images(force)
-        
-        if model_choice in ['client', 'all']:
-            self.generate_client_images(force)
-        
-        if model_choice in ['testimonial', 'all']:
-            self.generate_testimonial_images(force)
-        
-        if model_choice in ['projectimage', 'all']:
-            self.generate_project_gallery_images(force)
+        backend = TimedBackend(get_backend())
+        processed = failed = 0
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for choice, model, field, label in STEPS:
+                if model_choice not in [choice, 'all']:
+                    continue
+                ok, ko = self.generate(executor, backend, model, field, label, force, batch_size)
+                processed += ok
+                failed += ko
+
+        elapsed = time.perf_counter() - start
+        self.print_summary(processed, failed, elapsed, backend.latencies)
+
+        # Exécution complète : la reprise n'a plus lieu d'être
+        if not failed:
+            self.checkpoint_path.unlink(missing_ok=True)
 
         self.stdout.write(
             self.style.SUCCESS('✅ Génération des versions d\'images terminée!')
         )
 
-    def generate_project_images(self, force=False):
-        """Génère les versions pour les images principales des projets"""
-        self.stdout.write('📸 Traitement des images principales des projets...')
-        
-        projects = Project.objects.filter(featured_image__isnull=False)
+    def get_queryset(self, model, field, force):
+        """Instances dont les versions sont à générer, par clé primaire croissante"""
+        spec = variants.VARIANT_SPECS[(model._meta.label_lower, field)]
+        queryset = model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
         if not force:
-            projects = projects.filter(featured_image_large__isnull=True)
-        
-        total = projects.count()
-        self.stdout.write(f'   {total} projets à traiter')
-        
-        for i, project in enumerate(projects, 1):
-            try:
-                with transaction.atomic():
-                    if project.featured_image:
-                        # Générer la version large
-                        large_result = cloudinary.uploader.upload(
-                            project.featured_image.url,
-                            folder="projects/featured/large",
-                            public_id=f"{project.slug}_large",
-                            transformation=[
-                                {"width": 1200, "height": 800, "crop": "fill"},
-                                {"quality": "auto"},
-                                {"fetch_format": "auto"},
-                            ],
-                            overwrite=True
-                        )
-                        
-                        # Générer la version thumbnail
-                        thumb_result = cloudinary.uploader.upload(
-                            project.featured_image.url,
-                            folder="projects/featured/thumbnails",
-                            public_id=f"{project.slug}_thumb",
-                            transformation=[
-                                {"width": 400, "height": 300, "crop": "fill"},
-                                {"quality": "auto"},
-                                {"fetch_format": "auto"},
-                            ],
-                            overwrite=True
-                        )
-                        
-                        # Mettre à jour les champs
-                        project.featured_image_large = large_result['secure_url']
-                        project.thumbnail = thumb_result['secure_url']
-                        
-                        if not project.featured_image_cloudinary_public_id:
-                            project.featured_image_cloudinary_public_id = project.featured_image.public_id
-                        
-                        project.save(update_fields=[
-                            'featured_image_large', 
-                            'thumbnail', 
-                            'featured_image_cloudinary_public_id'
-                        ])
-                        
-                        self.stdout.write(f'   ✅ [{i}/{total}] {project.title}')
-                        
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'   ❌ [{i}/{total}] Erreur pour {project.title}: {str(e)}')
-                )
+            queryset = queryset.filter(
+                Q(**{f'{spec.large_field}__isnull': True}) | Q(**{spec.large_field: ''})
+            ).exclude(**{f'{variants.VARIANTS_FIELD}__has_key': field})
 
-    def generate_client_images(self, force=False):
-        """Génère les versions pour les logos des clients"""
-        self.stdout.write('🏢 Traitement des logos des clients...')
-        
-        # Logos principaux
-        clients = Client.objects.filter(logo__isnull=False)
-        if not force:
-            clients = clients.filter(logo_large__isnull=True)
-        
-        total = clients.count()
-        self.stdout.write(f'   {total} logos principaux à traiter')
-        
-        for i, client in enumerate(clients, 1):
-            try:
-                with transaction.atomic():
-                    if client.logo:
-                        # Générer la version large
-                        large_result = cloudinary.uploader.upload(
-                            client.logo.url,
-                            folder="clients/logos/large",
-                            public_id=f"{client.slug}_logo_large",
-                            transformation=[
-                                {"width": 400, "crop": "limit"},
-                                {"quality": "auto"},
-                                {"fetch_format": "auto"},
-                            ],
-                            overwrite=True
-                        )
-                        
-                        # Générer la version thumbnail
-                        thumb_result = cloudinary.uploader.upload(
-                            client.logo.url,
-                            folder="clients/logos/thumbnails",
-                            public_id=f"{client.slug}_logo_thumb",
-                            transformation=[
-                                {"width": 150, "height": 150, "crop": "fit"},
-                                {"quality": "auto"},
-                                {"fetch_format": "auto"},
-                            ],
-                            overwrite=True
-                        )
-                        
-                        client.logo_large = large_result['secure_url']
-                        client.logo_thumbnail = thumb_result['secure_url']
-                        
-                        if not client.logo_cloudinary_public_id:
-                            client.logo_cloudinary_public_id = client.logo.public_id
-                        
-                        client.save(update_fields=[
-                            'logo_large', 
-                            'logo_thumbnail', 
-                            'logo_cloudinary_public_id'
-                        ])
-                        
-                        self.stdout.write(f'   ✅ [{i}/{total}] Logo principal: {client.name}')
-                        
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'   ❌ [{i}/{total}] Erreur logo principal {client.name}: {str(e)}')
-                )
-        
-        # Logos blancs
-        clients_white = Client.objects.filter(logo_white__isnull=False)
-        if not force:
-            clients_white = clients_white.filter(logo_white_large__isnull=True)
-        
-        total_white = clients_white.count()
-        self.stdout.write(f'   {total_white} logos blancs à traiter')
-        
-        for i, client in enumerate(clients_white, 1):
-            try:
-                with transaction.atomic():
-                    if client.logo_white:
-                        # Générer la version large
-                        large_result = cloudinary.uploader.upload(
-                            client.logo_white.url,
-                            folder="clients/logos/white/large",
-                            public_id=f"{client.slug}_logo_white_large",
-                            transformation=[
-                                {"width": 400, "crop": "limit"},
-                                {"quality": "auto"},
-                                {"fetch_format": "auto"},
-                            ],
-                            overwrite=True
-                        )
-                        
-                        # Générer la version thumbnail
-                        thumb_result = cloudinary.uploader.upload(
-                            client.logo_white.url,
-                            folder="clients/logos/white/thumbnails",
-                            public_id=f"{client.slug}_logo_white_thumb",
-                            transformation=[
-                                {"width": 150, "height": 150, "crop": "fit"},
-                                {"quality": "auto"},
-                                {"fetch_format": "auto"},
-                            ],
-                            overwrite=True
-                        )
-                        
-                        client.logo_white_large = large_result['secure_url']
-                        client.logo_white_thumbnail = thumb_result['secure_url']
-                        
-                        if not client.logo_white_cloudinary_public_id:
-                            client.logo_white_cloudinary_public_id = client.logo_white.public_id
-                        
-                        client.save(update_fields=[
-                            'logo_white_large', 
-                            'logo_white_thumbnail', 
-                            'logo_white_cloudinary_public_id'
-                        ])
-                        
-                        self.stdout.write(f'   ✅ [{i}/{total_white}] Logo blanc: {client.name}')
-                        
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'   ❌ [{i}/{total_white}] Erreur logo blanc {client.name}: {str(e)}')
-                )
+        # Reprise : lignes non encore traitées et échecs de l'exécution précédente
+        step = self.checkpoint.get(self.checkpoint_key(model, field))
+        if step:
+            queryset = queryset.filter(Q(pk__gt=step['last_pk']) | Q(pk__in=step['failed']))
 
-    def generate_testimonial_images(self, force=False):
-        """Génère les versions pour les photos des témoignages"""
-        self.stdout.write('💬 Traitement des photos des témoignages...')
-        
-        testimonials = ProjectTestimonial.objects.filter(client_photo__isnull=False)
-        if not force:
-            testimonials = testimonials.filter(client_photo_large__isnull=True)
-        
-        total = testimonials.count()
-        self.stdout.write(f'   {total} photos de témoignages à traiter')
-        
-        for i, testimonial in enumerate(testimonials, 1):
-            try:
-                with transaction.atomic():
-                    if testimonial.client_photo:
-                        # Générer la version large
-                        large_result = cloudinary.uploader.upload(
-                            testimonial.client_photo.url,
-                            folder="testimonials/large",
-                            public_id=f"{testimonial.project.slug}_testimonial_large",
-                            transformation=[
-                                {"width": 200, "height": 200, "crop": "fill", "gravity": "face"},
-                                {"quality": "auto"},
-                                {"fetch_format": "auto"},
-                            ],
-                            overwrite=True
-                        )
-                        
-                        # Générer la version thumbnail
-                        thumb_result = cloudinary.uploader.upload(
-                            testimonial.client_photo.url,
-                            folder="testimonials/thumbnails",
-                            public_id=f"{testimonial.project.slug}_testimonial_thumb",
-                            transformation=[
-                                {"width": 80, "height": 80, "crop": "fill", "gravity": "face"},
-                                {"quality": "auto"},
-                                {"fetch_format": "auto"},
-                            ],
-                            overwrite=True
-                        )
-                        
-                        testimonial.client_photo_large = large_result['secure_url']
-                        testimonial.client_photo_thumbnail = thumb_result['secure_url']
-                        
-                        if not testimonial.client_photo_cloudinary_public_id:
-                            testimonial.client_photo_cloudinary_public_id = testimonial.client_photo.public_id
-                        
-                        testimonial.save(update_fields=[
-                            'client_photo_large', 
-                            'client_photo_thumbnail', 
-                            'client_photo_cloudinary_public_id'
-                        ])
-                        
-                        self.stdout.write(f'   ✅ [{i}/{total}] {testimonial.project.title}')
-                        
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'   ❌ [{i}/{total}] Erreur pour {testimonial.project.title}: {str(e)}')
-                )
+        return queryset.select_related(*SELECT_RELATED.get(model, [])).order_by('pk')
 
-    def generate_project_gallery_images(self, force=False):
-        """Génère les versions pour les images de galerie des projets"""
-        self.stdout.write('🖼️  Traitement des images de galerie...')
-        
-        images = ProjectImage.objects.filter(image__isnull=False)
-        if not force:
-            images = images.filter(image_large__isnull=True)
-        
-        total = images.count()
-        self.stdout.write(f'   {total} images de galerie à traiter')
-        
-        for i, image in enumerate(images, 1):
-            try:
-                with transaction.atomic():
-                    if image.image:
-                        # Générer la version large
-                        large_result = cloudinary.uploader.upload(
-                            image.image.url,
-                            folder="projects/gallery/large",
-                            public_id=f"{image.project.slug}_gallery_{image.id}_large",
-                            transformation=[
-                                {"width": 1200, "height": 800, "crop": "limit"},
-                                {"quality": "auto"},
-                                {"fetch_format": "auto"},
-                            ],
-                            overwrite=True
-                        )
-                        
-                        # Générer la version thumbnail
-                        thumb_result = cloudinary.uploader.upload(
-                            image.image.url,
-                            folder="projects/gallery/thumbnails",
-                            public_id=f"{image.project.slug}_gallery_{image.id}_thumb",
-                            transformation=[
-                                {"width": 300, "height": 200, "crop": "fill"},
-                                {"quality": "auto"},
-                                {"fetch_format": "auto"},
-                            ],
-                            overwrite=True
-                        )
-                        
-                        image.image_large = large_result['secure_url']
-                        image.image_thumbnail = thumb_result['secure_url']
-                        
-                        if not image.image_cloudinary_public_id:
-                            image.image_cloudinary_public_id = image.image.public_id
-                        
-                        image.save(update_fields=[
-                            'image_large', 
-                            'image_thumbnail', 
-                            'image_cloudinary_public_id'
-                        ])
-                        
-                        self.stdout.write(f'   ✅ [{i}/{total}] {image.project.title} - Image {image.order}')
-                        
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'   ❌ [{i}/{total}] Erreur pour {image.project.title}: {str(e)}')
-                )
+    def generate(self, executor, backend, model, field, label, force, batch_size):
+        """Génère les versions d'un champ image ; retourne (réussies, échouées)"""
+        self.stdout.write(f'{label}...')
+
+        queryset = self.get_queryset(model, field, force)
+        total = queryset.count()
+        self.stdout.write(f'   {total} images à traiter')
+
+        processed = failed = 0
+        failed_pks = []
+        # Échecs de l'exécution précédente pas encore retentés
+        previous_failed = set(
+            self.checkpoint.get(self.checkpoint_key(model, field), {}).get('failed', [])
+        )
+
+        # Les envois sont parallèles, les écritures regroupées par lot
+        for batch in self.batches(queryset, batch_size):
+            futures = [
+                (instance, executor.submit(variants.upload_variants, instance, field, backend))
+                for instance in batch
+            ]
+
+            succeeded = []
+            for instance, future in futures:
+                error = future.exception()
+                if error is None:
+                    succeeded.append(instance)
+                    self.stdout.write(f'   ✅ [{processed + failed + 1}/{total}] {instance}')
+                    processed += 1
+                else:
+                    self.stdout.write(
+                        self.style.ERROR(f'   ❌ [{processed + failed + 1}/{total}] Erreur pour {instance}: {str(error)}')
+                    )
+                    logger.error(f'Erreur de génération des versions pour {instance}: {error}')
+                    failed_pks.append(instance.pk)
+                    failed += 1
+
+            if succeeded:
+                update_fields = variants.variant_fields(succeeded[0], field) + ['resolved_image_urls', 'updated_at']
+                model.objects.bulk_update(succeeded, update_fields)
+                refresh_after_bulk_update(model, [instance.pk for instance in succeeded])
+
+            previous_failed.difference_update(instance.pk for instance in batch)
+            self.save_checkpoint(
+                model, field, batch[-1].pk, sorted(previous_failed.union(failed_pks))
+            )
+
+        return processed, failed
+
+    @staticmethod
+    def batches(queryset, batch_size):
+        batch = []
+        for instance in queryset.iterator(chunk_size=batch_size):
+            batch.append(instance)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    # Reprise
+
+    @staticmethod
+    def checkpoint_key(model, field):
+        return f'{model._meta.label_lower}:{field}'
+
+    def load_checkpoint(self):
+        try:
+            return json.loads(self.checkpoint_path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_checkpoint(self, model, field, last_pk, failed_pks):
+        key = self.checkpoint_key(model, field)
+        # Les échecs repris ont une clé inférieure au dernier point de reprise
+        previous = self.checkpoint.get(key, {}).get('last_pk', last_pk)
+        self.checkpoint[key] = {
+            'last_pk': max(previous, last_pk),
+            'failed': failed_pks,
+        }
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        self.checkpoint_path.write_text(json.dumps(self.checkpoint))
+
+    def print_summary(self, processed, failed, elapsed, latencies):
+        rate = processed / elapsed if elapsed else 0
+        self.stdout.write(
+            f'📊 {processed} images traitées, {failed} erreurs en {elapsed:.1f}s ({rate:.2f} images/s)'
+        )
+        if latencies:
+            latencies = sorted(latencies)
+            p50 = statistics.median(latencies) * 1000
+            p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000
+            self.stdout.write(
+                f'   ⏱️  Latence par image : p50 {p50:.0f} ms, p95 {p95:.0f} ms'
+            )
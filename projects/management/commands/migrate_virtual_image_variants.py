@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from projects.images import backfill_resolved_image_urls, virtual_variants_enabled
+from projects.models import Project, ProjectImage, ProjectTestimonial, Client
+from projects.signals import refresh_after_bulk_update
+
+
+class Command(BaseCommand):
+    help = (
+        'Réenregistre les URL d\'images de toutes les lignes existantes avec les '
+        'préréglages des versions virtuelles (PROJECTS_VIRTUAL_IMAGE_VARIANTS)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Nombre de lignes enregistrées par bulk_update (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        if not virtual_variants_enabled():
+            raise CommandError(
+                'Activez PROJECTS_VIRTUAL_IMAGE_VARIANTS avant de migrer les versions d\'images'
+            )
+
+        batch_size = max(options['batch_size'], 1)
+
+        for model in (Project, ProjectImage, Client, ProjectTestimonial):
+            updated = backfill_resolved_image_urls(model, batch_size=batch_size, only_missing=False)
+            self.stdout.write(f'   ✅ {model._meta.verbose_name_plural}: {updated} lignes')
+
+            # bulk_update n'émet pas de signal : caches et cartes de projets
+            refresh_after_bulk_update(model, model.objects.values_list('pk', flat=True))
+
+        self.stdout.write(
+            self.style.SUCCESS('✅ Versions d\'images virtuelles enregistrées!')
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from projects.models import Project, ProjectCard
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit le modèle de lecture ProjectCard pour tous les projets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Nombre de projets reconstruits par lot (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        project_ids = list(Project.objects.values_list('pk', flat=True))
+        total = len(project_ids)
+        self.stdout.write(f'🃏 {total} cartes de projet à reconstruire')
+
+        rebuilt = 0
+        for start in range(0, total, batch_size):
+            rebuilt += ProjectCard.objects.refresh(project_ids[start:start + batch_size])
+            self.stdout.write(f'   ✅ [{rebuilt}/{total}]')
+
+        self.stdout.write(
+            self.style.SUCCESS('✅ Reconstruction des cartes terminée!')
+        )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from projects import search
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des projets"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Nombre de projets indexés par lot (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔎 Reconstruction de l'index de recherche...")
+
+        indexed = search.rebuild_index(
+            batch_size=options['batch_size'],
+            stdout=self.stdout,
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ {indexed} projets indexés!')
+        )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from projects.models import Project
+from projects.related import refresh_related
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les projets similaires précalculés de tous les projets'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Nombre de projets recalculés par lot (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        project_ids = list(Project.objects.values_list('pk', flat=True))
+        total = len(project_ids)
+        self.stdout.write(f'🔗 {total} projets à recalculer')
+
+        links = 0
+        for start in range(0, total, batch_size):
+            links += refresh_related(project_ids[start:start + batch_size])
+            self.stdout.write(f'   ✅ [{min(start + batch_size, total)}/{total}] {links} liens')
+
+        self.stdout.write(
+            self.style.SUCCESS('✅ Recalcul des projets similaires terminé!')
+        )
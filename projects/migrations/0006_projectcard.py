@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:46
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0005_alter_client_options_client_order'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectCard',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='card', serialize=False, to='projects.project')),
+                ('title', models.CharField(max_length=200)),
+                ('slug', models.SlugField(max_length=200)),
+                ('subtitle', models.CharField(blank=True, max_length=300)),
+                ('description', models.TextField(blank=True)),
+                ('client_name', models.CharField(max_length=200)),
+                ('client_slug', models.SlugField(max_length=200)),
+                ('client_website', models.URLField(blank=True)),
+                ('client_logo_thumbnail', models.URLField(blank=True, max_length=500)),
+                ('client_logo_white_thumbnail', models.URLField(blank=True, max_length=500)),
+                ('categories', models.JSONField(blank=True, default=list)),
+                ('category_slugs', models.CharField(blank=True, max_length=1000)),
+                ('image_urls', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('draft', 'Brouillon'), ('in_progress', 'En cours'), ('completed', 'Terminé'), ('on_hold', 'En pause'), ('cancelled', 'Annulé')], max_length=20)),
+                ('is_featured', models.BooleanField(default=False)),
+                ('is_published', models.BooleanField(default=False)),
+                ('order', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Carte de projet',
+                'verbose_name_plural': 'Cartes de projet',
+                'ordering': ['-order', '-created_at'],
+                'indexes': [models.Index(fields=['is_published', '-order', '-created_at'], name='projects_card_listing_idx'), models.Index(fields=['client_slug', 'is_published'], name='projects_card_client_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db import transaction
+from django.db.utils import DatabaseError
+
+
+SQLITE_CREATE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE projects_search_fts USING fts5(
+        title, subtitle, description, content, client_name,
+        content='projects_projectsearchdocument',
+        content_rowid='project_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER projects_search_fts_ai AFTER INSERT ON projects_projectsearchdocument BEGIN
+        INSERT INTO projects_search_fts(rowid, title, subtitle, description, content, client_name)
+        VALUES (new.project_id, new.title, new.subtitle, new.description, new.content, new.client_name);
+    END
+    """,
+    """
+    CREATE TRIGGER projects_search_fts_ad AFTER DELETE ON projects_projectsearchdocument BEGIN
+        INSERT INTO projects_search_fts(projects_search_fts, rowid, title, subtitle, description, content, client_name)
+        VALUES ('delete', old.project_id, old.title, old.subtitle, old.description, old.content, old.client_name);
+    END
+    """,
+    """
+    CREATE TRIGGER projects_search_fts_au AFTER UPDATE ON projects_projectsearchdocument BEGIN
+        INSERT INTO projects_search_fts(projects_search_fts, rowid, title, subtitle, description, content, client_name)
+        VALUES ('delete', old.project_id, old.title, old.subtitle, old.description, old.content, old.client_name);
+        INSERT INTO projects_search_fts(rowid, title, subtitle, description, content, client_name)
+        VALUES (new.project_id, new.title, new.subtitle, new.description, new.content, new.client_name);
+    END
+    """,
+]
+
+SQLITE_DROP_INDEX = [
+    "DROP TRIGGER IF EXISTS projects_search_fts_ai",
+    "DROP TRIGGER IF EXISTS projects_search_fts_ad",
+    "DROP TRIGGER IF EXISTS projects_search_fts_au",
+    "DROP TABLE IF EXISTS projects_search_fts",
+]
+
+POSTGRESQL_CREATE_INDEX = [
+    """
+    ALTER TABLE projects_projectsearchdocument
+    ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('french', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('french', coalesce(subtitle, '')), 'B') ||
+        setweight(to_tsvector('french', coalesce(client_name, '')), 'B') ||
+        setweight(to_tsvector('french', coalesce(description, '')), 'C') ||
+        setweight(to_tsvector('french', coalesce(content, '')), 'D')
+    ) STORED
+    """,
+    """
+    CREATE INDEX projects_search_vector_gin
+    ON projects_projectsearchdocument USING GIN (search_vector)
+    """,
+]
+
+POSTGRESQL_DROP_INDEX = [
+    "DROP INDEX IF EXISTS projects_search_vector_gin",
+    "ALTER TABLE projects_projectsearchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _execute(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    """Crée l'index plein texte propre au moteur de base de données"""
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                _execute(schema_editor, SQLITE_CREATE_INDEX)
+        except DatabaseError:
+            # SQLite compilé sans FTS5 : projects.search se replie sur icontains
+            pass
+    elif vendor == "postgresql":
+        _execute(schema_editor, POSTGRESQL_CREATE_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _execute(schema_editor, SQLITE_DROP_INDEX)
+    elif vendor == "postgresql":
+        _execute(schema_editor, POSTGRESQL_DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_projectcard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSearchDocument',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='projects.project')),
+                ('title', models.CharField(max_length=200)),
+                ('subtitle', models.CharField(blank=True, max_length=300)),
+                ('description', models.TextField(blank=True)),
+                ('content', models.TextField(blank=True, help_text='Contenu sans balises HTML')),
+                ('client_name', models.CharField(blank=True, max_length=200)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Document de recherche',
+                'verbose_name_plural': 'Documents de recherche',
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_projectsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['is_published', 'order', 'created_at'], name='projects_published_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['is_published', 'is_featured'], name='projects_published_feat_idx'),
+        ),
+    ]
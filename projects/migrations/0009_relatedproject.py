@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_project_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedProject',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.PositiveSmallIntegerField(default=0)),
+                ('shared_categories', models.PositiveSmallIntegerField(default=0)),
+                ('same_client', models.BooleanField(default=False)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='projects.project')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_backlinks', to='projects.project')),
+            ],
+            options={
+                'verbose_name': 'Projet similaire',
+                'verbose_name_plural': 'Projets similaires',
+                'ordering': ['project', '-score', '-related'],
+                'indexes': [models.Index(fields=['project', '-score', '-related'], name='projects_related_top_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedproject',
+            constraint=models.UniqueConstraint(fields=('project', 'related'), name='projects_related_unique'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_projectimage_updated_at_projecttestimonial_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='resolved_image_urls',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='resolved_image_urls',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projectimage',
+            name='resolved_image_urls',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projecttestimonial',
+            name='resolved_image_urls',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
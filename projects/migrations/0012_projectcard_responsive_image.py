@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_resolved_image_urls'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectcard',
+            name='responsive_image',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
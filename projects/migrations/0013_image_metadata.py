@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_projectcard_responsive_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='image_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='image_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projectimage',
+            name='image_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projecttestimonial',
+            name='image_metadata',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_image_metadata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CloudinaryDeletion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('public_id', models.CharField(max_length=255, unique=True)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Suppression Cloudinary',
+                'verbose_name_plural': 'Suppressions Cloudinary',
+                'ordering': ['pk'],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_cloudinary_deletion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadedImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64)),
+                ('options_hash', models.CharField(help_text='Empreinte des options qui modifient le contenu envoyé', max_length=64)),
+                ('public_id', models.CharField(db_index=True, max_length=255)),
+                ('version', models.CharField(blank=True, max_length=50)),
+                ('format', models.CharField(blank=True, max_length=20)),
+                ('resource_type', models.CharField(default='image', max_length=20)),
+                ('secure_url', models.URLField(max_length=500)),
+                ('bytes', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Image envoyée',
+                'verbose_name_plural': 'Images envoyées',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='uploadedimage',
+            constraint=models.UniqueConstraint(fields=('sha256', 'options_hash'), name='projects_uploadedimage_content_unique'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:53
+
+from django.db import migrations, models
+from django.db.models import CharField, Q
+from django.db.models.functions import Cast
+
+# (modèle, original, version large, miniature)
+VARIANT_FIELDS = [
+    ('client', 'logo', 'logo_large', 'logo_thumbnail'),
+    ('client', 'logo_white', 'logo_white_large', 'logo_white_thumbnail'),
+    ('project', 'featured_image', 'featured_image_large', 'thumbnail'),
+    ('projectimage', 'image', 'image_large', 'image_thumbnail'),
+    ('projecttestimonial', 'client_photo', 'client_photo_large', 'client_photo_thumbnail'),
+]
+
+URL_PREFIXES = ('http://', 'https://', '/')
+
+
+def move_generated_urls(apps, schema_editor):
+    """
+    Déplace les URL de versions générées, enregistrées jusqu'ici dans les
+    CloudinaryField, vers la colonne image_variants
+    """
+    for model_name, original, large, thumbnail in VARIANT_FIELDS:
+        model = apps.get_model('projects', model_name)
+        is_url = Q()
+        for field in (large, thumbnail):
+            for prefix in URL_PREFIXES:
+                is_url |= Q(**{f'{field}__startswith': prefix})
+
+        # Cast : valeurs brutes, sans conversion en CloudinaryResource
+        rows = model.objects.filter(is_url).annotate(
+            raw_large=Cast(large, CharField()),
+            raw_thumbnail=Cast(thumbnail, CharField()),
+        ).values('pk', original, 'image_variants', 'raw_large', 'raw_thumbnail')
+
+        for row in rows:
+            entry, cleared = {}, {}
+            for key, field in (('large', large), ('thumbnail', thumbnail)):
+                raw = row[f'raw_{key}']
+                if raw and raw.startswith(URL_PREFIXES):
+                    entry[key] = raw
+                    cleared[field] = None
+            variants = dict(row['image_variants'] or {})
+            if row[original]:
+                variants[original] = {**entry, 'source': row[original].get_prep_value()}
+            model.objects.filter(pk=row['pk']).update(image_variants=variants, **cleared)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0015_uploaded_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projectimage',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='projecttestimonial',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.RunPython(move_generated_urls, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0016_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadedimage',
+            name='color',
+            field=models.CharField(blank=True, help_text='Couleur dominante', max_length=7),
+        ),
+        migrations.AddField(
+            model_name='uploadedimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadedimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -1,9 +1,10 @@
 from django.db import models
+from django.utils import timezone
 from django.utils.text import slugify
 from cloudinary_storage.storage import VideoMediaCloudinaryStorage
 from cloudinary.models import CloudinaryField
 from django_ckeditor_5.fields import CKEditor5Field
-import cloudinary
+from .images import ImageURLs, ResponsiveImage
 import logging
 
 # from django.contrib.auth.models import User
@@ -136,6 +137,12 @@ class Client(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # URL résolues des images, enregistrées à chaque sauvegarde (voir projects/images.py)
+    resolved_image_urls = models.JSONField(default=dict, blank=True, editable=False)
+    # Dimensions, poids, format, couleur dominante et aperçu LQIP des images
+    image_metadata = models.JSONField(default=dict, blank=True, editable=False)
+    # URL des versions générées par le backend d'images (voir projects/variants.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Client"
@@ -147,74 +154,22 @@ class Client(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
-    def delete(self, *args, **kwargs):
-        """Supprimer les images Cloudinary lors de la suppression du client"""
-        if self.logo_cloudinary_public_id:
-            try:
-                cloudinary.uploader.destroy(
-                    self.logo_cloudinary_public_id, resource_type="image"
-                )
-            except Exception as e:
-                logger.error(
-                    f"Erreur lors de la suppression du logo Cloudinary: {str(e)}"
-                )
-
-        if self.logo_white_cloudinary_public_id:
-            try:
-                cloudinary.uploader.destroy(
-                    self.logo_white_cloudinary_public_id, resource_type="image"
-                )
-            except Exception as e:
-                logger.error(
-                    f"Erreur lors de la suppression du logo blanc Cloudinary: {str(e)}"
-                )
-        super().delete(*args, **kwargs)
-
-    @property
-    def logo_urls(self):
-        """Retourne un dictionnaire avec les URL des différentes versions du logo"""
-        urls = {"original": "", "large": "", "thumbnail": ""}
-
-        # URL du logo original
-        if hasattr(self, "logo") and self.logo:
-            urls["original"] = self.logo.url
-
-        # URL du logo large
-        if hasattr(self, "logo_large") and self.logo_large:
-            urls["large"] = self.logo_large.url
-        elif urls["original"]:
-            urls["large"] = urls["original"]
-
-        # URL de la miniature du logo
-        if hasattr(self, "logo_thumbnail") and self.logo_thumbnail:
-            urls["thumbnail"] = self.logo_thumbnail.url
-        elif urls["original"]:
-            urls["thumbnail"] = urls["original"]
-
-        return urls
-
-    @property
-    def logo_white_urls(self):
-        """Retourne un dictionnaire avec les URL des différentes versions du logo blanc"""
-        urls = {"original": "", "large": "", "thumbnail": ""}
-
-        # URL du logo blanc original
-        if hasattr(self, "logo_white") and self.logo_white:
-            urls["original"] = self.logo_white.url
-
-        # URL du logo blanc large
-        if hasattr(self, "logo_white_large") and self.logo_white_large:
-            urls["large"] = self.logo_white_large.url
-        elif urls["original"]:
-            urls["large"] = urls["original"]
+    # URL des différentes versions du logo (voir projects/images.py)
+    logo_urls = ImageURLs(
+        "logo", "logo_large", "logo_thumbnail", presets=("logo_large", "logo_thumbnail")
+    )
 
-        # URL de la miniature du logo blanc
-        if hasattr(self, "logo_white_thumbnail") and self.logo_white_thumbnail:
-            urls["thumbnail"] = self.logo_white_thumbnail.url
-        elif urls["original"]:
-            urls["thumbnail"] = urls["original"]
+    # URL des différentes versions du logo blanc (voir projects/images.py)
+    logo_white_urls = ImageURLs(
+        "logo_white",
+        "logo_white_large",
+        "logo_white_thumbnail",
+        presets=("logo_large", "logo_thumbnail"),
+    )
 
-        return urls
+    # Attributs d'image responsive (src, srcset, width, height) des logos
+    logo_responsive = ResponsiveImage("logo", max_width=400)
+    logo_white_responsive = ResponsiveImage("logo_white", max_width=400)
 
     def __str__(self):
         return self.name
@@ -314,12 +269,29 @@ class Project(models.Model):
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # URL résolues des images, enregistrées à chaque sauvegarde (voir projects/images.py)
+    resolved_image_urls = models.JSONField(default=dict, blank=True, editable=False)
+    # Dimensions, poids, format, couleur dominante et aperçu LQIP des images
+    image_metadata = models.JSONField(default=dict, blank=True, editable=False)
+    # URL des versions générées par le backend d'images (voir projects/variants.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     published_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         verbose_name = "Projet"
         verbose_name_plural = "Projets"
         ordering = ["-order", "-created_at"]
+        indexes = [
+            # Listes publiées triées et pagination par curseur
+            models.Index(
+                fields=["is_published", "order", "created_at"],
+                name="projects_published_order_idx",
+            ),
+            models.Index(
+                fields=["is_published", "is_featured"],
+                name="projects_published_feat_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -336,28 +308,16 @@ class Project(models.Model):
         """Retourne la liste des catégories pour l'affichage en badges"""
         return self.categories.all()
 
-    @property
-    def featured_image_urls(self):
-        """Retourne un dictionnaire avec les URL des différentes versions de l'image principale"""
-        urls = {"original": "", "large": "", "thumbnail": ""}
-
-        # URL de l'image originale
-        if hasattr(self, "featured_image") and self.featured_image:
-            urls["original"] = self.featured_image.url
-
-        # URL de l'image large
-        if hasattr(self, "featured_image_large") and self.featured_image_large:
-            urls["large"] = self.featured_image_large.url
-        elif urls["original"]:
-            urls["large"] = urls["original"]
-
-        # URL de la vignette
-        if hasattr(self, "thumbnail") and self.thumbnail:
-            urls["thumbnail"] = self.thumbnail.url
-        elif urls["original"]:
-            urls["thumbnail"] = urls["original"]
+    # URL des différentes versions de l'image principale (voir projects/images.py)
+    featured_image_urls = ImageURLs(
+        "featured_image",
+        "featured_image_large",
+        "thumbnail",
+        presets=("project_large", "project_thumbnail"),
+    )
 
-        return urls
+    # Image principale responsive, recadrée en 3:2 (voir projects/images.py)
+    featured_image_responsive = ResponsiveImage("featured_image", aspect_ratio="3:2", crop="fill")
 
     @property
     def featured_image_url(self):
@@ -380,70 +340,19 @@ class Project(models.Model):
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
 
-    def delete(self, *args, **kwargs):
-        """Supprimer les images Cloudinary lors de la suppression du projet"""
-        if self.featured_image_cloudinary_public_id:
-            try:
-                cloudinary.uploader.destroy(
-                    self.featured_image_cloudinary_public_id, resource_type="image"
-                )
-            except Exception as e:
-                logger.error(
-                    f"Erreur lors de la suppression de l'image principale Cloudinary: {str(e)}"
-                )
-        super().delete(*args, **kwargs)
-
     def generate_image_versions(self):
         """
         Génère les versions optimisées de l'image principale
         """
-        if not self.featured_image:
+        from . import variants
+        from .signals import refresh_after_bulk_update
+
+        if not variants.needs_variants(self, "featured_image"):
             return False
 
         try:
-            # Générer la version large
-            large_result = cloudinary.uploader.upload(
-                self.featured_image.url,
-                folder="projects/featured/large",
-                public_id=f"{self.slug}_large",
-                transformation=[
-                    {"width": 1200, "height": 800, "crop": "fill"},
-                    {"quality": "auto"},
-                    {"fetch_format": "auto"},
-                ],
-                overwrite=True,
-            )
-
-            # Générer la version thumbnail
-            thumb_result = cloudinary.uploader.upload(
-                self.featured_image.url,
-                folder="projects/featured/thumbnails",
-                public_id=f"{self.slug}_thumb",
-                transformation=[
-                    {"width": 400, "height": 300, "crop": "fill"},
-                    {"quality": "auto"},
-                    {"fetch_format": "auto"},
-                ],
-                overwrite=True,
-            )
-
-            # Mettre à jour les champs
-            self.featured_image_large = large_result["secure_url"]
-            self.thumbnail = thumb_result["secure_url"]
-
-            # Sauvegarder le public_id original si pas déjà fait
-            if not self.featured_image_cloudinary_public_id:
-                self.featured_image_cloudinary_public_id = self.featured_image.public_id
-
-            self.save(
-                update_fields=[
-                    "featured_image_large",
-                    "thumbnail",
-                    "featured_image_cloudinary_public_id",
-                ]
-            )
-
-            logger.info(f"Versions d'images générées pour: {self.title}")
+            variants.generate_variants(self, "featured_image")
+            refresh_after_bulk_update(Project, [self.pk])
             return True
 
         except Exception as e:
@@ -504,6 +413,13 @@ class ProjectImage(models.Model):
     description = CKEditor5Field("Description", config_name="default", blank=True)
     order = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # URL résolues des images, enregistrées à chaque sauvegarde (voir projects/images.py)
+    resolved_image_urls = models.JSONField(default=dict, blank=True, editable=False)
+    # Dimensions, poids, format, couleur dominante et aperçu LQIP des images
+    image_metadata = models.JSONField(default=dict, blank=True, editable=False)
+    # URL des versions générées par le backend d'images (voir projects/variants.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Image de projet"
@@ -513,28 +429,13 @@ class ProjectImage(models.Model):
     def __str__(self):
         return f"{self.project.title} - Image {self.order}"
 
-    @property
-    def image_urls(self):
-        """Retourne un dictionnaire avec les URL des différentes versions de l'image"""
-        urls = {"original": "", "large": "", "thumbnail": ""}
-
-        # URL de l'image originale
-        if hasattr(self, "image") and self.image:
-            urls["original"] = self.image.url
-
-        # URL de l'image large
-        if hasattr(self, "image_large") and self.image_large:
-            urls["large"] = self.image_large.url
-        elif urls["original"]:
-            urls["large"] = urls["original"]
-
-        # URL de la vignette
-        if hasattr(self, "image_thumbnail") and self.image_thumbnail:
-            urls["thumbnail"] = self.image_thumbnail.url
-        elif urls["original"]:
-            urls["thumbnail"] = urls["original"]
+    # URL des différentes versions de l'image (voir projects/images.py)
+    image_urls = ImageURLs(
+        "image", "image_large", "image_thumbnail", presets=("large", "thumbnail")
+    )
 
-        return urls
+    # Image de galerie responsive, proportions d'origine (voir projects/images.py)
+    image_responsive = ResponsiveImage("image")
 
     @property
     def image_url(self):
@@ -547,19 +448,6 @@ class ProjectImage(models.Model):
         image_urls = self.image_urls
         return image_urls["thumbnail"] or image_urls["original"]
 
-    def delete(self, *args, **kwargs):
-        """Supprimer les images Cloudinary lors de la suppression de l'image"""
-        if self.image_cloudinary_public_id:
-            try:
-                cloudinary.uploader.destroy(
-                    self.image_cloudinary_public_id, resource_type="image"
-                )
-            except Exception as e:
-                logger.error(
-                    f"Erreur lors de la suppression de l'image de galerie Cloudinary: {str(e)}"
-                )
-        super().delete(*args, **kwargs)
-
 
 class ProjectTeamMember(models.Model):
     """Relation entre un projet et les membres de l'équipe"""
@@ -638,6 +526,13 @@ class ProjectTestimonial(models.Model):
     )
     is_featured = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # URL résolues des images, enregistrées à chaque sauvegarde (voir projects/images.py)
+    resolved_image_urls = models.JSONField(default=dict, blank=True, editable=False)
+    # Dimensions, poids, format, couleur dominante et aperçu LQIP des images
+    image_metadata = models.JSONField(default=dict, blank=True, editable=False)
+    # URL des versions générées par le backend d'images (voir projects/variants.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Témoignage"
@@ -646,41 +541,18 @@ class ProjectTestimonial(models.Model):
     def __str__(self):
         return f"Témoignage de {self.client_name} pour {self.project.title}"
 
-    @property
-    def client_photo_urls(self):
-        """Retourne un dictionnaire avec les URL des différentes versions de la photo client"""
-        urls = {"original": "", "large": "", "thumbnail": ""}
-
-        # URL de la photo originale
-        if hasattr(self, "client_photo") and self.client_photo:
-            urls["original"] = self.client_photo.url
-
-        # URL de la photo large
-        if hasattr(self, "client_photo_large") and self.client_photo_large:
-            urls["large"] = self.client_photo_large.url
-        elif urls["original"]:
-            urls["large"] = urls["original"]
-
-        # URL de la vignette
-        if hasattr(self, "client_photo_thumbnail") and self.client_photo_thumbnail:
-            urls["thumbnail"] = self.client_photo_thumbnail.url
-        elif urls["original"]:
-            urls["thumbnail"] = urls["original"]
-
-        return urls
-
-    def delete(self, *args, **kwargs):
-        """Supprimer les images Cloudinary lors de la suppression du témoignage"""
-        if self.client_photo_cloudinary_public_id:
-            try:
-                cloudinary.uploader.destroy(
-                    self.client_photo_cloudinary_public_id, resource_type="image"
-                )
-            except Exception as e:
-                logger.error(
-                    f"Erreur lors de la suppression de la photo client Cloudinary: {str(e)}"
-                )
-        super().delete(*args, **kwargs)
+    # URL des différentes versions de la photo client (voir projects/images.py)
+    client_photo_urls = ImageURLs(
+        "client_photo",
+        "client_photo_large",
+        "client_photo_thumbnail",
+        presets=("testimonial_large", "testimonial_thumbnail"),
+    )
+
+    # Photo client responsive, carrée et centrée sur le visage (voir projects/images.py)
+    client_photo_responsive = ResponsiveImage(
+        "client_photo", max_width=200, aspect_ratio="1:1", crop="fill", gravity="face"
+    )
 
 
 class ProjectMetrics(models.Model):
@@ -736,3 +608,293 @@ class ProjectMetrics(models.Model):
 
     def __str__(self):
         return f"Métriques pour {self.project.title}"
+
+
+class ProjectCardQuerySet(models.QuerySet):
+    """QuerySet du modèle de lecture ProjectCard"""
+
+    def published(self):
+        return self.filter(is_published=True)
+
+    def in_category(self, category_slug):
+        """Filtre sur une catégorie sans jointure (voir ProjectCard.category_slugs)"""
+        return self.filter(category_slugs__contains=f"|{category_slug}|")
+
+
+class ProjectCardManager(models.Manager.from_queryset(ProjectCardQuerySet)):
+    """Manager chargé de (re)construire les cartes à partir des projets"""
+
+    def refresh(self, project_ids):
+        """
+        Reconstruit les cartes des projets donnés en une requête de lecture
+        et un upsert groupé
+        """
+        project_ids = list(project_ids)
+        if not project_ids:
+            return 0
+
+        projects = (
+            Project.objects.filter(pk__in=project_ids)
+            .select_related("client")
+            .prefetch_related("categories")
+        )
+        cards = [ProjectCard.from_project(project) for project in projects]
+
+        self.bulk_create(
+            cards,
+            update_conflicts=True,
+            unique_fields=["project"],
+            update_fields=ProjectCard.DENORMALIZED_FIELDS,
+        )
+        return len(cards)
+
+
+class ProjectCard(models.Model):
+    """
+    Modèle de lecture dénormalisé pour les listes et grilles de projets.
+
+    Les données du client, les catégories et les URL d'images y sont copiées
+    par les signaux de projects/signals.py, afin que les pages de liste se
+    résument à une requête indexée sans jointure ni construction d'URL.
+    """
+
+    DENORMALIZED_FIELDS = [
+        "title",
+        "slug",
+        "subtitle",
+        "description",
+        "client_name",
+        "client_slug",
+        "client_website",
+        "client_logo_thumbnail",
+        "client_logo_white_thumbnail",
+        "categories",
+        "category_slugs",
+        "image_urls",
+        "responsive_image",
+        "status",
+        "is_featured",
+        "is_published",
+        "order",
+        "created_at",
+        "updated_at",
+    ]
+
+    project = models.OneToOneField(
+        Project, on_delete=models.CASCADE, primary_key=True, related_name="card"
+    )
+
+    # Projet
+    title = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=200)
+    subtitle = models.CharField(max_length=300, blank=True)
+    description = models.TextField(blank=True)
+
+    # Client
+    client_name = models.CharField(max_length=200)
+    client_slug = models.SlugField(max_length=200)
+    client_website = models.URLField(blank=True)
+    client_logo_thumbnail = models.URLField(max_length=500, blank=True)
+    client_logo_white_thumbnail = models.URLField(max_length=500, blank=True)
+
+    # Catégories : [{"name": ..., "slug": ..., "color": ...}, ...]
+    categories = models.JSONField(default=list, blank=True)
+    # Slugs délimités ("|branding|ui-ux|") pour filtrer sans jointure
+    category_slugs = models.CharField(max_length=1000, blank=True)
+
+    # URL résolues de l'image principale (original, large, thumbnail)
+    image_urls = models.JSONField(default=dict, blank=True)
+    responsive_image = models.JSONField(default=dict, blank=True)
+
+    # Affichage
+    status = models.CharField(max_length=20, choices=ProjectStatus.choices)
+    is_featured = models.BooleanField(default=False)
+    is_published = models.BooleanField(default=False)
+    order = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    # Date de la dernière reconstruction de la carte
+    updated_at = models.DateTimeField()
+
+    objects = ProjectCardManager()
+
+    class Meta:
+        verbose_name = "Carte de projet"
+        verbose_name_plural = "Cartes de projet"
+        ordering = ["-order", "-created_at"]
+        indexes = [
+            models.Index(
+                fields=["is_published", "-order", "-created_at"],
+                name="projects_card_listing_idx",
+            ),
+            models.Index(
+                fields=["client_slug", "is_published"],
+                name="projects_card_client_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @classmethod
+    def from_project(cls, project):
+        """Construit une carte (non sauvegardée) à partir d'un projet"""
+        client = project.client
+        categories = [
+            {"name": category.name, "slug": category.slug, "color": category.color}
+            for category in project.categories.all()
+        ]
+
+        return cls(
+            project=project,
+            title=project.title,
+            slug=project.slug,
+            subtitle=project.subtitle,
+            description=project.description,
+            client_name=client.name,
+            client_slug=client.slug,
+            client_website=client.website,
+            client_logo_thumbnail=client.logo_urls["thumbnail"],
+            client_logo_white_thumbnail=client.logo_white_urls["thumbnail"],
+            categories=categories,
+            category_slugs="".join(f"|{category['slug']}" for category in categories)
+            + ("|" if categories else ""),
+            image_urls=project.featured_image_urls,
+            responsive_image=project.featured_image_responsive,
+            status=project.status,
+            is_featured=project.is_featured,
+            is_published=project.is_published,
+            order=project.order,
+            created_at=project.created_at,
+            updated_at=timezone.now(),
+        )
+
+
+class ProjectSearchDocument(models.Model):
+    """
+    Document texte indexé pour la recherche plein texte (voir projects/search.py).
+
+    Le contenu CKEditor y est stocké sans balises HTML. L'index lui-même est
+    maintenu par la base de données : table virtuelle FTS5 synchronisée par
+    triggers sur SQLite, colonne tsvector générée + index GIN sur PostgreSQL.
+    """
+
+    project = models.OneToOneField(
+        Project,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    title = models.CharField(max_length=200)
+    subtitle = models.CharField(max_length=300, blank=True)
+    description = models.TextField(blank=True)
+    content = models.TextField(blank=True, help_text="Contenu sans balises HTML")
+    client_name = models.CharField(max_length=200, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Document de recherche"
+        verbose_name_plural = "Documents de recherche"
+
+    def __str__(self):
+        return self.title
+
+
+class RelatedProject(models.Model):
+    """
+    Projets similaires précalculés (voir projects/related.py).
+
+    Chaque ligne relie un projet à l'un de ses projets similaires publiés,
+    avec un score fondé sur les catégories partagées et le client commun.
+    Seuls les meilleurs liens de chaque projet sont conservés.
+    """
+
+    project = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="related_links"
+    )
+    related = models.ForeignKey(
+        Project, on_delete=models.CASCADE, related_name="related_backlinks"
+    )
+    score = models.PositiveSmallIntegerField(default=0)
+    shared_categories = models.PositiveSmallIntegerField(default=0)
+    same_client = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = "Projet similaire"
+        verbose_name_plural = "Projets similaires"
+        ordering = ["project", "-score", "-related"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["project", "related"], name="projects_related_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["project", "-score", "-related"],
+                name="projects_related_top_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.project} → {self.related} ({self.score})"
+
+
+class CloudinaryDeletion(models.Model):
+    """
+    Image Cloudinary à supprimer (boîte d'envoi, voir projects/deletions.py).
+
+    Les lignes sont créées dans la transaction de suppression des modèles, puis
+    supprimées par lots après validation ; une ligne en échec est conservée
+    avec son erreur pour une nouvelle tentative.
+    """
+
+    public_id = models.CharField(max_length=255, unique=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Suppression Cloudinary"
+        verbose_name_plural = "Suppressions Cloudinary"
+        ordering = ["pk"]
+
+    def __str__(self):
+        return self.public_id
+
+
+class UploadedImage(models.Model):
+    """
+    Image envoyée sur Cloudinary, indexée par l'empreinte SHA-256 de son
+    contenu (registre des envois, voir projects/uploads.py).
+
+    Une image identique envoyée avec les mêmes options de transformation
+    réutilise l'image existante au lieu d'être envoyée de nouveau.
+    """
+
+    sha256 = models.CharField(max_length=64)
+    options_hash = models.CharField(
+        max_length=64, help_text="Empreinte des options qui modifient le contenu envoyé"
+    )
+    public_id = models.CharField(max_length=255, db_index=True)
+    version = models.CharField(max_length=50, blank=True)
+    format = models.CharField(max_length=20, blank=True)
+    resource_type = models.CharField(max_length=20, default="image")
+    secure_url = models.URLField(max_length=500)
+    bytes = models.PositiveIntegerField(default=0)
+    # Métadonnées de la réponse d'envoi (voir image_backends.upload_metadata)
+    width = models.PositiveIntegerField(blank=True, null=True)
+    height = models.PositiveIntegerField(blank=True, null=True)
+    color = models.CharField(max_length=7, blank=True, help_text="Couleur dominante")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Image envoyée"
+        verbose_name_plural = "Images envoyées"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sha256", "options_hash"], name="projects_uploadedimage_content_unique"
+            ),
+        ]
+
+    def __str__(self):
+        return self.public_id
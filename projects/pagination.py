@@ -0,0 +1,150 @@
+"""
+Pagination par curseur (keyset) pour les listes de projets.
+
+Contrairement au Paginator de Django, aucune requête COUNT(*) ni aucun OFFSET
+n'est exécuté : la page suivante est obtenue en filtrant sur les valeurs de tri
+de la dernière ligne affichée, encodées dans un curseur opaque. Le tri doit se
+terminer par une colonne unique (typiquement "pk") et ne porter que sur des
+colonnes non nulles.
+"""
+
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, QuerySet
+
+# Taille de page maximale imposée côté serveur, quelle que soit la demande
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Curseur illisible ou incompatible avec le tri demandé"""
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder tronque les dates à la milliseconde : deux lignes
+    créées dans la même milliseconde seraient sautées par le curseur. Les
+    dates et heures sont donc encodées avec leurs microsecondes.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def encode_cursor(values):
+    """Encode les valeurs de tri d'une ligne en curseur opaque"""
+    raw = json.dumps(list(values), cls=CursorEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor):
+    """Décode un curseur en liste de valeurs brutes (JSON)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (UnicodeError, binascii.Error, ValueError) as e:
+        raise InvalidCursor(cursor) from e
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values
+
+
+class KeysetPage:
+    """Page de résultats obtenue par curseur"""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Pagine un QuerySet (ou une liste déjà triée) selon `ordering`, par exemple
+    ("-order", "-created_at", "pk").
+    """
+
+    def __init__(self, object_list, ordering, per_page, max_per_page=MAX_PAGE_SIZE):
+        self.object_list = object_list
+        self.ordering = tuple(ordering)
+        self.per_page = max(1, min(int(per_page), max_per_page))
+
+    @property
+    def _fields(self):
+        return [(name.lstrip("-"), name.startswith("-")) for name in self.ordering]
+
+    def page(self, cursor=None):
+        """Retourne la page qui suit `cursor` (la première page si vide)"""
+        values = self._decode(cursor) if cursor else None
+
+        if isinstance(self.object_list, QuerySet):
+            queryset = self.object_list.order_by(*self.ordering)
+            if values is not None:
+                queryset = queryset.filter(self._after_q(values))
+            # Une ligne de plus que nécessaire indique l'existence d'une page suivante
+            rows = list(queryset[: self.per_page + 1])
+        else:
+            rows = self.object_list
+            if values is not None:
+                rows = [obj for obj in rows if self._is_after(obj, values)]
+            rows = list(rows[: self.per_page + 1])
+
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[: self.per_page]
+            next_cursor = encode_cursor(self._values(rows[-1]))
+        return KeysetPage(rows, next_cursor)
+
+    def _values(self, obj):
+        return [getattr(obj, name) for name, _ in self._fields]
+
+    def _decode(self, cursor):
+        values = decode_cursor(cursor)
+        if len(values) != len(self.ordering):
+            raise InvalidCursor(cursor)
+        if not isinstance(self.object_list, QuerySet):
+            return values
+
+        # Conversion des valeurs JSON vers les types Python des champs
+        opts = self.object_list.model._meta
+        try:
+            return [
+                (opts.pk if name == "pk" else opts.get_field(name)).to_python(value)
+                for (name, _), value in zip(self._fields, values)
+            ]
+        except (ValidationError, LookupError) as e:
+            raise InvalidCursor(cursor) from e
+
+    def _after_q(self, values):
+        """(a > x) OU (a = x ET b > y) OU ... en tenant compte du sens du tri"""
+        fields = self._fields
+        condition = Q()
+        for index, (name, descending) in enumerate(fields):
+            step = Q(**{f"{name}__{'lt' if descending else 'gt'}": values[index]})
+            for (previous, _), value in zip(fields[:index], values):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    def _is_after(self, obj, values):
+        for (name, descending), value in zip(self._fields, values):
+            current = getattr(obj, name)
+            if current != value:
+                return current < value if descending else current > value
+        return False
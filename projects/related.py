@@ -0,0 +1,148 @@
+"""
+Calcul des projets similaires.
+
+Le score d'un couple (projet, projet publié) vaut CATEGORY_WEIGHT par
+catégorie partagée, plus CLIENT_WEIGHT si les deux projets ont le même client.
+Les RELATED_PROJECTS_LIMIT meilleurs liens de chaque projet sont stockés dans
+RelatedProject et recalculés par les signaux de projects/signals.py pour les
+seuls projets concernés par une écriture, ou en masse par la commande
+recompute_related_projects.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+
+from .models import Project, ProjectCard, RelatedProject
+
+CATEGORY_WEIGHT = 2
+CLIENT_WEIGHT = 3
+
+# Nombre de projets similaires conservés (et affichés) par projet
+RELATED_PROJECTS_LIMIT = 6
+
+ProjectCategories = Project.categories.through
+
+
+def affected_project_ids(project_ids):
+    """
+    Projets dont les liens peuvent changer quand ceux de `project_ids` changent :
+    eux-mêmes, les projets qui les citent déjà et ceux qui partagent
+    désormais une catégorie ou un client avec eux
+    """
+    project_ids = set(project_ids)
+    if not project_ids:
+        return set()
+
+    category_ids = ProjectCategories.objects.filter(
+        project_id__in=project_ids
+    ).values("projectcategory_id")
+    client_ids = Project.objects.filter(pk__in=project_ids).values("client_id")
+
+    affected = set(project_ids)
+    affected.update(
+        RelatedProject.objects.filter(related_id__in=project_ids).values_list(
+            "project_id", flat=True
+        )
+    )
+    affected.update(
+        ProjectCategories.objects.filter(projectcategory_id__in=category_ids).values_list(
+            "project_id", flat=True
+        )
+    )
+    affected.update(
+        Project.objects.filter(client_id__in=client_ids).values_list("pk", flat=True)
+    )
+    return affected
+
+
+def compute_related(project_ids):
+    """Calcule les liens (non sauvegardés) des projets donnés"""
+    sources = dict(
+        Project.objects.filter(pk__in=project_ids).values_list("pk", "client_id")
+    )
+    if not sources:
+        return []
+
+    source_categories = defaultdict(set)
+    for project_id, category_id in ProjectCategories.objects.filter(
+        project_id__in=sources
+    ).values_list("project_id", "projectcategory_id"):
+        source_categories[project_id].add(category_id)
+
+    # Candidats publiés partageant au moins une catégorie ou le client
+    category_members = defaultdict(set)
+    for project_id, category_id in ProjectCategories.objects.filter(
+        projectcategory_id__in={c for cats in source_categories.values() for c in cats},
+        project__is_published=True,
+    ).values_list("project_id", "projectcategory_id"):
+        category_members[category_id].add(project_id)
+
+    client_members = defaultdict(set)
+    for project_id, client_id in Project.objects.filter(
+        client_id__in=set(sources.values()), is_published=True
+    ).values_list("pk", "client_id"):
+        client_members[client_id].add(project_id)
+
+    links = []
+    for project_id, client_id in sources.items():
+        shared = defaultdict(int)
+        for category_id in source_categories[project_id]:
+            for candidate in category_members[category_id]:
+                shared[candidate] += 1
+        same_client = client_members[client_id]
+
+        scored = []
+        for candidate in set(shared) | same_client:
+            if candidate == project_id:
+                continue
+            is_same_client = candidate in same_client
+            score = shared[candidate] * CATEGORY_WEIGHT + (
+                CLIENT_WEIGHT if is_same_client else 0
+            )
+            scored.append((score, candidate, shared[candidate], is_same_client))
+
+        # Meilleur score d'abord, puis le projet le plus récent
+        scored.sort(reverse=True)
+        links.extend(
+            RelatedProject(
+                project_id=project_id,
+                related_id=candidate,
+                score=score,
+                shared_categories=shared_count,
+                same_client=is_same_client,
+            )
+            for score, candidate, shared_count, is_same_client in scored[
+                :RELATED_PROJECTS_LIMIT
+            ]
+        )
+    return links
+
+
+def refresh_related(project_ids):
+    """Remplace les liens des projets donnés ; retourne le nombre de liens créés"""
+    project_ids = list(project_ids)
+    if not project_ids:
+        return 0
+
+    links = compute_related(project_ids)
+    with transaction.atomic():
+        RelatedProject.objects.filter(project_id__in=project_ids).delete()
+        RelatedProject.objects.bulk_create(links)
+    return len(links)
+
+
+def refresh_affected(project_ids):
+    """Recalcule les liens de tous les projets touchés par `project_ids`"""
+    return refresh_related(affected_project_ids(project_ids))
+
+
+def related_cards(project, limit=RELATED_PROJECTS_LIMIT):
+    """Cartes des projets similaires, dans l'ordre du score"""
+    related_ids = list(
+        RelatedProject.objects.filter(project=project).values_list(
+            "related_id", flat=True
+        )[:limit]
+    )
+    cards = ProjectCard.objects.published().in_bulk(related_ids)
+    return [cards[pk] for pk in related_ids if pk in cards]
@@ -0,0 +1,230 @@
+"""
+Recherche plein texte des projets.
+
+Le texte indexé est stocké dans ProjectSearchDocument (contenu CKEditor sans
+balises HTML) et tenu à jour par les signaux de projects/signals.py. L'index
+dépend du moteur de base de données (voir la migration 0007) :
+
+- SQLite : table virtuelle FTS5 synchronisée par triggers, classement bm25
+- PostgreSQL : colonne tsvector générée + index GIN, classement ts_rank
+- Autres moteurs (ou SQLite sans FTS5) : repli sur des icontains
+"""
+
+import html
+import re
+from collections import namedtuple
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+
+from .models import Project, ProjectSearchDocument
+
+FTS_TABLE = "projects_search_fts"
+
+# Nombre maximum de résultats classés renvoyés par l'index
+SEARCH_MAX_RESULTS = 200
+
+# Marqueurs de surlignage, remplacés par <mark> après échappement HTML
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_STOP = "\x03"
+
+# Poids bm25 des colonnes FTS5 : title, subtitle, description, content, client_name
+SQLITE_COLUMN_WEIGHTS = (10.0, 5.0, 3.0, 1.0, 5.0)
+
+SearchHit = namedtuple("SearchHit", ["project_id", "rank", "snippet"])
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def html_to_text(value):
+    """Convertit un contenu HTML (CKEditor) en texte brut indexable"""
+    if not value:
+        return ""
+    text = html.unescape(strip_tags(value))
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _render_snippet(raw):
+    """Échappe un extrait et remplace les marqueurs de surlignage"""
+    if not raw:
+        return ""
+    return mark_safe(
+        escape(raw)
+        .replace(HIGHLIGHT_START, "<mark>")
+        .replace(HIGHLIGHT_STOP, "</mark>")
+    )
+
+
+def build_document(project):
+    """Construit le document de recherche (non sauvegardé) d'un projet"""
+    return ProjectSearchDocument(
+        project=project,
+        title=project.title,
+        subtitle=project.subtitle,
+        description=html_to_text(project.description),
+        content=html_to_text(project.content),
+        client_name=project.client.name,
+    )
+
+
+def index_projects(project_ids):
+    """(Ré)indexe les projets donnés ; l'index suit via triggers / colonne générée"""
+    project_ids = list(project_ids)
+    if not project_ids:
+        return 0
+
+    projects = Project.objects.filter(pk__in=project_ids).select_related("client")
+    documents = [build_document(project) for project in projects]
+
+    ProjectSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["project"],
+        update_fields=["title", "subtitle", "description", "content", "client_name", "updated_at"],
+    )
+    return len(documents)
+
+
+def rebuild_index(batch_size=200, stdout=None):
+    """Réindexe tous les projets par lots et compacte l'index"""
+    # Une seule transaction : la recherche sert l'ancien index pendant la reconstruction
+    with transaction.atomic():
+        ProjectSearchDocument.objects.all().delete()
+
+        project_ids = list(Project.objects.values_list("pk", flat=True))
+        indexed = 0
+        for start in range(0, len(project_ids), batch_size):
+            indexed += index_projects(project_ids[start:start + batch_size])
+            if stdout:
+                stdout.write(f"   ✅ [{indexed}/{len(project_ids)}]")
+
+    if _backend() == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+    return indexed
+
+
+def search(query, limit=SEARCH_MAX_RESULTS, candidates=None):
+    """
+    Recherche les projets correspondant à `query`.
+
+    `candidates` (queryset dont la clé primaire est l'id du projet, par
+    exemple les cartes publiées et filtrées) restreint la recherche avant
+    l'application de `limit`.
+
+    Retourne une liste de SearchHit triée par pertinence décroissante ;
+    `snippet` est un extrait HTML sûr avec les termes entourés de <mark>.
+    """
+    terms = _WORD_RE.findall(query or "")
+    if not terms:
+        return []
+
+    backend = _backend()
+    if backend == "sqlite":
+        return _search_sqlite(terms, limit, candidates)
+    if backend == "postgresql":
+        return _search_postgresql(query, limit, candidates)
+    return _search_fallback(terms, limit, candidates)
+
+
+def _candidates_sql(column, candidates):
+    """Condition SQL `column IN (<sous-requête des candidats>)` et ses paramètres"""
+    if candidates is None:
+        return "", []
+    sql, params = candidates.values("pk").query.sql_with_params()
+    return f" AND {column} IN ({sql})", list(params)
+
+
+_fts5_available = None
+
+
+def _backend():
+    """Détermine l'implémentation de l'index disponible sur la connexion"""
+    global _fts5_available
+
+    if connection.vendor == "sqlite":
+        if _fts5_available is None:
+            _fts5_available = FTS_TABLE in connection.introspection.table_names()
+        return "sqlite" if _fts5_available else "fallback"
+    if connection.vendor == "postgresql":
+        return "postgresql"
+    return "fallback"
+
+
+def _search_sqlite(terms, limit, candidates=None):
+    # Chaque terme est cité (aucune syntaxe FTS5 injectable) et recherché en préfixe
+    match = " ".join('"{}"*'.format(term.replace('"', "")) for term in terms)
+    weights = ", ".join(str(weight) for weight in SQLITE_COLUMN_WEIGHTS)
+    restrict, restrict_params = _candidates_sql("rowid", candidates)
+    sql = (
+        f"SELECT rowid, bm25({FTS_TABLE}, {weights}) AS rank, "
+        f"snippet({FTS_TABLE}, -1, %s, %s, '…', 24) "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s{restrict} "
+        f"ORDER BY rank LIMIT %s"
+    )
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, [HIGHLIGHT_START, HIGHLIGHT_STOP, match, *restrict_params, limit]
+            )
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return _search_fallback(terms, limit, candidates)
+
+    # bm25 est négatif : plus petit = plus pertinent
+    return [SearchHit(row[0], -row[1], _render_snippet(row[2])) for row in rows]
+
+
+def _search_postgresql(query, limit, candidates=None):
+    restrict, restrict_params = _candidates_sql("project_id", candidates)
+    sql = (
+        "SELECT project_id, ts_rank(search_vector, q) AS rank, "
+        "ts_headline('french', coalesce(description, '') || ' ' || coalesce(content, ''), q, "
+        "%s) "
+        "FROM projects_projectsearchdocument, websearch_to_tsquery('french', %s) q "
+        f"WHERE search_vector @@ q{restrict} ORDER BY rank DESC LIMIT %s"
+    )
+    options = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords=35, MinWords=15"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [options, query, *restrict_params, limit])
+        rows = cursor.fetchall()
+    return [SearchHit(row[0], row[1], _render_snippet(row[2])) for row in rows]
+
+
+def _search_fallback(terms, limit, candidates=None):
+    """Repli sans index : tous les termes doivent apparaître dans un des champs"""
+    documents = ProjectSearchDocument.objects.all()
+    if candidates is not None:
+        documents = documents.filter(project_id__in=candidates.values("pk"))
+    for term in terms:
+        documents = documents.filter(
+            Q(title__icontains=term)
+            | Q(subtitle__icontains=term)
+            | Q(description__icontains=term)
+            | Q(content__icontains=term)
+            | Q(client_name__icontains=term)
+        )
+
+    hits = []
+    for document in documents.order_by("-updated_at")[:limit]:
+        text = f"{document.description} {document.content}"
+        hits.append(SearchHit(document.project_id, 0, _fallback_snippet(text, terms)))
+    return hits
+
+
+def _fallback_snippet(text, terms, radius=120):
+    """Extrait autour de la première occurrence d'un terme, termes surlignés"""
+    lowered = text.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [position for position in positions if position >= 0]
+    start = max(min(positions) - radius // 2, 0) if positions else 0
+    excerpt = text[start:start + radius]
+
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+    excerpt = pattern.sub(lambda m: f"{HIGHLIGHT_START}{m.group(0)}{HIGHLIGHT_STOP}", excerpt)
+    return _render_snippet(("…" if start else "") + excerpt)
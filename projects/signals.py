@@ -1,59 +1,21 @@
-from django.db.models.signals import post_save, pre_delete
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.core.files.uploadedfile import UploadedFile
 from django.dispatch import receiver
-from .models import Project, ProjectImage, ProjectTestimonial, Client
-import cloudinary.uploader
-import logging
-
-logger = logging.getLogger(__name__)
-
-
-def generate_image_versions(original_field, large_field_name, thumb_field_name, instance, 
-                          large_folder, thumb_folder, large_transform, thumb_transform, 
-                          public_id_field, identifier):
-    """
-    Fonction utilitaire pour générer les versions d'images
-    """    
-    if not original_field:
-        return False
-    
-    # Vérifier si les versions existent déjà
-    large_field_value = getattr(instance, large_field_name, None)
-    if large_field_value:
-        return False
-    
-    try:        
-        # Générer la version large
-        large_result = cloudinary.uploader.upload(
-            original_field.url,
-            folder=large_folder,
-            public_id=f"{identifier}_large",
-            transformation=large_transform,
-            overwrite=True
-        )
-        
-        # Générer la version thumbnail
-        thumb_result = cloudinary.uploader.upload(
-            original_field.url,
-            folder=thumb_folder,
-            public_id=f"{identifier}_thumb",
-            transformation=thumb_transform,
-            overwrite=True
-        )
-        
-        # Mettre à jour les champs
-        setattr(instance, large_field_name, large_result['secure_url'])
-        setattr(instance, thumb_field_name, thumb_result['secure_url'])
-        
-        # Sauvegarder le public_id original si pas déjà fait
-        if hasattr(instance, public_id_field) and not getattr(instance, public_id_field):
-            setattr(instance, public_id_field, original_field.public_id)
-        
-        return True
-        
-    except Exception as e:
-        logger.error(f"Erreur lors de la génération des versions d'images pour {identifier}: {str(e)}")
-        return False
-
+from . import related, search
+from .images import backfill_resolved_image_urls, resolve_image_urls
+from .variants import VARIANT_SPECS, enqueue_variants
+from .uploads import upload_field
+from .deletions import image_public_ids, schedule_deletion
+from .cache import CATALOG_NAMESPACE, PORTFOLIO_NAMESPACE, STATS_NAMESPACE, bump_generation
+from .models import (
+    Project,
+    ProjectImage,
+    ProjectTestimonial,
+    Client,
+    ProjectCategory,
+    ProjectMetrics,
+    ProjectCard,
+)
 
 # ===============================
 # SIGNAUX POUR LE MODÈLE PROJECT
@@ -62,60 +24,18 @@ def generate_image_versions(original_field, large_field_name, thumb_field_name,
 @receiver(post_save, sender=Project)
 def generate_project_featured_image_versions(sender, instance, created, **kwargs):
     """
-    Génère automatiquement les versions optimisées de l'image principale du projet
+    Met en file la génération des versions optimisées de l'image principale du projet
     """
-    if instance.featured_image and not instance.featured_image_large:        
-        success = generate_image_versions(
-            original_field=instance.featured_image,
-            large_field_name="featured_image_large",
-            thumb_field_name="thumbnail",
-            instance=instance,
-            large_folder="projects/featured/large",
-            thumb_folder="projects/featured/thumbnails",
-            large_transform=[
-                {"width": 1200, "height": 800, "crop": "fill"},
-                {"quality": "auto"},
-                {"fetch_format": "auto"},
-            ],
-            thumb_transform=[
-                {"width": 400, "height": 300, "crop": "fill"},
-                {"quality": "auto"},
-                {"fetch_format": "auto"},
-            ],
-            public_id_field="featured_image_cloudinary_public_id",
-            identifier=instance.slug
-        )
-        
-        if success:
-            # Sauvegarder sans déclencher le signal à nouveau
-            Project.objects.filter(pk=instance.pk).update(
-                featured_image_large=instance.featured_image_large,
-                thumbnail=instance.thumbnail,
-                featured_image_cloudinary_public_id=instance.featured_image_cloudinary_public_id
-            )
-            logger.info(f"Versions d'images générées pour le projet: {instance.title}")
-        else:
-            logger.error(f"Échec de la génération des versions pour: {instance.title}")
+    enqueue_variants(instance, "featured_image")
 
 
 @receiver(pre_delete, sender=Project)
 def cleanup_project_images(sender, instance, **kwargs):
     """
-    Nettoie toutes les versions d'images Cloudinary du projet avant suppression
+    Prévoit la suppression des images Cloudinary du projet et de leurs versions,
+    effectuée par lots après validation de la transaction (voir projects/deletions.py)
     """
-    public_ids_to_delete = []
-    
-    if instance.featured_image_cloudinary_public_id:
-        public_ids_to_delete.append(instance.featured_image_cloudinary_public_id)
-        public_ids_to_delete.append(f"{instance.slug}_large")
-        public_ids_to_delete.append(f"{instance.slug}_thumb")
-    
-    for public_id in public_ids_to_delete:
-        try:
-            cloudinary.uploader.destroy(public_id, resource_type="image")
-            logger.info(f"Image Cloudinary supprimée: {public_id}")
-        except Exception as e:
-            logger.error(f"Erreur lors de la suppression de l'image {public_id}: {str(e)}")
+    schedule_deletion(image_public_ids(instance))
 
 
 # ===================================
@@ -125,59 +45,18 @@ def cleanup_project_images(sender, instance, **kwargs):
 @receiver(post_save, sender=ProjectImage)
 def generate_project_image_versions(sender, instance, created, **kwargs):
     """
-    Génère automatiquement les versions optimisées des images de galerie
+    Met en file la génération des versions optimisées des images de galerie
     """
-    if instance.image and not instance.image_large:
-        success = generate_image_versions(
-            original_field=instance.image,
-            large_field_name="image_large",
-            thumb_field_name="image_thumbnail",
-            instance=instance,
-            large_folder="projects/gallery/large",
-            thumb_folder="projects/gallery/thumbnails",
-            large_transform=[
-                {"width": 1200, "height": 800, "crop": "limit"},
-                {"quality": "auto"},
-                {"fetch_format": "auto"},
-            ],
-            thumb_transform=[
-                {"width": 300, "height": 200, "crop": "fill"},
-                {"quality": "auto"},
-                {"fetch_format": "auto"},
-            ],
-            public_id_field="image_cloudinary_public_id",
-            identifier=f"{instance.project.slug}_gallery_{instance.id}"
-        )
-        
-        if success:
-            # Sauvegarder sans déclencher le signal à nouveau
-            ProjectImage.objects.filter(pk=instance.pk).update(
-                image_large=instance.image_large,
-                image_thumbnail=instance.image_thumbnail,
-                image_cloudinary_public_id=instance.image_cloudinary_public_id
-            )
-            logger.info(f"Versions d'images générées pour l'image de galerie: {instance.project.title}")
+    enqueue_variants(instance, "image")
 
 
 @receiver(pre_delete, sender=ProjectImage)
 def cleanup_project_image(sender, instance, **kwargs):
     """
-    Nettoie toutes les versions d'images Cloudinary de l'image de galerie avant suppression
+    Prévoit la suppression des images Cloudinary de l'image de galerie et de leurs versions,
+    effectuée par lots après validation de la transaction (voir projects/deletions.py)
     """
-    public_ids_to_delete = []
-    
-    if instance.image_cloudinary_public_id:
-        identifier = f"{instance.project.slug}_gallery_{instance.id}"
-        public_ids_to_delete.append(instance.image_cloudinary_public_id)
-        public_ids_to_delete.append(f"{identifier}_large")
-        public_ids_to_delete.append(f"{identifier}_thumb")
-    
-    for public_id in public_ids_to_delete:
-        try:
-            cloudinary.uploader.destroy(public_id, resource_type="image")
-            logger.info(f"Image Cloudinary supprimée: {public_id}")
-        except Exception as e:
-            logger.error(f"Erreur lors de la suppression de l'image {public_id}: {str(e)}")
+    schedule_deletion(image_public_ids(instance))
 
 
 # =====================================
@@ -187,100 +66,19 @@ def cleanup_project_image(sender, instance, **kwargs):
 @receiver(post_save, sender=Client)
 def generate_client_logo_versions(sender, instance, created, **kwargs):
     """
-    Génère automatiquement les versions optimisées des logos client
+    Met en file la génération des versions optimisées des logos client
     """
-    # Générer les versions du logo principal
-    if instance.logo and not instance.logo_large:
-        success = generate_image_versions(
-            original_field=instance.logo,
-            large_field_name="logo_large",
-            thumb_field_name="logo_thumbnail",
-            instance=instance,
-            large_folder="clients/logos/large",
-            thumb_folder="clients/logos/thumbnails",
-            large_transform=[
-                {"width": 400, "crop": "limit"},
-                {"quality": "auto"},
-                {"fetch_format": "auto"},
-            ],
-            thumb_transform=[
-                {"width": 150, "height": 150, "crop": "fit"},
-                {"quality": "auto"},
-                {"fetch_format": "auto"},
-            ],
-            public_id_field="logo_cloudinary_public_id",
-            identifier=f"{instance.slug}_logo"
-        )
-        
-        if success:
-            Client.objects.filter(pk=instance.pk).update(
-                logo_large=instance.logo_large,
-                logo_thumbnail=instance.logo_thumbnail,
-                logo_cloudinary_public_id=instance.logo_cloudinary_public_id
-            )
-            logger.info(f"Versions du logo générées pour le client: {instance.name}")
-    
-    # Générer les versions du logo blanc
-    if instance.logo_white and not instance.logo_white_large:
-        success = generate_image_versions(
-            original_field=instance.logo_white,
-            large_field_name="logo_white_large",
-            thumb_field_name="logo_white_thumbnail",
-            instance=instance,
-            large_folder="clients/logos/white/large",
-            thumb_folder="clients/logos/white/thumbnails",
-            large_transform=[
-                {"width": 400, "crop": "limit"},
-                {"quality": "auto"},
-                {"fetch_format": "auto"},
-            ],
-            thumb_transform=[
-                {"width": 150, "height": 150, "crop": "fit"},
-                {"quality": "auto"},
-                {"fetch_format": "auto"},
-            ],
-            public_id_field="logo_white_cloudinary_public_id",
-            identifier=f"{instance.slug}_logo_white"
-        )
-        
-        if success:
-            Client.objects.filter(pk=instance.pk).update(
-                logo_white_large=instance.logo_white_large,
-                logo_white_thumbnail=instance.logo_white_thumbnail,
-                logo_white_cloudinary_public_id=instance.logo_white_cloudinary_public_id
-            )
-            logger.info(f"Versions du logo blanc générées pour le client: {instance.name}")
+    enqueue_variants(instance, "logo")
+    enqueue_variants(instance, "logo_white")
 
 
 @receiver(pre_delete, sender=Client)
 def cleanup_client_images(sender, instance, **kwargs):
     """
-    Nettoie toutes les versions d'images Cloudinary du client avant suppression
+    Prévoit la suppression des images Cloudinary du client et de leurs versions,
+    effectuée par lots après validation de la transaction (voir projects/deletions.py)
     """
-    public_ids_to_delete = []
-    
-    # Logos principaux
-    if instance.logo_cloudinary_public_id:
-        public_ids_to_delete.extend([
-            instance.logo_cloudinary_public_id,
-            f"{instance.slug}_logo_large",
-            f"{instance.slug}_logo_thumb"
-        ])
-    
-    # Logos blancs
-    if instance.logo_white_cloudinary_public_id:
-        public_ids_to_delete.extend([
-            instance.logo_white_cloudinary_public_id,
-            f"{instance.slug}_logo_white_large",
-            f"{instance.slug}_logo_white_thumb"
-        ])
-    
-    for public_id in public_ids_to_delete:
-        try:
-            cloudinary.uploader.destroy(public_id, resource_type="image")
-            logger.info(f"Image Cloudinary supprimée: {public_id}")
-        except Exception as e:
-            logger.error(f"Erreur lors de la suppression de l'image {public_id}: {str(e)}")
+    schedule_deletion(image_public_ids(instance))
 
 
 # ==========================================
@@ -290,57 +88,271 @@ def cleanup_client_images(sender, instance, **kwargs):
 @receiver(post_save, sender=ProjectTestimonial)
 def generate_testimonial_photo_versions(sender, instance, created, **kwargs):
     """
-    Génère automatiquement les versions optimisées de la photo client du témoignage
+    Met en file la génération des versions optimisées de la photo client du témoignage
     """
-    if instance.client_photo and not instance.client_photo_large:
-        success = generate_image_versions(
-            original_field=instance.client_photo,
-            large_field_name="client_photo_large",
-            thumb_field_name="client_photo_thumbnail",
-            instance=instance,
-            large_folder="testimonials/large",
-            thumb_folder="testimonials/thumbnails",
-            large_transform=[
-                {"width": 200, "height": 200, "crop": "fill", "gravity": "face"},
-                {"quality": "auto"},
-                {"fetch_format": "auto"},
-            ],
-            thumb_transform=[
-                {"width": 80, "height": 80, "crop": "fill", "gravity": "face"},
-                {"quality": "auto"},
-                {"fetch_format": "auto"},
-            ],
-            public_id_field="client_photo_cloudinary_public_id",
-            identifier=f"{instance.project.slug}_testimonial"
-        )
-        
-        if success:
-            ProjectTestimonial.objects.filter(pk=instance.pk).update(
-                client_photo_large=instance.client_photo_large,
-                client_photo_thumbnail=instance.client_photo_thumbnail,
-                client_photo_cloudinary_public_id=instance.client_photo_cloudinary_public_id
-            )
-            logger.info(f"Versions de la photo client générées pour le témoignage: {instance.project.title}")
+    enqueue_variants(instance, "client_photo")
 
 
 @receiver(pre_delete, sender=ProjectTestimonial)
 def cleanup_testimonial_images(sender, instance, **kwargs):
     """
-    Nettoie toutes les versions d'images Cloudinary du témoignage avant suppression
+    Prévoit la suppression des images Cloudinary du témoignage et de leurs versions,
+    effectuée par lots après validation de la transaction (voir projects/deletions.py)
+    """
+    schedule_deletion(image_public_ids(instance))
+
+
+# ======================================
+# ENVOIS D'IMAGES DÉDUPLIQUÉS
+# ======================================
+
+@receiver(pre_save, sender=Project)
+@receiver(pre_save, sender=ProjectImage)
+@receiver(pre_save, sender=Client)
+@receiver(pre_save, sender=ProjectTestimonial)
+def upload_image_fields(sender, instance, **kwargs):
+    """
+    Envoie les images en attente par le registre des envois : un contenu déjà
+    présent sur Cloudinary est réutilisé (voir projects/uploads.py)
+    """
+    for label, field in VARIANT_SPECS:
+        if label == sender._meta.label_lower and isinstance(getattr(instance, field), UploadedFile):
+            upload_field(instance, field)
+
+
+# ======================================
+# URL D'IMAGES RÉSOLUES
+# ======================================
+
+@receiver(pre_save, sender=Project)
+@receiver(pre_save, sender=ProjectImage)
+@receiver(pre_save, sender=Client)
+@receiver(pre_save, sender=ProjectTestimonial)
+def persist_resolved_image_urls(sender, instance, **kwargs):
+    """
+    Enregistre les URL d'images résolues avec l'instance ; les fichiers en
+    attente d'upload sont résolus lors de la génération des versions
+    """
+    resolve_image_urls(instance)
+
+
+# ======================================
+# INVALIDATION DES CACHES DES APIS
+# ======================================
+
+# Espaces de noms de cache (voir projects/cache.py) invalidés par chaque modèle
+CACHE_INVALIDATION_SENDERS = {
+    Project: (PORTFOLIO_NAMESPACE, CATALOG_NAMESPACE, STATS_NAMESPACE),
+    Client: (PORTFOLIO_NAMESPACE, CATALOG_NAMESPACE, STATS_NAMESPACE),
+    ProjectCategory: (PORTFOLIO_NAMESPACE, CATALOG_NAMESPACE, STATS_NAMESPACE),
+    ProjectMetrics: (PORTFOLIO_NAMESPACE,),
+    ProjectTestimonial: (PORTFOLIO_NAMESPACE,),
+    ProjectImage: (STATS_NAMESPACE,),
+    # Les catégories d'un projet sont enregistrées après le save() du projet
+    Project.categories.through: (PORTFOLIO_NAMESPACE, CATALOG_NAMESPACE, STATS_NAMESPACE),
+}
+
+
+def invalidate_api_caches(sender, action=None, **kwargs):
+    """
+    Incrémente la génération des espaces de noms exposant le modèle modifié :
+    toutes les réponses en cache correspondantes deviennent obsolètes
+    """
+    # m2m_changed émet aussi des actions pre_* : seules les post_* comptent
+    if action is not None and not action.startswith("post_"):
+        return
+    bump_generation(*CACHE_INVALIDATION_SENDERS[sender])
+
+
+for _sender in CACHE_INVALIDATION_SENDERS:
+    if _sender is Project.categories.through:
+        m2m_changed.connect(
+            invalidate_api_caches,
+            sender=_sender,
+            dispatch_uid="api_caches_m2m_categories",
+        )
+        continue
+    post_save.connect(
+        invalidate_api_caches,
+        sender=_sender,
+        dispatch_uid=f"api_caches_post_save_{_sender.__name__}",
+    )
+    post_delete.connect(
+        invalidate_api_caches,
+        sender=_sender,
+        dispatch_uid=f"api_caches_post_delete_{_sender.__name__}",
+    )
+
+
+# ======================================
+# MODÈLE DE LECTURE PROJECTCARD
+# ======================================
+
+@receiver(post_save, sender=Project)
+def refresh_project_card(sender, instance, **kwargs):
+    """
+    Reconstruit la carte du projet (après la génération des versions d'images,
+    dont les receivers sont connectés plus haut)
+    """
+    ProjectCard.objects.refresh([instance.pk])
+
+
+@receiver(m2m_changed, sender=Project.categories.through)
+def refresh_project_cards_on_categories_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Reconstruit les cartes lorsque les catégories d'un projet changent,
+    depuis le projet (project.categories) ou depuis la catégorie
+    (category.projects)
+    """
+    if not action.startswith("post_"):
+        return
+
+    if not reverse:
+        ProjectCard.objects.refresh([instance.pk])
+    elif action == "post_clear":
+        # pk_set vaut None pour un clear() : les cartes concernées sont
+        # celles qui référencent encore la catégorie
+        ProjectCard.objects.refresh(
+            ProjectCard.objects.in_category(instance.slug).values_list("pk", flat=True)
+        )
+    else:
+        ProjectCard.objects.refresh(pk_set or [])
+
+
+@receiver(post_save, sender=Client)
+def refresh_client_project_cards(sender, instance, created, **kwargs):
+    """Propage le nom, le site et les logos du client dans les cartes"""
+    if not created:
+        ProjectCard.objects.refresh(instance.projects.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=ProjectCategory)
+def refresh_category_project_cards(sender, instance, created, **kwargs):
+    """Propage le nom, le slug et la couleur de la catégorie dans les cartes"""
+    if not created:
+        ProjectCard.objects.refresh(instance.projects.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=ProjectCategory)
+def collect_category_project_cards(sender, instance, **kwargs):
+    """Mémorise les projets de la catégorie avant que la relation ne disparaisse"""
+    instance._card_project_ids = list(instance.projects.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=ProjectCategory)
+def refresh_deleted_category_project_cards(sender, instance, **kwargs):
+    """Retire la catégorie supprimée des cartes concernées"""
+    ProjectCard.objects.refresh(getattr(instance, "_card_project_ids", []))
+
+
+# ======================================
+# PROJETS SIMILAIRES
+# ======================================
+
+@receiver(pre_save, sender=Project)
+def remember_project_related_state(sender, instance, **kwargs):
+    """Mémorise le client et la publication avant l'enregistrement"""
+    instance._related_state = (
+        Project.objects.filter(pk=instance.pk)
+        .values_list("client_id", "is_published")
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Project)
+def refresh_project_related(sender, instance, created, **kwargs):
+    """Recalcule les projets similaires si le client ou la publication change"""
+    state = (instance.client_id, instance.is_published)
+    if created or getattr(instance, "_related_state", None) != state:
+        related.refresh_affected([instance.pk])
+
+
+@receiver(m2m_changed, sender=Project.categories.through)
+def refresh_related_on_categories_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Recalcule les projets similaires quand des catégories sont (dés)associées"""
+    if action == "pre_clear" and reverse:
+        # pk_set vaut None pour un clear() depuis la catégorie
+        instance._related_project_ids = list(instance.projects.values_list("pk", flat=True))
+    if not action.startswith("post_"):
+        return
+
+    if not reverse:
+        related.refresh_affected([instance.pk])
+    elif action == "post_clear":
+        related.refresh_affected(getattr(instance, "_related_project_ids", []))
+    else:
+        related.refresh_affected(pk_set or [])
+
+
+@receiver(pre_delete, sender=Project)
+def collect_related_backlinks(sender, instance, **kwargs):
+    """Mémorise les projets qui citent le projet supprimé"""
+    instance._related_backlink_ids = list(
+        instance.related_backlinks.values_list("project_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Project)
+def refresh_related_backlinks(sender, instance, **kwargs):
+    """Complète les liens des projets qui citaient le projet supprimé"""
+    related.refresh_related(getattr(instance, "_related_backlink_ids", []))
+
+
+@receiver(post_delete, sender=ProjectCategory)
+def refresh_deleted_category_related(sender, instance, **kwargs):
+    """Les projets de la catégorie supprimée perdent une catégorie partagée"""
+    related.refresh_affected(getattr(instance, "_card_project_ids", []))
+
+
+# ======================================
+# INDEX DE RECHERCHE PLEIN TEXTE
+# ======================================
+
+@receiver(post_save, sender=Project)
+def index_project_search_document(sender, instance, **kwargs):
+    """Met à jour le document de recherche du projet"""
+    search.index_projects([instance.pk])
+
+
+@receiver(post_save, sender=Client)
+def index_client_projects_search_documents(sender, instance, created, **kwargs):
+    """Le nom du client fait partie du texte indexé de ses projets"""
+    if not created:
+        search.index_projects(instance.projects.values_list("pk", flat=True))
+
+
+def refresh_after_bulk_update(model, pks):
+    """
+    QuerySet.update() n'émet aucun signal : les actions groupées de l'admin
+    appellent cette fonction pour invalider les caches et les modèles de lecture
+    """
+    pks = list(pks)
+    bump_generation(*CACHE_INVALIDATION_SENDERS[model])
+    if model is Project:
+        ProjectCard.objects.refresh(pks)
+        related.refresh_affected(pks)
+    elif model is Client:
+        ProjectCard.objects.refresh(
+            Project.objects.filter(client_id__in=pks).values_list("pk", flat=True)
+        )
+
+
+def backfill_read_models(sender, using="default", **kwargs):
+    """
+    Après les migrations, construit les cartes et documents de recherche
+    manquants (par exemple lors du premier déploiement de ces modèles)
     """
-    public_ids_to_delete = []
-    
-    if instance.client_photo_cloudinary_public_id:
-        identifier = f"{instance.project.slug}_testimonial"
-        public_ids_to_delete.extend([
-            instance.client_photo_cloudinary_public_id,
-            f"{identifier}_large",
-            f"{identifier}_thumb"
-        ])
-    
-    for public_id in public_ids_to_delete:
-        try:
-            cloudinary.uploader.destroy(public_id, resource_type="image")
-            logger.info(f"Image Cloudinary supprimée: {public_id}")
-        except Exception as e:
-            logger.error(f"Erreur lors de la suppression de l'image {public_id}: {str(e)}")
+    projects = Project.objects.using(using)
+    ProjectCard.objects.refresh(
+        projects.filter(card__isnull=True).values_list("pk", flat=True)
+    )
+    search.index_projects(
+        projects.filter(search_document__isnull=True).values_list("pk", flat=True)
+    )
+    related.refresh_related(
+        projects.filter(related_links__isnull=True).values_list("pk", flat=True)
+    )
+    for model in (Project, ProjectImage, Client, ProjectTestimonial):
+        backfill_resolved_image_urls(model, using=using)
@@ -0,0 +1,122 @@
+"""
+Statistiques agrégées des projets.
+
+Tous les compteurs d'une table sont calculés en une seule requête
+d'agrégation conditionnelle (COUNT ... FILTER), puis l'instantané complet est
+mis en cache. Sa génération (STATS_NAMESPACE) est incrémentée par les signaux
+d'écriture : l'API et le tableau de bord de l'admin lisent donc la même
+valeur, recalculée au plus une fois par écriture ou par expiration du TTL.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .cache import STATS_NAMESPACE, make_cache_key
+from .models import Client, Project, ProjectCategory, ProjectImage, ProjectStatus
+
+
+# Compteurs réservés au tableau de bord de l'admin, absents de l'API publique
+ADMIN_ONLY_STATS = ("all_featured_projects", "total_images")
+
+
+def get_stats_timeout():
+    """Durée de vie de l'instantané des statistiques (secondes)"""
+    return getattr(settings, "PROJECTS_STATS_CACHE_TIMEOUT", 5 * 60)
+
+
+def _project_counters():
+    """Compteurs des projets en une seule requête"""
+    aggregates = {
+        "total_projects": Count("id"),
+        "published_projects": Count("id", filter=Q(is_published=True)),
+        "featured_projects": Count("id", filter=Q(is_featured=True, is_published=True)),
+        "all_featured_projects": Count("id", filter=Q(is_featured=True)),
+    }
+    for status in ProjectStatus.values:
+        aggregates[f"status_{status}"] = Count("id", filter=Q(status=status))
+    return Project.objects.aggregate(**aggregates)
+
+
+def compute_stats():
+    """Calcule l'instantané complet des statistiques (sans cache)"""
+    counters = _project_counters()
+    by_status = {
+        status: counters.pop(f"status_{status}") for status in ProjectStatus.values
+    }
+
+    by_category = list(
+        ProjectCategory.objects.annotate(
+            project_count=Count("projects", filter=Q(projects__is_published=True))
+        ).values("name", "color", "project_count")
+    )
+
+    clients = Client.objects.aggregate(active_clients=Count("id", filter=Q(is_active=True)))
+
+    # Clients les plus actifs
+    client_stats = (
+        Client.objects.annotate(
+            project_count=Count("projects", filter=Q(projects__is_published=True))
+        )
+        .filter(project_count__gt=0)
+        .order_by("-project_count")[:5]
+    )
+
+    # Projets récents
+    recent_projects = (
+        Project.objects.filter(is_published=True)
+        .select_related("client")
+        .order_by("order")[:5]
+    )
+
+    return {
+        **counters,
+        "draft_projects": by_status[ProjectStatus.DRAFT],
+        "completed_projects": by_status[ProjectStatus.COMPLETED],
+        "active_clients": clients["active_clients"],
+        "total_categories": len(by_category),
+        "total_images": ProjectImage.objects.count(),
+        "by_status": {status: count for status, count in by_status.items() if count},
+        "by_category": by_category,
+        "top_clients": [
+            {
+                "name": client.name,
+                "slug": client.slug,
+                "project_count": client.project_count,
+                "logo_url": client.logo_urls["thumbnail"] if client.logo else None,
+            }
+            for client in client_stats
+        ],
+        "recent_projects": [
+            {
+                "title": project.title,
+                "slug": project.slug,
+                "client": project.client.name,
+                "status": project.status,
+                "created_at": project.created_at.isoformat(),
+                "thumbnail_url": (
+                    project.featured_image_urls["thumbnail"]
+                    if project.featured_image
+                    else None
+                ),
+            }
+            for project in recent_projects
+        ],
+    }
+
+
+def get_stats():
+    """Retourne l'instantané des statistiques, recalculé si absent ou obsolète"""
+    key = make_cache_key(STATS_NAMESPACE, ("stats",))
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute_stats()
+        cache.set(key, stats, get_stats_timeout())
+    return stats
+
+
+def get_api_stats():
+    """Instantané des statistiques tel qu'exposé par project_stats_api"""
+    return {
+        name: value for name, value in get_stats().items() if name not in ADMIN_ONLY_STATS
+    }
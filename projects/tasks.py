@@ -0,0 +1,41 @@
+"""
+Tâches de l'app projects exécutées par la file de tasks (voir tasks/queue.py)
+"""
+
+from core import chunked_uploads
+from django.apps import apps
+from tasks.queue import task
+
+from . import deletions, variants
+from .signals import refresh_after_bulk_update
+
+
+@task(variants.GENERATE_VARIANTS_TASK, max_attempts=5)
+def generate_image_variants(model, pk, field):
+    """Génère les versions large et miniature et les métadonnées d'un champ image"""
+    model_class = apps.get_model(model)
+    instance = model_class.objects.filter(pk=pk).first()
+
+    # Instance supprimée ou traitement déjà effectué entre-temps
+    if instance is None or not variants.needs_processing(instance, field):
+        return
+
+    variants.generate_variants(instance, field)
+
+    # update() n'émet pas de signal : mêmes effets que les receivers post_save
+    refresh_after_bulk_update(model_class, [instance.pk])
+
+
+@task(deletions.FLUSH_DELETIONS_TASK, max_attempts=8)
+def flush_cloudinary_deletions():
+    """Supprime par lots les images Cloudinary de la boîte d'envoi"""
+    deleted, failed = deletions.flush_deletions()
+    # Les lignes en échec sont conservées : la file retente la tâche
+    if failed:
+        raise RuntimeError(f"{failed} images Cloudinary non supprimées ({deleted} supprimées)")
+
+
+@task(chunked_uploads.FINISH_TASK, max_attempts=3)
+def finish_chunked_upload(user_id, upload_id, filename):
+    """Envoie à Cloudinary une grande image CKEditor5 reçue par morceaux"""
+    chunked_uploads.finish_upload(user_id, upload_id, filename)
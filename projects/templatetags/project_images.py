@@ -0,0 +1,52 @@
+"""
+Balises de gabarit des images de projets.
+
+    {% load project_images %}
+    {% responsive_image project.featured_image_responsive alt=project.title sizes="100vw" class="w-100" %}
+
+Les arguments supplémentaires deviennent des attributs de la balise <img>
+(les "_" sont remplacés par des "-" : data_bs_toggle="modal"). Quand les
+métadonnées de l'image sont connues, l'aperçu flou (LQIP) et la couleur
+dominante sont affichés en arrière-plan pendant le chargement, sans requête
+supplémentaire.
+"""
+
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, alt="", sizes="100vw", fallback="", **attrs):
+    """
+    Balise <img> avec srcset/sizes et dimensions intrinsèques à partir du
+    dictionnaire d'un descripteur ResponsiveImage ; `fallback` est l'URL
+    utilisée quand le dictionnaire est vide (carte pas encore reconstruite)
+    """
+    image = image or {}
+    src = image.get("src") or fallback
+    if not src:
+        return ""
+
+    attributes = {"src": src}
+    if image.get("srcset"):
+        attributes["srcset"] = image["srcset"]
+        attributes["sizes"] = sizes
+    if image.get("width") and image.get("height"):
+        attributes["width"] = image["width"]
+        attributes["height"] = image["height"]
+    attributes["alt"] = alt
+    attributes["loading"] = "lazy"
+    attributes["decoding"] = "async"
+    attributes.update((name.replace("_", "-"), value) for name, value in attrs.items())
+
+    if image.get("lqip") or image.get("color"):
+        background = image.get("color") or "transparent"
+        if image.get("lqip"):
+            background += f' url("{image["lqip"]}") center / cover no-repeat'
+        style = attributes.get("style", "").rstrip("; ")
+        attributes["style"] = f"{style}; background: {background}" if style else f"background: {background}"
+
+    return format_html("<img{}>", flatatt(attributes))
@@ -1,3 +1,1679 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import cloudinary
+from cloudinary import CloudinaryResource
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.direct_uploads import upload_callback, upload_signature
+from tasks import queue
+from tasks.models import Job, JobStatus
+
+from . import related, search, stats
+from .deletions import FLUSH_DELETIONS_TASK, schedule_deletion
+from .image_backends import CloudinaryBackend, PillowBackend, render_variant
+from .pagination import KeysetPaginator
+from .uploads import upload_image
+from .models import (
+    Client,
+    CloudinaryDeletion,
+    Project,
+    ProjectCard,
+    ProjectCategory,
+    ProjectImage,
+    ProjectStatus,
+    ProjectTestimonial,
+    RelatedProject,
+    UploadedImage,
+)
+
+
+class CloudinaryTestMixin:
+    """Configures a demo Cloudinary account for each test, restored afterwards."""
+
+    cloudinary_config = {"cloud_name": "demo"}
+
+    def setUp(self):
+        """Set up the Cloudinary configuration."""
+        config = cloudinary.config()
+        previous = {key: getattr(config, key, None) for key in self.cloudinary_config}
+        cloudinary.config(**self.cloudinary_config)
+        self.addCleanup(cloudinary.config, **previous)
+        super().setUp()
+
+
+class ProjectsTestMixin:
+    """Shared fixtures for the projects test suites."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.client_obj = Client.objects.create(name="Acme")
+        self.category = ProjectCategory.objects.create(name="Branding")
+        self.project = Project.objects.create(
+            title="Site vitrine",
+            description="Description courte",
+            client=self.client_obj,
+            is_published=True,
+        )
+        self.project.categories.add(self.category)
+
+    def tearDown(self):
+        """Clean up cached payloads."""
+        cache.clear()
+
+
+class PortfolioApiCacheTest(ProjectsTestMixin, TestCase):
+    """Test suite for the cached project_portfolio_api endpoint."""
+
+    url = reverse("projects:portfolio_api")
+
+    def test_response_carries_validators(self):
+        """Test ETag and Last-Modified headers are set."""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        self.assertIn("Last-Modified", response)
+        self.assertEqual(response.json()["projects"][0]["slug"], self.project.slug)
+
+    def test_cached_hit_runs_no_queries(self):
+        """Test a warm cache serves the payload without touching the database."""
+        first = self.client.get(self.url, {"limit": 5})
+
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, {"limit": 5})
+
+        self.assertEqual(first.content, second.content)
+
+    def test_if_none_match_returns_304(self):
+        """Test conditional requests get a 304 Not Modified."""
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_invalidates_cached_payload(self):
+        """Test saving a related model bumps the portfolio generation."""
+        etag = self.client.get(self.url)["ETag"]
+
+        # La génération est incrémentée à la validation de la transaction
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_obj.name = "Acme Corp"
+            self.client_obj.save()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["projects"][0]["client"]["name"], "Acme Corp")
+
+    def test_category_change_invalidates_cached_payload(self):
+        """Test m2m category changes invalidate the cache."""
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.project.categories.clear()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()["projects"][0]["categories"], [])
+
+    def test_generation_is_bumped_after_commit(self):
+        """Test the generation only changes once the write transaction commits."""
+        from .cache import get_generation
+
+        before = get_generation()["version"]
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client_obj.save()
+            self.assertEqual(get_generation()["version"], before)
+
+        for callback in callbacks:
+            callback()
+        self.assertGreater(get_generation()["version"], before)
+
+    def test_evicted_generation_does_not_reuse_old_versions(self):
+        """Test a counter lost from the cache restarts above the previous version."""
+        from .cache import _generation_key, get_generation
+
+        cache.set(_generation_key("portfolio"), 1, None)
+        cache.delete(_generation_key("portfolio"))
+        self.assertGreater(get_generation()["version"], 1)
+
+
+class ProjectCardTest(ProjectsTestMixin, TestCase):
+    """Test suite for the denormalized ProjectCard read model."""
+
+    def test_card_created_with_denormalized_data(self):
+        """Test saving a project builds its card."""
+        card = ProjectCard.objects.get(project=self.project)
+
+        self.assertEqual(card.title, "Site vitrine")
+        self.assertEqual(card.client_name, "Acme")
+        self.assertEqual(card.client_slug, "acme")
+        self.assertEqual(
+            card.categories,
+            [{"name": "Branding", "slug": "branding", "color": "#6c757d"}],
+        )
+        self.assertEqual(card.category_slugs, "|branding|")
+
+    def test_admin_bulk_action_refreshes_card(self):
+        """Test admin bulk actions, which bypass signals, refresh the cards."""
+        from django.contrib.admin.sites import site
+
+        from .admin import ProjectAdmin
+
+        ProjectAdmin.mark_as_unpublished(
+            ProjectAdmin(Project, site), mock.Mock(), Project.objects.all()
+        )
+
+        self.assertFalse(ProjectCard.objects.get().is_published)
+
+    def test_client_change_propagates(self):
+        """Test renaming the client refreshes its project cards."""
+        self.client_obj.name = "Acme Corp"
+        self.client_obj.save()
+
+        self.assertEqual(ProjectCard.objects.get().client_name, "Acme Corp")
+
+    def test_category_changes_propagate(self):
+        """Test category edits, removals and deletions refresh the cards."""
+        self.category.color = "#ff0000"
+        self.category.save()
+        self.assertEqual(ProjectCard.objects.get().categories[0]["color"], "#ff0000")
+
+        other = ProjectCategory.objects.create(name="UX Design")
+        other.projects.add(self.project)
+        self.assertEqual(
+            ProjectCard.objects.in_category("ux-design").get().pk, self.project.pk
+        )
+
+        self.category.delete()
+        self.assertEqual(ProjectCard.objects.get().category_slugs, "|ux-design|")
+
+    def test_list_view_reads_cards_only(self):
+        """Test the list page never joins projects or clients."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("projects:list"), {"category": "branding"}
+            )
+
+        self.assertContains(response, "Site vitrine")
+        for query in queries.captured_queries:
+            self.assertNotIn('"projects_project"', query["sql"])
+            self.assertNotIn('"projects_client"', query["sql"])
+
+
+class ProjectSearchTest(ProjectsTestMixin, TestCase):
+    """Test suite for the full-text project search index."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.project.content = "<p>Refonte compl&egrave;te de l'<strong>application</strong> mobile</p>"
+        self.project.save()
+        self.other = Project.objects.create(
+            title="Application mobile",
+            description="Une application",
+            client=self.client_obj,
+            is_published=True,
+        )
+
+    def test_content_is_indexed_without_html(self):
+        """Test CKEditor HTML is stripped before indexing."""
+        document = self.project.search_document
+
+        self.assertNotIn("<strong>", document.content)
+        self.assertIn("application mobile", document.content)
+
+    def test_results_ranked_by_relevance(self):
+        """Test a title match ranks above a body match."""
+        hits = search.search("application")
+
+        self.assertEqual([hit.project_id for hit in hits], [self.other.pk, self.project.pk])
+
+    def test_prefix_and_accent_insensitive_match(self):
+        """Test prefix terms match regardless of diacritics."""
+        hits = search.search("complete")
+
+        self.assertEqual([hit.project_id for hit in hits], [self.project.pk])
+
+    def test_snippet_highlights_terms(self):
+        """Test snippets wrap matched terms in <mark> and escape the rest."""
+        snippet = search.search("refonte")[0].snippet
+
+        self.assertIn("<mark>Refonte</mark>", snippet)
+        self.assertIn("l&#x27;application", snippet)
+
+    def test_client_rename_reindexes_projects(self):
+        """Test the client name is kept in sync in the index."""
+        self.client_obj.name = "Globex"
+        self.client_obj.save()
+
+        self.assertEqual(len(search.search("globex")), 2)
+
+    def test_deleted_project_leaves_index(self):
+        """Test deleting a project removes it from the index."""
+        self.other.delete()
+
+        self.assertEqual([hit.project_id for hit in search.search("application")], [self.project.pk])
+
+    def test_query_syntax_is_not_interpreted(self):
+        """Test FTS operators in user input are treated as plain words."""
+        self.assertEqual(search.search('"OR NEAR( *'), [])
+
+    def test_candidates_filtered_before_limit(self):
+        """Test unpublished matches do not consume the result limit."""
+        Project.objects.create(
+            title="Application mobile interne",
+            description="Une application",
+            client=self.client_obj,
+            is_published=False,
+        )
+        candidates = ProjectCard.objects.published()
+
+        hits = search.search("application", limit=2, candidates=candidates)
+
+        self.assertEqual({hit.project_id for hit in hits}, {self.other.pk, self.project.pk})
+
+    def test_rebuild_command(self):
+        """Test the rebuild_search_index command reindexes every project."""
+        call_command("rebuild_search_index", batch_size=1, stdout=StringIO())
+
+        self.assertEqual(len(search.search("application")), 2)
+
+
+class CatalogApiTest(ProjectsTestMixin, TestCase):
+    """Test suite for clients_api and project_categories_api."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        Project.objects.create(
+            title="Brouillon", description="Draft", client=self.client_obj
+        )
+        Client.objects.create(name="Globex", description="<p>Long HTML</p>")
+
+    def test_clients_counts_in_single_query(self):
+        """Test published project counts come from one aggregate query."""
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("projects:clients_api"))
+
+        counts = {c["slug"]: c["projects_count"] for c in response.json()["clients"]}
+        self.assertEqual(counts, {"acme": 1, "globex": 0})
+
+    def test_categories_counts(self):
+        """Test category counts only include published projects."""
+        response = self.client.get(reverse("projects:categories_api"))
+
+        self.assertEqual(response.json()["categories"][0]["projects_count"], 1)
+
+    def test_fields_projection_skips_description(self):
+        """Test ?fields= limits both the payload and the selected columns."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("projects:clients_api"), {"fields": "name,logo_urls,bogus"}
+            )
+
+        self.assertEqual(
+            set(response.json()["clients"][0]), {"name", "logo_urls"}
+        )
+        self.assertNotIn('"description"', queries.captured_queries[0]["sql"])
+
+    def test_client_write_invalidates_catalog(self):
+        """Test a client save invalidates the cached payload."""
+        self.client.get(reverse("projects:clients_api"))
+        with self.captureOnCommitCallbacks(execute=True):
+            Client.objects.create(name="Initech")
+
+        response = self.client.get(reverse("projects:clients_api"))
+        self.assertEqual(len(response.json()["clients"]), 3)
+
+
+class ProjectStatsTest(ProjectsTestMixin, TestCase):
+    """Test suite for the shared project statistics snapshot."""
+
+    url = reverse("projects:stats_api")
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        Project.objects.create(
+            title="Brouillon",
+            description="Draft",
+            client=self.client_obj,
+            is_featured=True,
+            status=ProjectStatus.COMPLETED,
+        )
+
+    def test_counters(self):
+        """Test counters match the previous per-query semantics."""
+        snapshot = self.client.get(self.url).json()["stats"]
+
+        self.assertEqual(snapshot["total_projects"], 2)
+        self.assertEqual(snapshot["published_projects"], 1)
+        self.assertEqual(snapshot["featured_projects"], 0)
+        self.assertEqual(snapshot["draft_projects"], 1)
+        self.assertEqual(snapshot["completed_projects"], 1)
+        self.assertEqual(snapshot["by_status"], {"draft": 1, "completed": 1})
+        self.assertEqual(snapshot["total_categories"], 1)
+        self.assertNotIn("total_images", snapshot)
+
+    def test_project_counters_in_single_query(self):
+        """Test every project counter comes from one aggregate query."""
+        with self.assertNumQueries(6):
+            stats.get_stats()
+
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+            self.client.get(self.url)
+
+    def test_write_refreshes_snapshot(self):
+        """Test a project save invalidates the cached snapshot."""
+        stats.get_stats()
+        with self.captureOnCommitCallbacks(execute=True):
+            Project.objects.create(
+                title="Nouveau", description="New", client=self.client_obj
+            )
+
+        self.assertEqual(stats.get_stats()["total_projects"], 3)
+
+
+class KeysetPaginationTest(ProjectsTestMixin, TestCase):
+    """Test suite for cursor pagination on lists and the portfolio API."""
+
+    url = reverse("projects:portfolio_api")
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        for index in range(4):
+            Project.objects.create(
+                title=f"Projet {index}",
+                description="Projet",
+                client=self.client_obj,
+                is_published=True,
+                order=index % 2,
+            )
+
+    def test_portfolio_cursor_walks_every_project_once(self):
+        """Test following next_cursor visits all projects without duplicates."""
+        slugs, cursor = [], None
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            payload = self.client.get(self.url, params).json()
+            slugs += [project["slug"] for project in payload["projects"]]
+            cursor = payload["next_cursor"]
+            if not cursor:
+                break
+
+        expected = list(
+            Project.objects.order_by("order", "-created_at", "pk").values_list("slug", flat=True)
+        )
+        self.assertEqual(slugs, expected)
+
+    def test_cursor_keeps_microseconds(self):
+        """Test rows created within the same millisecond are not skipped."""
+        cards = ProjectCard.objects.exclude(pk=self.project.pk)
+        start = timezone.now().replace(microsecond=0)
+        pks = list(cards.order_by("pk").values_list("pk", flat=True))
+        for index, pk in enumerate(pks):
+            ProjectCard.objects.filter(pk=pk).update(
+                created_at=start + timedelta(microseconds=100 * index)
+            )
+
+        paginator = KeysetPaginator(cards, ("-created_at", "pk"), 1)
+        seen, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            seen += [card.pk for card in page]
+            cursor = page.next_cursor
+            if not cursor:
+                break
+
+        self.assertEqual(seen, pks[::-1])
+
+    def test_limit_is_clamped(self):
+        """Test oversized or malformed limits are bounded server-side."""
+        payload = self.client.get(self.url, {"limit": "100000"}).json()
+        self.assertEqual(payload["filters_applied"]["limit"], 100)
+
+        payload = self.client.get(self.url, {"limit": "abc"}).json()
+        self.assertEqual(payload["filters_applied"]["limit"], 20)
+
+    def test_invalid_cursor_is_rejected(self):
+        """Test a tampered cursor returns a 400 error."""
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_cursor_mode_skips_count(self):
+        """Test the list view cursor mode issues no COUNT query."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("projects:list"), {"cursor": ""})
+
+        self.assertEqual(len(response.context["projects"]), 5)
+        self.assertIsNone(response.context["next_cursor"])
+        for query in queries.captured_queries:
+            self.assertNotIn("COUNT(", query["sql"])
+
+
+class RelatedProjectsTest(ProjectsTestMixin, TestCase):
+    """Test suite for the precomputed related projects."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.other_client = Client.objects.create(name="Globex")
+        self.ux = ProjectCategory.objects.create(name="UX Design")
+        self.project.categories.add(self.ux)
+        self.two_shared = self._create("Deux catégories", self.other_client, self.category, self.ux)
+        self.same_client = self._create("Même client", self.client_obj)
+        self.one_shared = self._create("Une catégorie", self.other_client, self.ux)
+        self.unrelated = self._create("Sans rapport", self.other_client)
+
+    def _create(self, title, client, *categories):
+        project = Project.objects.create(
+            title=title, description=title, client=client, is_published=True
+        )
+        project.categories.add(*categories)
+        return project
+
+    def _related_ids(self, project):
+        return [card.pk for card in related.related_cards(project)]
+
+    def test_ranked_by_score(self):
+        """Test shared categories and same client drive the ranking."""
+        self.assertEqual(
+            self._related_ids(self.project),
+            [self.two_shared.pk, self.same_client.pk, self.one_shared.pk],
+        )
+
+    def test_category_change_is_incremental(self):
+        """Test adding a category updates both sides of the relation."""
+        self.unrelated.categories.add(self.category, self.ux)
+
+        self.assertIn(self.unrelated.pk, self._related_ids(self.project))
+        self.assertIn(self.project.pk, self._related_ids(self.unrelated))
+
+    def test_unpublish_and_delete_remove_links(self):
+        """Test unpublished or deleted projects leave the related lists."""
+        self.two_shared.is_published = False
+        self.two_shared.save()
+        self.assertNotIn(self.two_shared.pk, self._related_ids(self.project))
+
+        self.same_client.delete()
+        self.assertEqual(self._related_ids(self.project), [self.one_shared.pk])
+
+    def test_recompute_command_matches_incremental(self):
+        """Test the bulk command rebuilds the same links."""
+        before = list(RelatedProject.objects.values_list("project", "related", "score"))
+        RelatedProject.objects.all().delete()
+
+        call_command("recompute_related_projects", stdout=StringIO())
+
+        self.assertEqual(
+            list(RelatedProject.objects.values_list("project", "related", "score")),
+            before,
+        )
+
+    def test_detail_page_reads_precomputed_links(self):
+        """Test the detail page renders related cards without the OR query."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("projects:detail", args=[self.project.slug]))
+
+        self.assertContains(response, "Deux catégories")
+        for query in queries.captured_queries:
+            self.assertNotIn("DISTINCT", query["sql"])
+
+
+class ProjectDetailFragmentCacheTest(ProjectsTestMixin, TestCase):
+    """Test suite for the versioned fragment cache of project_detail.html."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.testimonial = ProjectTestimonial.objects.create(
+            project=self.project, client_name="Jane", quote="Excellent travail"
+        )
+        self.url = reverse("projects:detail", args=[self.project.slug])
+
+    def test_warm_render_skips_fragment_queries(self):
+        """Test categories and images are not queried once fragments are cached."""
+        self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        self.assertContains(response, "Branding")
+        for query in queries.captured_queries:
+            self.assertNotIn('"projects_projectcategory"', query["sql"])
+
+    def test_testimonial_change_renders_new_fragment(self):
+        """Test saving the testimonial changes its fragment key."""
+        self.client.get(self.url)
+
+        self.testimonial.quote = "Travail remarquable"
+        self.testimonial.save()
+
+        self.assertContains(self.client.get(self.url), "Travail remarquable")
+
+    def test_category_change_renders_new_hero(self):
+        """Test a category rename is visible through the card version."""
+        self.client.get(self.url)
+
+        self.category.name = "Identité"
+        self.category.save()
+
+        self.assertContains(self.client.get(self.url), "Identité")
+
+    def test_benchmark_command(self):
+        """Test the benchmark reports render times and keeps other cache entries."""
+        cache.set("session:other", "kept")
+        out = StringIO()
+        call_command("benchmark_project_detail", iterations=2, stdout=out)
+
+        self.assertIn("Sans cache", out.getvalue())
+        self.assertIn("Avec cache", out.getvalue())
+        self.assertEqual(cache.get("session:other"), "kept")
+
+
+class ImageUrlResolutionTest(CloudinaryTestMixin, ProjectsTestMixin, TestCase):
+    """Test suite for the memoized and persisted image URL resolver."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.project.featured_image = "image/upload/v1/projects/featured/original/hero.jpg"
+        self.project.save()
+
+    def _count_url_builds(self):
+        return mock.patch.object(
+            CloudinaryResource, "url", new_callable=mock.PropertyMock, return_value="https://cdn/x"
+        )
+
+    def test_loaded_instance_builds_no_urls(self):
+        """Test URLs persisted on save are reused after a database load."""
+        project = Project.objects.get(pk=self.project.pk)
+
+        with self._count_url_builds() as url:
+            urls = project.featured_image_urls
+            project.thumbnail_url
+            project.featured_image_url
+
+        url.assert_not_called()
+        self.assertIn("hero.jpg", urls["original"])
+        self.assertEqual(urls["thumbnail"], urls["original"])
+
+    def test_memoized_until_field_changes(self):
+        """Test URLs are built once and rebuilt when the source field changes."""
+        project = Project.objects.get(pk=self.project.pk)
+        project.resolved_image_urls = {}
+
+        with self._count_url_builds() as url:
+            project.featured_image_urls
+            project.featured_image_urls
+            self.assertEqual(url.call_count, 1)
+
+            project.featured_image = "image/upload/v2/projects/featured/original/new.jpg"
+            project.featured_image_urls
+            self.assertEqual(url.call_count, 2)
+
+    def test_deferred_columns_are_not_loaded(self):
+        """Test resolving logo URLs on a deferred instance runs no query."""
+        client = Client.objects.only("id", "logo", "logo_large", "logo_thumbnail", "image_variants", "resolved_image_urls").get()
+
+        with self.assertNumQueries(0):
+            client.logo_urls
+
+
+class ImageVariantsQueueTest(CloudinaryTestMixin, ProjectsTestMixin, TestCase):
+    """Test suite for the queued image variant generation."""
+
+    def _upload(self, url, public_id, **options):
+        return {"secure_url": f"https://cdn.example.com/{public_id}.jpg"}
+
+    def test_save_enqueues_job_without_uploading(self):
+        """Test saving an image only enqueues one job per field."""
+        self.project.featured_image = "image/upload/v1/projects/featured/original/hero.jpg"
+
+        with mock.patch("cloudinary.uploader.upload") as upload:
+            self.project.save()
+            self.project.save()
+
+        upload.assert_not_called()
+        job = Job.objects.get()
+        self.assertEqual(
+            job.idempotency_key, f"variants:projects.project:{self.project.pk}:featured_image"
+        )
+        self.assertEqual(job.status, JobStatus.PENDING)
+
+    def test_job_generates_variants_and_refreshes_card(self):
+        """Test the worker stores the variants and updates the project card."""
+        self.project.featured_image = "image/upload/v1/projects/featured/original/hero.jpg"
+        self.project.save()
+
+        with mock.patch("cloudinary.uploader.upload", side_effect=self._upload) as upload:
+            self.assertEqual(queue.run_pending(), (1, 0))
+
+        self.assertEqual(upload.call_count, 2)
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertIn("site-vitrine_large", project.featured_image_urls["large"])
+        card = ProjectCard.objects.get(project=self.project)
+        self.assertIn("site-vitrine_thumb", card.image_urls["thumbnail"])
+
+    def test_jobs_of_one_row_keep_each_others_results(self):
+        """Test variants of two fields generated from stale instances are merged."""
+        from .variants import generate_variants
+
+        self.client_obj.logo = "image/upload/v1/clients/logos/original/acme.png"
+        self.client_obj.logo_white = "image/upload/v1/clients/logos/white/original/acme.png"
+        self.client_obj.save()
+
+        # Deux workers lisent la ligne avant qu'aucun n'écrive
+        logo = Client.objects.get(pk=self.client_obj.pk)
+        logo_white = Client.objects.get(pk=self.client_obj.pk)
+        with mock.patch("cloudinary.uploader.upload", side_effect=self._upload), mock.patch(
+            "cloudinary.uploader.explicit", return_value={"width": 400, "height": 200}
+        ):
+            generate_variants(logo, "logo")
+            generate_variants(logo_white, "logo_white")
+
+        client = Client.objects.get(pk=self.client_obj.pk)
+        self.assertEqual(set(client.image_variants), {"logo", "logo_white"})
+        self.assertEqual(set(client.image_metadata), {"logo", "logo_white"})
+        self.assertIn("acme_logo_large", client.logo_urls["large"])
+
+    def test_upload_error_is_retried(self):
+        """Test a Cloudinary error leaves the job pending for a retry."""
+        self.project.featured_image = "image/upload/v1/projects/featured/original/hero.jpg"
+        self.project.save()
+
+        with mock.patch("cloudinary.uploader.upload", side_effect=Exception("timeout")):
+            self.assertEqual(queue.run_pending(), (0, 1))
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, JobStatus.PENDING)
+        self.assertEqual(job.attempts, 1)
+
+
+class GenerateImageVersionsCommandTest(CloudinaryTestMixin, ProjectsTestMixin, TestCase):
+    """Test suite for the parallel generate_image_versions command."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.project.featured_image = "image/upload/v1/projects/featured/original/hero.jpg"
+        self.project.save()
+        self.other = Project.objects.create(
+            title="Boutique",
+            description="Description courte",
+            client=self.client_obj,
+            featured_image="image/upload/v1/projects/featured/original/shop.jpg",
+        )
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = Path(directory.name) / "checkpoint.json"
+
+    def _run(self, upload):
+        out = StringIO()
+        with mock.patch("cloudinary.uploader.upload", side_effect=upload):
+            call_command(
+                "generate_image_versions",
+                model="project",
+                workers=2,
+                batch_size=1,
+                checkpoint=str(self.checkpoint),
+                stdout=out,
+            )
+        return out.getvalue()
+
+    def _upload(self, url, public_id, **options):
+        return {"secure_url": f"https://cdn.example.com/{public_id}.jpg"}
+
+    def test_failures_are_checkpointed_and_resumed(self):
+        """Test a failed image is kept in the checkpoint and retried on resume."""
+
+        def flaky(url, public_id, **options):
+            if public_id.startswith("boutique"):
+                raise Exception("timeout")
+            return self._upload(url, public_id, **options)
+
+        output = self._run(flaky)
+
+        self.assertIn("1 images traitées, 1 erreurs", output)
+        self.assertIn("p95", output)
+        self.assertEqual(
+            json.loads(self.checkpoint.read_text())["projects.project:featured_image"],
+            {"last_pk": self.other.pk, "failed": [self.other.pk]},
+        )
+        card = ProjectCard.objects.get(project=self.project)
+        self.assertIn("site-vitrine_large", card.image_urls["large"])
+
+        output = self._run(self._upload)
+
+        self.assertIn("1 images traitées, 0 erreurs", output)
+        self.assertFalse(self.checkpoint.exists())
+        self.other.refresh_from_db()
+        self.assertIn("boutique_thumb", self.other.featured_image_urls["thumbnail"])
+
+
+    @override_settings(PROJECTS_VIRTUAL_IMAGE_VARIANTS=True)
+    def test_virtual_mode_uploads_nothing(self):
+        """Test the command does not upload copies when variants are virtual."""
+        upload = mock.Mock(side_effect=self._upload)
+        output = self._run(upload)
+
+        upload.assert_not_called()
+        self.assertIn("Versions virtuelles actives", output)
+        self.assertFalse(self.checkpoint.exists())
+
+
+class VirtualImageVariantsTest(CloudinaryTestMixin, ProjectsTestMixin, TestCase):
+    """Test suite for image variants derived by URL transformation."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.project.featured_image = "image/upload/v1/projects/featured/original/hero.jpg"
+        self.project.save()
+
+    @override_settings(PROJECTS_VIRTUAL_IMAGE_VARIANTS=True)
+    def test_variants_are_transformation_urls(self):
+        """Test virtual variants are built from the original with named presets."""
+        urls = Project.objects.get(pk=self.project.pk).featured_image_urls
+
+        self.assertIn("c_fill,f_auto,h_800,q_auto,w_1200/v1/projects/featured/original/hero.jpg", urls["large"])
+        self.assertIn("c_fill,f_auto,h_300,q_auto,w_400/v1/projects/featured/original/hero.jpg", urls["thumbnail"])
+
+    @override_settings(PROJECTS_VIRTUAL_IMAGE_VARIANTS=True)
+    def test_only_metadata_is_captured(self):
+        """Test virtual mode never uploads variants, only captures metadata."""
+        Job.objects.all().delete()
+        self.project.featured_image = "image/upload/v2/projects/featured/original/new.jpg"
+        self.project.save()
+
+        backend = mock.Mock()
+        backend.describe.return_value = {"width": 1600, "height": 900}
+        with mock.patch("projects.variants.get_backend", return_value=backend):
+            self.assertEqual(queue.run_pending(), (1, 0))
+
+        backend.create_variants.assert_not_called()
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertFalse(project.featured_image_large)
+        self.assertEqual(project.image_metadata["featured_image"]["width"], 1600)
+
+    def test_migration_command_fills_presets(self):
+        """Test the migration command persists virtual URLs and refreshes cards."""
+        with override_settings(PROJECTS_VIRTUAL_IMAGE_VARIANTS=True):
+            call_command("migrate_virtual_image_variants", stdout=StringIO())
+
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertIn("w_400", project.resolved_image_urls["featured_image_urls"]["urls"]["thumbnail"])
+        self.assertIn("w_400", ProjectCard.objects.get(project=project).image_urls["thumbnail"])
+
+        # Hors mode virtuel, les entrées enregistrées ne correspondent plus
+        self.assertNotIn("w_400", project.featured_image_urls["thumbnail"])
+
+
+class PillowBackendTest(CloudinaryTestMixin, TestCase):
+    """Test suite for the local Pillow image backend."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        from PIL import Image
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root = directory.name
+
+        buffer = BytesIO()
+        Image.new("RGB", (1600, 900), "red").save(buffer, "JPEG")
+        self.source = buffer.getvalue()
+
+    def _size(self, content):
+        from PIL import Image
+
+        with Image.open(BytesIO(content)) as image:
+            return image.format, image.size
+
+    def test_render_follows_transformation(self):
+        """Test crop modes and output formats match the Cloudinary transformations."""
+        fill = [
+            {"width": 400, "height": 300, "crop": "fill"},
+            {"quality": "auto"},
+            {"fetch_format": "auto"},
+        ]
+        limit = {"width": 1200, "height": 800, "crop": "limit", "fetch_format": "jpg"}
+        fit = {"width": 150, "height": 150, "crop": "fit"}
+
+        extension, content = render_variant(self.source, fill, "webp")
+        self.assertEqual(extension, "webp")
+        self.assertEqual(self._size(content), ("WEBP", (400, 300)))
+        self.assertEqual(
+            self._size(render_variant(self.source, limit, "webp")[1]), ("JPEG", (1200, 675))
+        )
+        self.assertEqual(
+            self._size(render_variant(self.source, fit, "png")[1]), ("PNG", (150, 84))
+        )
+
+    def test_variants_are_stored_with_process_pool(self):
+        """Test variants are rendered in worker processes and saved to storage."""
+        backend = PillowBackend(
+            storage_options={"location": self.media_root, "base_url": "/media/"}, workers=2
+        )
+        self.addCleanup(backend.pool.shutdown)
+
+        urls = backend.create_variants(
+            BytesIO(self.source),
+            [
+                {
+                    "folder": "projects/featured/large",
+                    "public_id": "demo_large",
+                    "transformation": {"width": 1200, "height": 800, "crop": "fill"},
+                },
+                {
+                    "folder": "projects/featured/thumbnails",
+                    "public_id": "demo_thumb",
+                    "transformation": {"width": 400, "height": 300, "crop": "fill"},
+                },
+            ],
+        )
+
+        self.assertEqual(
+            urls,
+            [
+                "/media/projects/featured/large/demo_large.webp",
+                "/media/projects/featured/thumbnails/demo_thumb.webp",
+            ],
+        )
+        with backend.storage.open("projects/featured/thumbnails/demo_thumb.webp") as stored:
+            self.assertEqual(self._size(stored.read()), ("WEBP", (400, 300)))
+
+        # Une nouvelle génération remplace le fichier existant
+        url = backend.create_variant(
+            BytesIO(self.source), "projects/featured/large", "demo_large", {"width": 10}
+        )
+        self.assertEqual(url, urls[0])
+
+    def test_generated_urls_survive_reload(self):
+        """Test stored variant URLs are served as-is after reloading the instance."""
+        backend = PillowBackend(
+            storage_options={"location": self.media_root, "base_url": "/media/"}, workers=0
+        )
+        backend.read_source = lambda original: self.source
+        project = Project.objects.create(
+            title="Site vitrine",
+            description="Description courte",
+            client=Client.objects.create(name="Acme"),
+            featured_image="image/upload/v1/projects/featured/original/hero.jpg",
+        )
+
+        with mock.patch("projects.variants.get_backend", return_value=backend):
+            queue.run_pending()
+
+        project = Project.objects.get(pk=project.pk)
+        project.resolved_image_urls = {}
+        self.assertFalse(project.featured_image_large)
+        self.assertEqual(
+            project.featured_image_urls["large"],
+            "/media/projects/featured/large/site-vitrine_large.webp",
+        )
+        self.assertEqual(
+            project.featured_image_urls["thumbnail"],
+            "/media/projects/featured/thumbnails/site-vitrine_thumb.webp",
+        )
+
+
+class ResponsiveImageTest(CloudinaryTestMixin, ProjectsTestMixin, TestCase):
+    """Test suite for responsive srcset generation."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.project.featured_image = "image/upload/v1/projects/featured/original/hero.jpg"
+        self.project.save()
+
+    def test_width_ladder_with_intrinsic_size(self):
+        """Test the srcset covers the width ladder with f_auto,q_auto and a 3:2 size."""
+        image = Project.objects.get(pk=self.project.pk).featured_image_responsive
+
+        candidates = image["srcset"].split(", ")
+        self.assertEqual(
+            [candidate.rsplit(" ", 1)[1] for candidate in candidates],
+            ["320w", "640w", "960w", "1280w", "1920w"],
+        )
+        self.assertIn("ar_3:2,c_fill,f_auto,q_auto,w_320/", candidates[0])
+        self.assertEqual((image["width"], image["height"]), (1920, 1280))
+
+    @override_settings(PROJECTS_RESPONSIVE_WIDTHS=[400, 800])
+    def test_ladder_is_capped_and_configurable(self):
+        """Test the ladder follows the setting and stops at the descriptor maximum."""
+        self.client_obj.logo = "image/upload/v1/clients/logos/original/acme.png"
+
+        image = self.client_obj.logo_responsive
+
+        self.assertTrue(image["srcset"].endswith("400w"))
+        self.assertNotIn("800w", image["srcset"])
+        self.assertIsNone(image["height"])
+
+    def test_template_tag_and_card(self):
+        """Test the template tag renders srcset, sizes and dimensions from the card."""
+        from django.template import Context, Template
+
+        card = ProjectCard.objects.get(project=self.project)
+        html = Template(
+            "{% load project_images %}"
+            '{% responsive_image card.responsive_image alt=card.title sizes="50vw" data_id="x" %}'
+        ).render(Context({"card": card}))
+
+        self.assertIn('sizes="50vw"', html)
+        self.assertIn("1920w", html)
+        self.assertIn('width="1920"', html)
+        self.assertIn('height="1280"', html)
+        self.assertIn('data-id="x"', html)
+        self.assertIn('alt="Site vitrine"', html)
+
+    def test_detail_page_uses_srcset(self):
+        """Test the detail page serves responsive featured and gallery images."""
+        ProjectImage.objects.create(
+            project=self.project, image="image/upload/v1/projects/gallery/original/shot.jpg"
+        )
+
+        response = self.client.get(reverse("projects:detail", args=[self.project.slug]))
+
+        self.assertContains(response, "ar_3:2,c_fill,f_auto,q_auto,w_640/", count=1)
+        self.assertContains(response, "c_limit,f_auto,q_auto,w_640/", count=2)
+        self.assertContains(response, 'data-bs-target="#imageModal1"')
+
+
+class ImageMetadataTest(CloudinaryTestMixin, ProjectsTestMixin, TestCase):
+    """Test suite for image metadata and LQIP placeholders."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (1600, 900), (200, 30, 30)).save(buffer, "JPEG")
+        self.source = buffer.getvalue()
+
+        self.image = ProjectImage.objects.create(
+            project=self.project, image="image/upload/v1/projects/gallery/original/shot.jpg"
+        )
+
+    def test_pillow_backend_describes_original(self):
+        """Test dimensions, size, format, dominant color and LQIP are captured."""
+        metadata = PillowBackend(workers=0).describe(BytesIO(self.source))
+
+        self.assertEqual((metadata["width"], metadata["height"]), (1600, 900))
+        self.assertEqual(metadata["bytes"], len(self.source))
+        self.assertEqual(metadata["format"], "jpeg")
+        self.assertRegex(metadata["color"], r"^#[0-9a-f]{6}$")
+        self.assertTrue(metadata["lqip"].startswith("data:image/webp;base64,"))
+        self.assertLess(len(metadata["lqip"]), 400)
+
+    def test_backfill_command_feeds_responsive_image(self):
+        """Test the backfill stores metadata used for size and placeholder."""
+        backend = PillowBackend(workers=0)
+        backend.read_source = lambda original: self.source
+
+        with mock.patch(
+            "projects.management.commands.backfill_image_metadata.get_backend",
+            return_value=backend,
+        ):
+            call_command("backfill_image_metadata", model="projectimage", stdout=StringIO())
+
+        image = ProjectImage.objects.get(pk=self.image.pk).image_responsive
+        self.assertEqual((image["width"], image["height"]), (1600, 900))
+        self.assertTrue(image["lqip"])
+
+        from django.template import Context, Template
+
+        html = Template(
+            '{% load project_images %}{% responsive_image image style="max-width: 100%" %}'
+        ).render(Context({"image": image}))
+        self.assertIn('style="max-width: 100%; background: #', html)
+        self.assertIn("data:image/webp;base64,", html)
+
+    def test_metadata_of_replaced_image_is_ignored(self):
+        """Test stale metadata does not describe a new original."""
+        ProjectImage.objects.filter(pk=self.image.pk).update(
+            image_metadata={"image": {"width": 10, "height": 10, "source": "other"}}
+        )
+
+        image = ProjectImage.objects.get(pk=self.image.pk)
+
+        self.assertIsNone(image.image_responsive["width"])
+        self.assertTrue(Job.objects.filter(payload__pk=self.image.pk).exists())
+
+    def test_cloudinary_backend_describes_from_upload_result(self):
+        """Test the registered upload result is used and the LQIP is inlined from a tiny rendition."""
+        from PIL import Image
+
+        buffer = BytesIO()
+        Image.new("RGB", (64, 36), (200, 30, 30)).save(buffer, "PNG")
+        rendition = mock.MagicMock()
+        rendition.__enter__.return_value.read.return_value = buffer.getvalue()
+
+        UploadedImage.objects.create(
+            sha256="0" * 64,
+            options_hash="0" * 64,
+            public_id="projects/gallery/original/shot",
+            format="JPG",
+            secure_url="https://res.cloudinary.com/demo/image/upload/v1/projects/gallery/original/shot.jpg",
+            bytes=2048,
+            width=1600,
+            height=900,
+            color="#c81e1e",
+        )
+        original = ProjectImage.objects.get(pk=self.image.pk).image
+
+        with mock.patch("cloudinary.uploader.explicit") as explicit, \
+                mock.patch("projects.image_backends.urlopen", return_value=rendition) as urlopen:
+            metadata = CloudinaryBackend().describe(original)
+
+        explicit.assert_not_called()
+        self.assertIn("c_scale,w_64/v1/projects/gallery/original/shot.png", urlopen.call_args.args[0])
+        self.assertEqual(
+            [metadata[key] for key in ("width", "height", "bytes", "format", "color")],
+            [1600, 900, 2048, "jpg", "#c81e1e"],
+        )
+        self.assertTrue(metadata["lqip"].startswith("data:image/webp;base64,"))
+        self.assertLess(len(metadata["lqip"]), 400)
+
+    def test_failed_description_is_not_requeued_on_save(self):
+        """Test a failed description is recorded so saves do not enqueue it again."""
+        backend = mock.Mock()
+        backend.create_variants.return_value = ["/media/large.webp", "/media/thumb.webp"]
+        backend.describe.side_effect = Exception("api unavailable")
+        with mock.patch("projects.variants.get_backend", return_value=backend):
+            self.assertEqual(queue.run_pending(), (1, 0))
+
+        image = ProjectImage.objects.get(pk=self.image.pk)
+        self.assertIn("error", image.image_metadata["image"])
+        image.save()
+        self.assertFalse(Job.objects.pending().exists())
+
+
+class CloudinaryDeletionTest(ProjectsTestMixin, TestCase):
+    """Test suite for the batched Cloudinary deletion outbox."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.globex = Client.objects.create(
+            name="Globex",
+            logo_cloudinary_public_id="clients/logos/original/globex",
+            logo_white_cloudinary_public_id="clients/logos/white/original/globex",
+        )
+        self.image = ProjectImage.objects.create(project=self.project)
+        ProjectImage.objects.filter(pk=self.image.pk).update(
+            image_cloudinary_public_id="projects/gallery/original/shot"
+        )
+        Job.objects.all().delete()
+
+    def _deleted(self, public_ids, **options):
+        return {"deleted": {public_id: "deleted" for public_id in public_ids}}
+
+    def test_delete_records_folder_prefixed_ids_without_calling_cloudinary(self):
+        """Test deleting a client only writes the outbox and enqueues one flush."""
+        with mock.patch("cloudinary.api.delete_resources") as delete_resources, \
+                mock.patch("cloudinary.uploader.destroy") as destroy:
+            self.globex.delete()
+
+        delete_resources.assert_not_called()
+        destroy.assert_not_called()
+        self.assertEqual(
+            set(CloudinaryDeletion.objects.values_list("public_id", flat=True)),
+            {
+                "clients/logos/original/globex",
+                "clients/logos/large/globex_logo_large",
+                "clients/logos/thumbnails/globex_logo_thumb",
+                "clients/logos/white/original/globex",
+                "clients/logos/white/large/globex_logo_white_large",
+                "clients/logos/white/thumbnails/globex_logo_white_thumb",
+            },
+        )
+        self.assertEqual(Job.objects.get().name, FLUSH_DELETIONS_TASK)
+
+    def test_flush_deletes_cascaded_images_in_one_batch(self):
+        """Test a project delete and its gallery are flushed in one API call."""
+        Project.objects.filter(pk=self.project.pk).update(
+            featured_image_cloudinary_public_id="projects/featured/original/hero"
+        )
+        Project.objects.get(pk=self.project.pk).delete()
+        schedule_deletion(["projects/featured/original/hero"])
+
+        with mock.patch("cloudinary.api.delete_resources", side_effect=self._deleted) as delete_resources:
+            self.assertEqual(queue.run_pending(), (1, 0))
+
+        delete_resources.assert_called_once()
+        self.assertEqual(len(delete_resources.call_args.args[0]), 6)
+        self.assertFalse(CloudinaryDeletion.objects.exists())
+
+    def test_failed_batch_is_kept_and_retried(self):
+        """Test a Cloudinary error keeps the rows and reschedules the flush."""
+        self.globex.delete()
+
+        with mock.patch("cloudinary.api.delete_resources", side_effect=Exception("timeout")):
+            self.assertEqual(queue.run_pending(), (0, 1))
+
+        self.assertEqual(Job.objects.get().status, JobStatus.PENDING)
+        deletion = CloudinaryDeletion.objects.first()
+        self.assertEqual((deletion.attempts, deletion.last_error), (1, "timeout"))
+
+        with mock.patch("cloudinary.api.delete_resources", side_effect=self._deleted):
+            call_command("flush_cloudinary_deletions", stdout=StringIO())
+        self.assertFalse(CloudinaryDeletion.objects.exists())
+
+
+class CleanupOrphanedImagesCommandTest(ProjectsTestMixin, TestCase):
+    """Test suite for the streaming orphan scan."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        Project.objects.filter(pk=self.project.pk).update(
+            featured_image_cloudinary_public_id="projects/featured/original/hero"
+        )
+        self.pages = {
+            None: {
+                "resources": [
+                    {"public_id": "projects/featured/original/hero", "bytes": 500, "created_at": "2020-01-01T00:00:00Z"},
+                    {"public_id": "projects/featured/large/old_large", "bytes": 1024, "created_at": "2020-01-01T00:00:00Z"},
+                ],
+                "next_cursor": "page-2",
+            },
+            "page-2": {
+                "resources": [
+                    {"public_id": "projects/featured/large/site-vitrine_large", "bytes": 700, "created_at": "2020-01-01T00:00:00Z"},
+                    {"public_id": "projects/featured/thumbnails/old_thumb", "bytes": 1024, "created_at": "2020-01-01T00:00:00Z"},
+                    {"public_id": "projects/featured/original/uploading", "bytes": 900, "created_at": "2999-01-01T00:00:00Z"},
+                ],
+            },
+        }
+
+    def _resources(self, **params):
+        return self.pages[params.get("next_cursor")]
+
+    def _deleted(self, public_ids, **options):
+        return {"deleted": {public_id: "deleted" for public_id in public_ids}}
+
+    def test_follows_cursors_and_batch_deletes_orphans(self):
+        """Test every page is scanned and orphans are deleted in one call."""
+        out = StringIO()
+        with mock.patch("cloudinary.api.resources", side_effect=self._resources) as resources, \
+                mock.patch("cloudinary.api.delete_resources", side_effect=self._deleted) as delete_resources:
+            call_command("cleanup_orphaned_images", folder="projects/featured", stdout=out)
+
+        self.assertEqual(resources.call_count, 2)
+        delete_resources.assert_called_once()
+        self.assertEqual(
+            delete_resources.call_args.args[0],
+            ["projects/featured/large/old_large", "projects/featured/thumbnails/old_thumb"],
+        )
+        self.assertIn("5 images parcourues, 2 orphelines, 2 supprimées, 0 erreurs, 2.0\xa0KB libérés", out.getvalue())
+
+    def test_dry_run_does_not_delete(self):
+        """Test the dry run reports orphans without deleting them."""
+        out = StringIO()
+        with mock.patch("cloudinary.api.resources", side_effect=self._resources), \
+                mock.patch("cloudinary.api.delete_resources") as delete_resources:
+            call_command("cleanup_orphaned_images", folder="projects/featured", dry_run=True, stdout=out)
+
+        delete_resources.assert_not_called()
+        self.assertIn("SERAIT SUPPRIMÉ: projects/featured/large/old_large", out.getvalue())
+        self.assertIn("2.0\xa0KB seraient libérés", out.getvalue())
+
+    @override_settings(PROJECTS_VIRTUAL_IMAGE_VARIANTS=True)
+    def test_virtual_variant_originals_are_referenced(self):
+        """Test originals without a public_id column (virtual variants) are kept."""
+        Project.objects.filter(pk=self.project.pk).update(
+            featured_image="image/upload/v1/projects/featured/original/hero.jpg",
+            featured_image_cloudinary_public_id="",
+        )
+
+        with mock.patch("cloudinary.api.resources", side_effect=self._resources), \
+                mock.patch("cloudinary.api.delete_resources", side_effect=self._deleted) as delete_resources:
+            call_command("cleanup_orphaned_images", folder="projects/featured", stdout=StringIO())
+
+        self.assertNotIn("projects/featured/original/hero", delete_resources.call_args.args[0])
+
+
+class UploadDeduplicationTest(CloudinaryTestMixin, ProjectsTestMixin, TestCase):
+    """Test suite for the content-addressed upload registry."""
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        self.uploads = 0
+
+    def _upload(self, file, folder="", **options):
+        self.uploads += 1
+        public_id = f"{folder}/image_{self.uploads}"
+        return {
+            "public_id": public_id,
+            "version": 1,
+            "format": "png",
+            "resource_type": "image",
+            "secure_url": f"https://res.cloudinary.com/demo/image/upload/v1/{public_id}.png",
+            "bytes": 68,
+            "width": 120,
+            "height": 60,
+            "colors": [["#FF0000", 80.0]],
+        }
+
+    def test_identical_content_is_uploaded_once(self):
+        """Test the same bytes reuse the asset whatever the folder."""
+        with mock.patch("cloudinary.uploader.upload", side_effect=self._upload) as upload:
+            first = upload_image(BytesIO(b"same bytes"), folder="ckeditor5/uploads", crop="limit")
+            second = upload_image(BytesIO(b"same bytes"), folder="projects/featured/original", crop="limit")
+            other = upload_image(BytesIO(b"same bytes"), folder="ckeditor5/uploads", crop="fill")
+
+        self.assertEqual(upload.call_count, 2)
+        self.assertTrue(second["reused"])
+        self.assertEqual(second["secure_url"], first["secure_url"])
+        self.assertFalse(other["reused"])
+
+    def test_model_fields_share_identical_upload(self):
+        """Test a logo uploaded as logo and white logo is sent once."""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        client = Client(name="Globex")
+        client.logo = SimpleUploadedFile("logo.png", b"logo bytes", content_type="image/png")
+        client.logo_white = SimpleUploadedFile("logo.png", b"logo bytes", content_type="image/png")
+
+        with mock.patch("cloudinary.uploader.upload", side_effect=self._upload) as upload:
+            client.save()
+
+        upload.assert_called_once()
+        client = Client.objects.get(pk=client.pk)
+        self.assertEqual(client.logo.public_id, "clients/logos/original/image_1")
+        self.assertEqual(client.logo_white.public_id, client.logo.public_id)
+        # Métadonnées tirées de la réponse d'envoi, y compris pour l'image réutilisée
+        self.assertEqual(client.image_metadata["logo"]["width"], 120)
+        self.assertEqual(client.image_metadata["logo_white"]["color"], "#ff0000")
+        # L'aperçu LQIP (data URI) est calculé par la tâche de génération
+        self.assertNotIn("lqip", client.image_metadata["logo"])
+        from .variants import needs_metadata
+
+        self.assertTrue(needs_metadata(client, "logo"))
+
+    def test_shared_original_is_not_deleted(self):
+        """Test the deletion outbox keeps an original another row still uses."""
+        other = Project.objects.create(title="Autre site", client=self.client_obj)
+        Project.objects.filter(pk__in=[self.project.pk, other.pk]).update(
+            featured_image_cloudinary_public_id="projects/featured/original/shared"
+        )
+        Project.objects.get(pk=self.project.pk).delete()
+
+        deleted = lambda public_ids, **options: {"deleted": dict.fromkeys(public_ids, "deleted")}
+        with mock.patch("cloudinary.api.delete_resources", side_effect=deleted) as delete_resources:
+            self.assertEqual(queue.run_pending(), (1, 0))
+
+        self.assertNotIn("projects/featured/original/shared", delete_resources.call_args.args[0])
+        self.assertFalse(
+            CloudinaryDeletion.objects.filter(public_id="projects/featured/original/shared").exists()
+        )
+
+    def test_original_referenced_by_image_field_only_is_kept(self):
+        """Test an original still stored in another row's CloudinaryField is kept."""
+        ProjectImage.objects.create(
+            project=self.project, image="image/upload/v1/projects/gallery/original/shared.png"
+        )
+        schedule_deletion(
+            ["projects/gallery/original/shared", "projects/gallery/original/shared_old"]
+        )
+
+        deleted = lambda public_ids, **options: {"deleted": dict.fromkeys(public_ids, "deleted")}
+        with mock.patch("cloudinary.api.delete_resources", side_effect=deleted) as delete_resources:
+            queue.run_pending()
+
+        self.assertEqual(
+            delete_resources.call_args.args[0], ["projects/gallery/original/shared_old"]
+        )
+
+
+@override_settings(CLOUDINARY_DIRECT_UPLOAD_MAX_AGE=900)
+class DirectUploadTest(CloudinaryTestMixin, ProjectsTestMixin, TestCase):
+    """Test suite for signed direct-to-Cloudinary uploads."""
+
+    cloudinary_config = {"cloud_name": "demo", "api_key": "key", "api_secret": "secret"}
+
+    def setUp(self):
+        """Set up test data."""
+        super().setUp()
+        from django.contrib.auth import get_user_model
+        from django.test import RequestFactory
+
+        self.factory = RequestFactory()
+        self.staff = get_user_model().objects.create_user(
+            email="staff@example.com", password="testpass123", is_staff=True
+        )
+
+    def _post(self, view, user=None, **kwargs):
+        request = self.factory.post("/", **kwargs)
+        request.user = user or self.staff
+        return view(request)
+
+    def _signature(self, profile="projects.project.featured_image", sha256=""):
+        response = self._post(upload_signature, data={"profile": profile, "sha256": sha256})
+        return json.loads(response.content)
+
+    def _result(self, public_id):
+        from cloudinary.utils import api_sign_request
+
+        return {
+            "public_id": public_id,
+            "version": 1700000000,
+            "signature": api_sign_request({"public_id": public_id, "version": 1700000000}, "secret"),
+        }
+
+    def _resource(self, public_id, **overrides):
+        resource = {
+            "public_id": public_id,
+            "version": 1700000000,
+            "format": "jpg",
+            "resource_type": "image",
+            "bytes": 2048,
+            "width": 1600,
+            "height": 900,
+            "colors": [["#1A2B3C", 61.2]],
+            "created_at": timezone.now().isoformat(),
+            "secure_url": f"https://res.cloudinary.com/demo/image/upload/v1700000000/{public_id}.jpg",
+        }
+        resource.update(overrides)
+        return resource
+
+    def _callback(self, public_id, token=None, user=None, **overrides):
+        """Callback d'un envoi ; l'API Cloudinary décrit l'image avec `overrides`"""
+        token = token or self._signature()["token"]
+        with mock.patch("cloudinary.api.resource", return_value=self._resource(public_id, **overrides)):
+            return self._post(
+                upload_callback,
+                user=user,
+                data=json.dumps({"token": token, "result": self._result(public_id)}),
+                content_type="application/json",
+            )
+
+    def _form(self, instance, **tokens):
+        from types import SimpleNamespace
+
+        cleaned_data = {f"{field}_direct_upload": token for field, token in tokens.items()}
+        return SimpleNamespace(instance=instance, cleaned_data=cleaned_data)
+
+    def _apply(self, form):
+        from core.direct_uploads import apply_direct_uploads
+
+        request = self.factory.post("/")
+        request.user = self.staff
+        return apply_direct_uploads(request, form)
+
+    def test_signature_is_scoped_to_the_field_folder(self):
+        """Test the signed parameters target the image field folder."""
+        from cloudinary.utils import api_sign_request
+
+        fields = self._signature()["fields"]
+        self.assertEqual(fields["folder"], "projects/featured/original")
+        signed = {key: fields[key] for key in ("timestamp", "folder", "allowed_formats")}
+        self.assertEqual(fields["signature"], api_sign_request(signed, "secret"))
+
+    def test_verified_upload_is_applied_to_the_instance(self):
+        """Test a signed upload is described by Cloudinary and accepted by the admin form."""
+        data = json.loads(self._callback("projects/featured/original/hero").content)
+        self.assertEqual(data["value"], "image/upload/v1700000000/projects/featured/original/hero.jpg")
+
+        self.assertEqual(self._apply(self._form(self.project, featured_image=data["token"])), ["featured_image"])
+        self.assertEqual(self.project.featured_image.public_id, "projects/featured/original/hero")
+        metadata = self.project.image_metadata["featured_image"]
+        self.assertEqual((metadata["width"], metadata["height"], metadata["color"]), (1600, 900, "#1a2b3c"))
+        self.assertEqual(metadata["source"], data["value"])
+
+        # Jeton émis pour un autre champ ou altéré : ignoré
+        image = ProjectImage(project=self.project)
+        self.assertEqual(self._apply(self._form(image, image=data["token"])), [])
+        self.assertEqual(self._apply(self._form(self.project, featured_image=data["token"] + "x")), [])
+
+    def test_registered_image_is_reused_without_upload(self):
+        """Test an image registered by a server upload is reused for the same fingerprint."""
+        from .uploads import field_options
+
+        sha256 = "ab" * 32
+        options = field_options(ProjectImage._meta.get_field("image"))
+        with mock.patch(
+            "cloudinary.uploader.upload",
+            return_value=self._resource("projects/gallery/original/shot", colors=[]),
+        ), mock.patch("projects.uploads.content_hash", return_value=sha256):
+            upload_image(b"image bytes", **options)
+
+        data = self._signature(profile="projects.projectimage.image", sha256=sha256)
+        self.assertTrue(data["reused"])
+        self.assertNotIn("fields", data)
+        image = ProjectImage(project=self.project)
+        self.assertEqual(self._apply(self._form(image, image=data["token"])), ["image"])
+        self.assertEqual(image.image.public_id, "projects/gallery/original/shot")
+
+    def test_direct_uploads_are_not_registered(self):
+        """Test a browser-computed fingerprint never enters the upload registry."""
+        self._signature(sha256="cd" * 32)
+        self._callback("projects/featured/original/hero")
+
+        self.assertFalse(UploadedImage.objects.exists())
+
+    def test_invalid_uploads_are_rejected(self):
+        """Test forged, oversized or misplaced uploads are refused."""
+        from django.contrib.auth import get_user_model
+
+        forged = self._post(
+            upload_callback,
+            data=json.dumps({"token": "forged", "result": self._result("projects/featured/original/hero")}),
+            content_type="application/json",
+        )
+        self.assertEqual(forged.status_code, 403)
+
+        result = dict(self._result("projects/featured/original/hero"), signature="forged")
+        forged = self._post(
+            upload_callback,
+            data=json.dumps({"token": self._signature()["token"], "result": result}),
+            content_type="application/json",
+        )
+        self.assertEqual(forged.status_code, 403)
+
+        # Taille lue auprès de Cloudinary, pas dans la réponse transmise par le navigateur
+        oversized = self._callback("projects/featured/original/huge", bytes=50 * 1024 * 1024)
+        self.assertEqual(oversized.status_code, 400)
+        self.assertTrue(
+            CloudinaryDeletion.objects.filter(public_id="projects/featured/original/huge").exists()
+        )
+
+        self.assertEqual(self._callback("clients/logos/original/hero").status_code, 400)
+
+        # Ancienne réponse signée rejouée avec un nouveau jeton : refusée, l'image est conservée
+        created_at = (timezone.now() - timedelta(days=30)).isoformat()
+        replayed = self._callback("projects/featured/original/live", created_at=created_at)
+        self.assertEqual(replayed.status_code, 400)
+        self.assertFalse(
+            CloudinaryDeletion.objects.filter(public_id="projects/featured/original/live").exists()
+        )
+
+        other = get_user_model().objects.create_user(
+            email="other@example.com", password="testpass123", is_staff=True
+        )
+        self.assertEqual(self._callback("projects/featured/original/hero", user=other).status_code, 403)
+
+    def test_new_inline_row_with_only_a_direct_upload_is_saved(self):
+        """Test an extra inline form holding only a direct upload creates the image."""
+        from django.contrib.admin.sites import site
+
+        from .admin import ProjectAdmin, ProjectImageInline
+
+        profile_token = self._signature(profile="projects.projectimage.image")["token"]
+        response = self._callback("projects/gallery/original/shot", token=profile_token)
+        token = json.loads(response.content)["token"]
+
+        # Droit d'ajout des lignes de l'inline
+        self.staff.is_superuser = True
+        request = self.factory.post("/")
+        request.user = self.staff
+        inline = ProjectImageInline(Project, site)
+        FormSet = inline.get_formset(request, self.project)
+        prefix = FormSet.get_default_prefix()
+        formset = FormSet(
+            data={
+                f"{prefix}-TOTAL_FORMS": "1",
+                f"{prefix}-INITIAL_FORMS": "0",
+                f"{prefix}-0-image_direct_upload": token,
+                f"{prefix}-0-order": "0",
+            },
+            instance=self.project,
+            prefix=prefix,
+        )
+        self.assertTrue(formset.is_valid(), formset.errors)
+
+        ProjectAdmin(Project, site).save_formset(request, None, formset, change=True)
+
+        image = self.project.images.get()
+        self.assertEqual(image.image.public_id, "projects/gallery/original/shot")
+
+
+class ChunkedUploadTest(TestCase):
+    """Test suite for resumable chunked CKEditor5 uploads."""
+
+    def setUp(self):
+        """Set up test data."""
+        from django.contrib.auth import get_user_model
+        from django.test import RequestFactory
+        from PIL import Image
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(CHUNKED_UPLOAD_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.directory = Path(directory.name)
+
+        self.factory = RequestFactory()
+        self.user = get_user_model().objects.create_user(
+            email="editor@example.com", password="testpass123", is_staff=True
+        )
+
+        buffer = BytesIO()
+        Image.new("RGB", (64, 64), "navy").save(buffer, format="PNG")
+        self.content = buffer.getvalue()
+
+    def _send(self, start, end, upload_id="mockup-export"):
+        from core.chunked_uploads import chunked_upload
+
+        total = len(self.content)
+        content_range = f"bytes {start}-{end - 1}/{total}" if start is not None else f"bytes */{total}"
+        request = self.factory.post(
+            "/",
+            data=self.content[start:end] if start is not None else b"",
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=content_range,
+            HTTP_X_FILE_NAME="mockup.png",
+        )
+        request.user = self.user
+        return chunked_upload(request, upload_id)
+
+    def _status(self, upload_id="mockup-export"):
+        from core.chunked_uploads import chunked_upload
+
+        request = self.factory.get("/")
+        request.user = self.user
+        return json.loads(chunked_upload(request, upload_id).content)
+
+    def _offset(self, upload_id="mockup-export"):
+        return self._status(upload_id)["offset"]
+
+    def _result(self):
+        return {
+            "public_id": "ckeditor5/uploads/mockup_abc",
+            "version": 1,
+            "format": "png",
+            "resource_type": "image",
+            "secure_url": "https://res.cloudinary.com/demo/image/upload/ckeditor5/uploads/mockup_abc.png",
+            "bytes": len(self.content),
+        }
+
+    def test_upload_resumes_from_the_received_offset(self):
+        """Test parts are appended, a misplaced part is refused and the last part is queued."""
+        half = len(self.content) // 2
+
+        response = self._send(0, half)
+        self.assertEqual(json.loads(response.content), {"offset": half})
+        self.assertEqual(self._offset(), half)
+
+        # Partie déjà reçue (nouvel essai après une coupure) : position attendue retournée
+        response = self._send(0, half)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.content)["offset"], half)
+
+        # Dernière partie : l'envoi à Cloudinary est confié à la file, pas à la requête
+        with mock.patch("cloudinary.uploader.upload_large") as upload_large:
+            response = self._send(half, len(self.content))
+        upload_large.assert_not_called()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self._status(), {"offset": len(self.content), "processing": True})
+
+        with mock.patch("cloudinary.uploader.upload_large", return_value=self._result()) as upload_large:
+            self.assertEqual(queue.run_pending(), (1, 0))
+
+        self.assertEqual(upload_large.call_args.kwargs["filename"], "mockup.png")
+        self.assertEqual(self._status(), {"uploaded": True, "url": self._result()["secure_url"]})
+        self.assertEqual(list(self.directory.glob("*.part")), [])
+
+    def test_failed_cloudinary_upload_can_be_retried(self):
+        """Test a received file is kept when the queued upload fails and can be relaunched."""
+        self._send(0, len(self.content))
+        Job.objects.update(max_attempts=1)
+        with mock.patch("cloudinary.uploader.upload_large", side_effect=Exception("timeout")):
+            self.assertEqual(queue.run_pending(), (0, 1))
+        self.assertEqual(self._status(), {"offset": len(self.content), "processing": False})
+
+        response = self._send(None, None)
+        self.assertEqual(response.status_code, 202)
+        with mock.patch("cloudinary.uploader.upload_large", return_value=self._result()):
+            self.assertEqual(queue.run_pending(), (1, 0))
+        self.assertTrue(self._status()["uploaded"])
+
+    def test_part_is_refused_while_another_request_writes(self):
+        """Test a concurrent POST on the same upload cannot append to the locked file."""
+        import fcntl
+
+        from core.chunked_uploads import part_path
+
+        half = len(self.content) // 2
+        self._send(0, half)
+
+        # Nouvel essai de la partie suivante pendant que la première requête écrit encore
+        with open(part_path(self.user.pk, "mockup-export"), "ab") as part:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            response = self._send(half, len(self.content))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.content)["offset"], half)
+        self.assertEqual(self._offset(), half)
+
+    def test_non_staff_users_are_refused(self):
+        """Test chunked uploads are limited to staff members."""
+        self.user.is_staff = False
+        response = self._send(0, len(self.content) // 2)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(self.directory.glob("*.part")), [])
+
+    @override_settings(CHUNKED_UPLOAD_MAX_SIZE=16)
+    def test_oversized_upload_is_refused(self):
+        """Test uploads above CHUNKED_UPLOAD_MAX_SIZE are refused before any write."""
+        response = self._send(0, 16)
+        self.assertEqual(response.status_code, 413)
+        self.assertEqual(list(self.directory.glob("*.part")), [])
@@ -0,0 +1,186 @@
+"""
+Envois d'images sur Cloudinary dédupliqués par contenu.
+
+upload_image() calcule l'empreinte SHA-256 des octets envoyés et consulte le
+registre UploadedImage : une image identique déjà envoyée avec les mêmes
+options de transformation est réutilisée (même public_id, même URL), sans
+nouvel envoi. Tous les chemins d'envoi passent par cette fonction :
+
+- les vues d'upload CKEditor5 (core/ckeditor5_views.py, core/ckeditor_cloudinary.py)
+- les champs CloudinaryField des modèles, envoyés par le receiver pre_save
+  `upload_image_fields` (voir projects/signals.py) avant l'envoi du champ
+- la commande create_projects_from_images
+- les envois directs du navigateur (core/direct_uploads.py), qui consultent
+  le registre (find_upload) avec une empreinte calculée par le navigateur ;
+  invérifiable, elle n'est pas ajoutée au registre
+
+Les options de placement (dossier, public_id, nom de fichier) ne modifient
+pas le contenu et ne font pas partie de la clé : un même logo envoyé comme
+`logo` et `logo_white` n'est envoyé qu'une fois. Une image réutilisée peut
+donc être référencée par plusieurs lignes ; la boîte d'envoi des
+suppressions (projects/deletions.py) ne supprime pas un original encore
+référencé et retire du registre les images supprimées.
+"""
+
+import hashlib
+import json
+import logging
+
+import cloudinary.uploader
+from cloudinary import CloudinaryResource
+from django.db import IntegrityError, transaction
+
+from .image_backends import dominant_color, upload_metadata
+from .images import METADATA_FIELD, source_key
+from .models import UploadedImage
+
+logger = logging.getLogger(__name__)
+
+# Options d'envoi sans effet sur le contenu de l'image
+PLACEMENT_OPTIONS = {
+    "folder",
+    "public_id",
+    "use_filename",
+    "unique_filename",
+    "overwrite",
+    "invalidate",
+    "tags",
+    "context",
+    "chunk_size",
+    "filename",
+    # Ajoute seulement la couleur dominante à la réponse
+    "colors",
+}
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(file):
+    """Empreinte SHA-256 d'un fichier (UploadedFile, fichier ouvert ou octets)"""
+    digest = hashlib.sha256()
+    if isinstance(file, bytes):
+        digest.update(file)
+        return digest.hexdigest()
+
+    if hasattr(file, "seek"):
+        file.seek(0)
+    chunks = file.chunks(CHUNK_SIZE) if hasattr(file, "chunks") else iter(lambda: file.read(CHUNK_SIZE), b"")
+    for chunk in chunks:
+        digest.update(chunk)
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return digest.hexdigest()
+
+
+def options_hash(options):
+    """Empreinte des options d'envoi qui modifient le contenu de l'image"""
+    significant = {key: value for key, value in options.items() if key not in PLACEMENT_OPTIONS}
+    canonical = json.dumps(significant, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _result(image, reused):
+    """Réponse au format de cloudinary.uploader.upload"""
+    return {
+        "public_id": image.public_id,
+        "version": image.version,
+        "format": image.format,
+        "resource_type": image.resource_type,
+        "secure_url": image.secure_url,
+        "bytes": image.bytes,
+        "width": image.width,
+        "height": image.height,
+        "color": image.color,
+        "reused": reused,
+    }
+
+
+def find_upload(sha256, options):
+    """Image identique déjà envoyée avec les mêmes options (réponse de upload_image), ou None"""
+    existing = UploadedImage.objects.filter(sha256=sha256, options_hash=options_hash(options)).first()
+    return _result(existing, reused=True) if existing is not None else None
+
+
+def register_upload(sha256, options, result):
+    """Enregistre dans le registre une image envoyée sur Cloudinary (réponse d'envoi)"""
+    try:
+        with transaction.atomic():
+            UploadedImage.objects.create(
+                sha256=sha256,
+                options_hash=options_hash(options),
+                public_id=result["public_id"],
+                version=str(result.get("version") or ""),
+                format=result.get("format") or "",
+                resource_type=result.get("resource_type") or options.get("resource_type", "image"),
+                secure_url=result["secure_url"],
+                bytes=result.get("bytes") or 0,
+                width=result.get("width"),
+                height=result.get("height"),
+                color=dominant_color(result),
+            )
+    except IntegrityError:
+        # Envoi concurrent du même contenu : l'image enregistrée en premier reste la référence
+        pass
+
+
+def upload_image(file, large=False, **options):
+    """
+    Envoie une image sur Cloudinary, ou retourne l'image identique déjà
+    envoyée avec les mêmes options ; la réponse contient au moins
+    public_id, version, format, secure_url et "reused". Avec `large`, le
+    fichier est envoyé par morceaux (upload_large, option chunk_size).
+    """
+    sha256 = content_hash(file)
+
+    existing = find_upload(sha256, options)
+    if existing is not None:
+        logger.info(f"Image déjà envoyée, réutilisée: {existing['public_id']}")
+        return existing
+
+    upload = cloudinary.uploader.upload_large if large else cloudinary.uploader.upload
+    result = upload(file, **options)
+    register_upload(sha256, options, result)
+    return {**result, "reused": False}
+
+
+def field_options(model_field, instance=None):
+    """Options d'envoi d'un CloudinaryField, comme CloudinaryField.pre_save"""
+    options = {"type": model_field.type, "resource_type": model_field.resource_type}
+    options.update(
+        {
+            key: value(instance) if callable(value) else value
+            for key, value in model_field.options.items()
+        }
+    )
+    options.setdefault("colors", True)
+    return options
+
+
+def upload_field(instance, field):
+    """
+    Envoie le fichier en attente d'un CloudinaryField avec les options du
+    champ (comme CloudinaryField.pre_save) et le remplace par la ressource
+    Cloudinary, qui n'est alors plus envoyée par le champ. Les métadonnées de
+    l'image sont tirées de la réponse d'envoi ; l'aperçu LQIP est ajouté par
+    la tâche de génération.
+    """
+    model_field = instance._meta.get_field(field)
+    result = upload_image(getattr(instance, field), **field_options(model_field, instance))
+    resource = CloudinaryResource(
+        result["public_id"],
+        version=result["version"] or None,
+        format=result["format"] or None,
+        type=model_field.type,
+        resource_type=result["resource_type"],
+    )
+    setattr(instance, field, resource)
+
+    metadata = dict(upload_metadata(result), source=source_key(resource))
+    setattr(instance, METADATA_FIELD, {**(getattr(instance, METADATA_FIELD) or {}), field: metadata})
+    return resource
+
+
+def forget_uploads(public_ids):
+    """Retire du registre des images supprimées de Cloudinary"""
+    if public_ids:
+        UploadedImage.objects.filter(public_id__in=list(public_ids)).delete()
@@ -0,0 +1,286 @@
+"""
+Génération des versions optimisées (large, miniature) des images Cloudinary.
+
+Chaque champ image original est décrit par une VariantSpec : champs des
+versions envoyées à la main, dossiers, préréglages de transformation
+(admin_config.IMAGE_TRANSFORMATIONS, les mêmes que ceux des versions
+virtuelles) et identifiant Cloudinary. Les versions sont créées par le backend
+configuré (voir projects/image_backends.py) et leurs URL enregistrées dans la
+colonne `image_variants`. La génération est exécutée hors requête par la tâche
+"projects.generate_image_variants" (voir projects/tasks.py), mise en file par
+les signaux post_save.
+"""
+
+import logging
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+from tasks.queue import enqueue
+
+from .admin_config import IMAGE_TRANSFORMATIONS
+from .image_backends import get_backend
+from .images import (
+    METADATA_FIELD,
+    VARIANTS_FIELD,
+    current_variants,
+    resolve_image_urls,
+    source_key,
+    virtual_variants_enabled,
+)
+
+logger = logging.getLogger(__name__)
+
+GENERATE_VARIANTS_TASK = "projects.generate_image_variants"
+
+VariantSpec = namedtuple(
+    "VariantSpec",
+    [
+        "large_field",
+        "thumb_field",
+        "public_id_field",
+        "large_folder",
+        "thumb_folder",
+        "large_preset",
+        "thumb_preset",
+        "identifier",
+    ],
+)
+
+# (label du modèle, champ original) -> VariantSpec
+VARIANT_SPECS = {
+    ("projects.project", "featured_image"): VariantSpec(
+        large_field="featured_image_large",
+        thumb_field="thumbnail",
+        public_id_field="featured_image_cloudinary_public_id",
+        large_folder="projects/featured/large",
+        thumb_folder="projects/featured/thumbnails",
+        large_preset="project_large",
+        thumb_preset="project_thumbnail",
+        identifier=lambda project: project.slug,
+    ),
+    ("projects.projectimage", "image"): VariantSpec(
+        large_field="image_large",
+        thumb_field="image_thumbnail",
+        public_id_field="image_cloudinary_public_id",
+        large_folder="projects/gallery/large",
+        thumb_folder="projects/gallery/thumbnails",
+        large_preset="large",
+        thumb_preset="thumbnail",
+        identifier=lambda image: f"{image.project.slug}_gallery_{image.id}",
+    ),
+    ("projects.client", "logo"): VariantSpec(
+        large_field="logo_large",
+        thumb_field="logo_thumbnail",
+        public_id_field="logo_cloudinary_public_id",
+        large_folder="clients/logos/large",
+        thumb_folder="clients/logos/thumbnails",
+        large_preset="logo_large",
+        thumb_preset="logo_thumbnail",
+        identifier=lambda client: f"{client.slug}_logo",
+    ),
+    ("projects.client", "logo_white"): VariantSpec(
+        large_field="logo_white_large",
+        thumb_field="logo_white_thumbnail",
+        public_id_field="logo_white_cloudinary_public_id",
+        large_folder="clients/logos/white/large",
+        thumb_folder="clients/logos/white/thumbnails",
+        large_preset="logo_large",
+        thumb_preset="logo_thumbnail",
+        identifier=lambda client: f"{client.slug}_logo_white",
+    ),
+    ("projects.projecttestimonial", "client_photo"): VariantSpec(
+        large_field="client_photo_large",
+        thumb_field="client_photo_thumbnail",
+        public_id_field="client_photo_cloudinary_public_id",
+        large_folder="testimonials/large",
+        thumb_folder="testimonials/thumbnails",
+        large_preset="testimonial_large",
+        thumb_preset="testimonial_thumbnail",
+        identifier=lambda testimonial: f"{testimonial.project.slug}_testimonial",
+    ),
+}
+
+
+def get_spec(instance, field):
+    return VARIANT_SPECS[(instance._meta.label_lower, field)]
+
+
+def needs_variants(instance, field):
+    """
+    L'image originale existe mais n'a ni version large envoyée à la main ni
+    versions générées à partir d'elle (jamais en mode versions virtuelles, où
+    les versions sont des URL de transformation)
+    """
+    if virtual_variants_enabled():
+        return False
+    spec = get_spec(instance, field)
+    original = getattr(instance, field)
+    return (
+        bool(original)
+        and not getattr(instance, spec.large_field)
+        and not current_variants(original, getattr(instance, VARIANTS_FIELD), field)
+    )
+
+
+def needs_metadata(instance, field, retry_errors=False):
+    """
+    L'image originale existe mais ses métadonnées manquent, sont périmées ou
+    n'ont pas encore d'aperçu LQIP (métadonnées tirées de la réponse d'envoi).
+    Un échec de description est enregistré pour l'original et n'est retenté
+    qu'avec `retry_errors` (commande backfill_image_metadata) : une
+    sauvegarde ne remet pas la tâche en file à chaque fois.
+    """
+    original = getattr(instance, field)
+    if not original:
+        return False
+    metadata = (getattr(instance, METADATA_FIELD) or {}).get(field) or {}
+    if metadata.get("source") != source_key(original):
+        return True
+    if "error" in metadata:
+        return retry_errors
+    return not metadata.get("lqip")
+
+
+def needs_processing(instance, field):
+    return needs_variants(instance, field) or needs_metadata(instance, field)
+
+
+def variants_idempotency_key(instance, field):
+    return f"variants:{instance._meta.label_lower}:{instance.pk}:{field}"
+
+
+def enqueue_variants(instance, field):
+    """
+    Met en file la génération des versions et/ou des métadonnées d'un champ
+    image si nécessaire
+    """
+    if not needs_processing(instance, field):
+        return None
+    return enqueue(
+        GENERATE_VARIANTS_TASK,
+        {"model": instance._meta.label_lower, "pk": instance.pk, "field": field},
+        idempotency_key=variants_idempotency_key(instance, field),
+    )
+
+
+def variant_fields(instance, field):
+    """Champs enregistrés après la génération des versions d'un champ image"""
+    spec = get_spec(instance, field)
+    return [spec.public_id_field, VARIANTS_FIELD, METADATA_FIELD]
+
+
+def capture_metadata(instance, field, backend=None):
+    """
+    Décrit l'image originale avec le backend et enregistre le résultat dans
+    la colonne de métadonnées de l'instance (sans écriture en base). Un
+    échec est enregistré sous la clé "error" au lieu d'être propagé : les
+    métadonnées sont facultatives.
+    """
+    backend = backend or get_backend()
+    original = getattr(instance, field)
+    try:
+        metadata = dict(backend.describe(original), source=source_key(original))
+    except Exception as e:
+        logger.warning(f"Métadonnées indisponibles pour {instance} ({field}): {e}")
+        metadata = {"source": source_key(original), "error": str(e)}
+    setattr(instance, METADATA_FIELD, {**(getattr(instance, METADATA_FIELD) or {}), field: metadata})
+    return metadata
+
+
+def upload_variants(instance, field, backend=None):
+    """
+    Crée les versions large et miniature d'un champ image avec le backend
+    configuré (voir projects/image_backends.py) et les affecte à l'instance,
+    sans écriture en base. Aucune requête SQL n'est exécutée (les relations
+    utilisées par l'identifiant doivent être chargées), ce qui permet l'appel
+    depuis un thread. Les erreurs du backend sont propagées.
+    """
+    backend = backend or get_backend()
+    spec = get_spec(instance, field)
+    original = getattr(instance, field)
+    identifier = spec.identifier(instance)
+
+    large_url, thumb_url = backend.create_variants(
+        original,
+        [
+            {
+                "folder": spec.large_folder,
+                "public_id": f"{identifier}_large",
+                "transformation": IMAGE_TRANSFORMATIONS[spec.large_preset],
+            },
+            {
+                "folder": spec.thumb_folder,
+                "public_id": f"{identifier}_thumb",
+                "transformation": IMAGE_TRANSFORMATIONS[spec.thumb_preset],
+            },
+        ],
+    )
+
+    # Les URL des versions sont enregistrées hors des CloudinaryField
+    generated = {"large": large_url, "thumbnail": thumb_url, "source": source_key(original)}
+    setattr(instance, VARIANTS_FIELD, {**(getattr(instance, VARIANTS_FIELD) or {}), field: generated})
+
+    # Sauvegarder le public_id original si pas déjà fait
+    if not getattr(instance, spec.public_id_field):
+        setattr(instance, spec.public_id_field, original.public_id)
+
+    if needs_metadata(instance, field):
+        capture_metadata(instance, field, backend)
+
+    instance.updated_at = timezone.now()
+    resolve_image_urls(instance)
+
+
+def save_variants(instance, field):
+    """
+    Enregistre les résultats d'un champ image calculés sur `instance` : la
+    ligne est relue et verrouillée (select_for_update) et seules les entrées
+    de ce champ sont fusionnées dans ses colonnes JSON, si bien que les tâches
+    des autres champs de la même ligne (logo et logo blanc d'un client) ne
+    sont pas écrasées. Retourne False si l'original a changé entretemps (une
+    nouvelle tâche est alors en file).
+    """
+    spec = get_spec(instance, field)
+    model = type(instance)
+    with transaction.atomic():
+        current = model.objects.select_for_update().filter(pk=instance.pk).first()
+        if current is None or source_key(getattr(current, field)) != source_key(getattr(instance, field)):
+            return False
+
+        for name in (VARIANTS_FIELD, METADATA_FIELD):
+            entry = (getattr(instance, name) or {}).get(field)
+            if entry is not None:
+                setattr(current, name, {**(getattr(current, name) or {}), field: entry})
+        if not getattr(current, spec.public_id_field):
+            setattr(current, spec.public_id_field, getattr(instance, spec.public_id_field))
+        current.updated_at = timezone.now()
+        resolve_image_urls(current)
+
+        saved = variant_fields(instance, field) + ["resolved_image_urls", "updated_at"]
+        model.objects.filter(pk=instance.pk).update(
+            **{name: getattr(current, name) for name in saved}
+        )
+    for name in saved:
+        setattr(instance, name, getattr(current, name))
+    return True
+
+
+def generate_variants(instance, field):
+    """
+    Génère les versions large et miniature d'un champ image (ou seulement ses
+    métadonnées si les versions existent ou sont virtuelles) puis les
+    enregistre par un update() (aucun signal post_save n'est émis, voir
+    save_variants). Les erreurs de création des versions sont propagées pour
+    que la tâche soit retentée ; un échec de description est enregistré
+    (capture_metadata).
+    """
+    if needs_variants(instance, field):
+        upload_variants(instance, field)
+    else:
+        capture_metadata(instance, field)
+
+    if not save_variants(instance, field):
+        logger.info(f"Image modifiée pendant la génération, résultats ignorés: {instance} ({field})")
+        return
+    logger.info(f"Versions d'images générées pour {instance._meta.verbose_name}: {instance}")
@@ -2,43 +2,71 @@ from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
 from django.views.generic import ListView, DetailView
 from django.core.paginator import Paginator
+from django.conf import settings
 from django.db import models
-from .models import Project, ProjectCategory, Client
+from . import related, search, stats
+from .cache import CATALOG_NAMESPACE, PORTFOLIO_NAMESPACE, cached_json_response
+from .models import Project, ProjectCard, ProjectCategory, Client
+from .pagination import MAX_PAGE_SIZE, InvalidCursor, KeysetPaginator
+
+# Tris proposés et colonnes du curseur correspondant (pagination keyset),
+# complétés par des colonnes départageantes jusqu'à une clé unique
+KEYSET_ORDERINGS = {
+    "order": ("order", "-created_at", "pk"),
+    "-order": ("-order", "-created_at", "pk"),
+    "-created_at": ("-created_at", "pk"),
+    "title": ("title", "pk"),
+}
 
 
 class ProjectListView(ListView):
     """Vue pour lister tous les projets publiés"""
 
-    model = Project
+    model = ProjectCard
     template_name = "projects/project_list.html"
     context_object_name = "projects"
     paginate_by = 12
+    # Tri du curseur quand ?order_by= est absent de KEYSET_ORDERINGS (Meta.ordering)
+    order_by = "-order"
+    next_cursor = None
 
     def get_queryset(self):
-        queryset = (
-            Project.objects.filter(is_published=True)
-            .select_related("client")
-            .prefetch_related("categories")
-        )
+        # Modèle de lecture dénormalisé : aucune jointure ni construction d'URL
+        queryset = ProjectCard.objects.published()
 
         # Filtrage par catégorie
         category_slug = self.request.GET.get("category")
         if category_slug:
-            queryset = queryset.filter(categories__slug=category_slug)
+            queryset = queryset.in_category(category_slug)
 
         # Tri
         order_by = self.request.GET.get(
             "order_by", "order"
         )  # Changer le tri par défaut à "order"
-        if order_by in ["-created_at", "order", "-order", "title"]:
+        if order_by in KEYSET_ORDERINGS:
+            self.order_by = order_by
             queryset = queryset.order_by(order_by)
 
         return queryset
 
+    def paginate_queryset(self, queryset, page_size):
+        """Mode curseur (?cursor=) : ni COUNT(*) ni OFFSET"""
+        if "cursor" not in self.request.GET:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, KEYSET_ORDERINGS[self.order_by], page_size)
+        try:
+            page = paginator.page(self.request.GET["cursor"])
+        except InvalidCursor:
+            page = paginator.page()
+        self.next_cursor = page.next_cursor
+        return None, None, page.object_list, False
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["categories"] = ProjectCategory.objects.all()
         context["current_category"] = self.request.GET.get("category")
+        context["next_cursor"] = self.next_cursor
         return context
 
 
@@ -52,31 +80,30 @@ class ProjectDetailView(DetailView):
     slug_url_kwarg = "slug"
 
     def get_queryset(self):
-        return (
-            Project.objects.filter(is_published=True)
-            .select_related("client", "metrics", "testimonial")
-            .prefetch_related("categories", "images", "team_members__user")
+        # Pas de prefetch : catégories et images ne sont chargées que si les
+        # fragments en cache du template doivent être reconstruits
+        return Project.objects.filter(is_published=True).select_related(
+            "client", "metrics", "testimonial", "card"
         )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         project = self.object
 
-        # Projets similaires basés sur les catégories et le client
-        related_projects = (
-            Project.objects.filter(
-                models.Q(categories__in=project.categories.all())
-                | models.Q(client=project.client),
-                is_published=True,
-            )
-            .exclude(id=project.id)
-            .select_related("client")
-            .prefetch_related("categories")
-            .distinct()[:6]
-        )
+        # Projets similaires précalculés (voir projects/related.py)
+        related_projects = related.related_cards(project)
 
         context["related_projects"] = related_projects
 
+        # QuerySets paresseux, évalués une seule fois par rendu de fragment
+        context["project_categories"] = project.categories.all()
+        context["project_images"] = project.images.all()
+
+        context["fragment_cache_timeout"] = getattr(
+            settings, "PROJECTS_FRAGMENT_CACHE_TIMEOUT", 60 * 60 * 24
+        )
+        context["fragment_versions"] = _fragment_versions(project, related_projects)
+
         # Informations supplémentaires pour le SEO et la structure
         context["page_title"] = f"{project.title} - Case Study"
         context["breadcrumbs"] = [
@@ -88,6 +115,31 @@ class ProjectDetailView(DetailView):
         return context
 
 
+def _fragment_versions(project, related_projects):
+    """
+    Versions des fragments en cache de project_detail.html, dérivées des
+    dates de mise à jour des objets affichés dans chacun d'eux
+    """
+    # La carte est reconstruite à chaque modification du projet, de son
+    # client ou de ses catégories
+    card = getattr(project, "card", None)
+    testimonial = getattr(project, "testimonial", None)
+    images = project.images.aggregate(
+        count=models.Count("id"), updated_at=models.Max("updated_at")
+    )
+    gallery_updated_at = images["updated_at"].isoformat() if images["updated_at"] else ""
+
+    return {
+        "hero": (card or project).updated_at.isoformat(),
+        "gallery": f"{images['count']}:{gallery_updated_at}",
+        "testimonial": testimonial.updated_at.isoformat() if testimonial else "",
+        "related": ",".join(
+            f"{related_card.pk}:{related_card.updated_at.isoformat()}"
+            for related_card in related_projects
+        ),
+    }
+
+
 def project_images_api(request, project_slug):
     """API pour récupérer les images d'un projet en JSON"""
     project = get_object_or_404(Project, slug=project_slug, is_published=True)
@@ -120,18 +172,14 @@ def project_images_api(request, project_slug):
 
 def featured_projects_view(request):
     """Vue pour les projets mis en avant"""
-    featured_projects = (
-        Project.objects.filter(is_published=True, is_featured=True)
-        .select_related("client")
-        .prefetch_related("categories")[:6]
-    )
+    featured_projects = ProjectCard.objects.published().filter(is_featured=True)[:6]
 
-    # Ajouter les URLs multi-formats pour chaque projet
+    # Les URLs multi-formats sont déjà résolues dans les cartes
     projects_with_images = []
     for project in featured_projects:
         project_data = {"project": project, "image_urls": None}
-        if project.featured_image:
-            project_data["image_urls"] = project.featured_image_urls
+        if project.image_urls.get("original"):
+            project_data["image_urls"] = project.image_urls
         projects_with_images.append(project_data)
 
     return render(
@@ -141,50 +189,123 @@ def featured_projects_view(request):
     )
 
 
-def clients_api(request):
-    """API pour récupérer les clients avec leurs logos en JSON"""
-    clients = Client.objects.filter(is_active=True).order_by("order", "name")
+def _requested_fields(request, available_fields):
+    """
+    Projection optionnelle ?fields=a,b,c : retourne le tuple des champs
+    demandés parmi `available_fields`, dans l'ordre de ces derniers (tous par
+    défaut). Les champs inconnus sont ignorés.
+    """
+    requested = {field.strip() for field in request.GET.get("fields", "").split(",")}
+    fields = tuple(field for field in available_fields if field in requested)
+    return fields or tuple(available_fields)
+
+
+# Champs exposés par clients_api et colonnes nécessaires pour les construire
+CLIENT_API_FIELDS = {
+    "id": ["id"],
+    "name": ["name"],
+    "slug": ["slug"],
+    "website": ["website"],
+    "description": ["description"],
+    "logo_urls": ["logo", "logo_large", "logo_thumbnail", "resolved_image_urls"],
+    "logo_white_urls": [
+        "logo_white",
+        "logo_white_large",
+        "logo_white_thumbnail",
+        "resolved_image_urls",
+    ],
+    "projects_count": [],
+}
+
+
+def _build_clients_payload(fields):
+    """Construit le payload de clients_api en une seule requête agrégée"""
+    columns = {column for field in fields for column in CLIENT_API_FIELDS[field]}
+    clients = (
+        Client.objects.filter(is_active=True)
+        .only("id", *columns)
+        .annotate(
+            published_projects_count=models.Count(
+                "projects", filter=models.Q(projects__is_published=True)
+            )
+        )
+        .order_by("order", "name")
+    )
 
     clients_data = []
     for client in clients:
-        client_data = {
-            "id": client.id,
-            "name": client.name,
-            "slug": client.slug,
-            "website": client.website,
-            "description": client.description,
-            "logo_urls": client.logo_urls,
-            "logo_white_urls": client.logo_white_urls,
-            "projects_count": client.projects.filter(is_published=True).count(),
-        }
+        client_data = {}
+        for field in fields:
+            if field == "projects_count":
+                client_data[field] = client.published_projects_count
+            else:
+                client_data[field] = getattr(client, field)
         clients_data.append(client_data)
 
-    return JsonResponse({"clients": clients_data})
+    return {"clients": clients_data}
 
 
-def project_categories_api(request):
-    """API pour récupérer les catégories de projets"""
-    categories = ProjectCategory.objects.all().order_by("name")
+def clients_api(request):
+    """
+    API pour récupérer les clients avec leurs logos en JSON.
+
+    Le paramètre optionnel ?fields= limite les champs renvoyés (et les colonnes
+    lues), par exemple ?fields=name,logo_urls pour le slider de logos.
+    """
+    fields = _requested_fields(request, CLIENT_API_FIELDS)
+    return cached_json_response(
+        request,
+        CATALOG_NAMESPACE,
+        ("clients", fields),
+        lambda: _build_clients_payload(fields),
+    )
+
+
+# Champs exposés par project_categories_api
+CATEGORY_API_FIELDS = ["id", "name", "slug", "description", "color", "projects_count"]
+
+
+def _build_categories_payload(fields):
+    """Construit le payload de project_categories_api en une seule requête agrégée"""
+    columns = [field for field in fields if field != "projects_count"]
+    categories = (
+        ProjectCategory.objects.only("id", *columns)
+        .annotate(
+            published_projects_count=models.Count(
+                "projects", filter=models.Q(projects__is_published=True)
+            )
+        )
+        .order_by("name")
+    )
 
     categories_data = []
     for category in categories:
-        category_data = {
-            "id": category.id,
-            "name": category.name,
-            "slug": category.slug,
-            "description": category.description,
-            "color": category.color,
-            "projects_count": category.projects.filter(is_published=True).count(),
-        }
+        category_data = {}
+        for field in fields:
+            if field == "projects_count":
+                category_data[field] = category.published_projects_count
+            else:
+                category_data[field] = getattr(category, field)
         categories_data.append(category_data)
 
-    return JsonResponse({"categories": categories_data})
+    return {"categories": categories_data}
+
+
+def project_categories_api(request):
+    """API pour récupérer les catégories de projets (accepte ?fields=)"""
+    fields = _requested_fields(request, CATEGORY_API_FIELDS)
+    return cached_json_response(
+        request,
+        CATALOG_NAMESPACE,
+        ("categories", fields),
+        lambda: _build_categories_payload(fields),
+    )
 
 
 class ProjectsByCategoryView(ListView):
     """Vue pour afficher les projets d'une catégorie spécifique"""
 
-    model = Project
+    model = ProjectCard
     template_name = "projects/projects_by_category.html"
     context_object_name = "projects"
     paginate_by = 12
@@ -194,9 +315,8 @@ class ProjectsByCategoryView(ListView):
             ProjectCategory, slug=self.kwargs["category_slug"]
         )
         return (
-            Project.objects.filter(categories=self.category, is_published=True)
-            .select_related("client")
-            .prefetch_related("categories")
+            ProjectCard.objects.published()
+            .in_category(self.category.slug)
             .order_by("-order", "-created_at")
         )
 
@@ -210,7 +330,7 @@ class ProjectsByCategoryView(ListView):
 class ProjectsByClientView(ListView):
     """Vue pour afficher les projets d'un client spécifique"""
 
-    model = Project
+    model = ProjectCard
     template_name = "projects/projects_by_client.html"
     context_object_name = "projects"
     paginate_by = 12
@@ -218,9 +338,8 @@ class ProjectsByClientView(ListView):
     def get_queryset(self):
         self.client = get_object_or_404(Client, slug=self.kwargs["client_slug"])
         return (
-            Project.objects.filter(client=self.client, is_published=True)
-            .select_related("client")
-            .prefetch_related("categories")
+            ProjectCard.objects.published()
+            .filter(client_slug=self.client.slug)
             .order_by("-order", "-created_at")
         )
 
@@ -232,48 +351,58 @@ class ProjectsByClientView(ListView):
 
 
 def search_projects(request):
-    """Vue de recherche de projets"""
+    """Vue de recherche de projets (index plein texte, voir projects/search.py)"""
     query = request.GET.get("q", "")
     category_filter = request.GET.get("category", "")
     client_filter = request.GET.get("client", "")
 
-    projects = Project.objects.filter(is_published=True)
-
-    # Recherche textuelle
-    if query:
-        projects = projects.filter(
-            models.Q(title__icontains=query)
-            | models.Q(subtitle__icontains=query)
-            | models.Q(description__icontains=query)
-            | models.Q(content__icontains=query)
-            | models.Q(client__name__icontains=query)
-        )
+    projects = ProjectCard.objects.published()
 
     # Filtre par catégorie
     if category_filter:
-        projects = projects.filter(categories__slug=category_filter)
+        projects = projects.in_category(category_filter)
 
     # Filtre par client
     if client_filter:
-        projects = projects.filter(client__slug=client_filter)
-
-    projects = (
-        projects.select_related("client").prefetch_related("categories").distinct()
-    )
-
-    # Pagination
-    paginator = Paginator(projects, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+        projects = projects.filter(client_slug=client_filter)
+
+    # Recherche textuelle : résultats classés par pertinence avec extraits
+    ordering = KEYSET_ORDERINGS["-order"]
+    if query.strip():
+        # Les filtres sont appliqués par l'index, avant la limite de résultats
+        hits = {hit.project_id: hit for hit in search.search(query, candidates=projects)}
+        projects = list(projects.filter(pk__in=hits))
+        for card in projects:
+            card.search_rank = hits[card.pk].rank
+            card.search_snippet = hits[card.pk].snippet
+        projects.sort(key=lambda card: (-card.search_rank, card.pk))
+        ordering = ("-search_rank", "pk")
+
+    # Pagination : numérotée par défaut, par curseur avec ?cursor=
+    next_cursor = None
+    if "cursor" in request.GET:
+        paginator = KeysetPaginator(projects, ordering, 12)
+        try:
+            page_obj = paginator.page(request.GET["cursor"])
+        except InvalidCursor:
+            page_obj = paginator.page()
+        next_cursor = page_obj.next_cursor
+        # Le nombre total n'est connu sans COUNT que pour une recherche classée
+        total_results = len(projects) if isinstance(projects, list) else None
+    else:
+        paginator = Paginator(projects, 12)
+        page_obj = paginator.get_page(request.GET.get("page"))
+        total_results = paginator.count
 
     context = {
         "projects": page_obj,
+        "next_cursor": next_cursor,
         "query": query,
         "category_filter": category_filter,
         "client_filter": client_filter,
         "categories": ProjectCategory.objects.all(),
         "clients": Client.objects.filter(is_active=True),
-        "total_results": projects.count(),
+        "total_results": total_results,
     }
 
     return render(request, "projects/search_results.html", context)
@@ -281,84 +410,35 @@ def search_projects(request):
 
 def project_stats_api(request):
     """API pour obtenir les statistiques des projets"""
-    from django.db.models import Count, Q
-
-    # Statistiques générales
-    stats = {
-        "total_projects": Project.objects.count(),
-        "published_projects": Project.objects.filter(is_published=True).count(),
-        "featured_projects": Project.objects.filter(
-            is_featured=True, is_published=True
-        ).count(),
-        "draft_projects": Project.objects.filter(status="draft").count(),
-        "completed_projects": Project.objects.filter(status="completed").count(),
-        "active_clients": Client.objects.filter(is_active=True).count(),
-        "total_categories": ProjectCategory.objects.count(),
-    }
+    return JsonResponse({"stats": stats.get_api_stats()})
 
-    # Projets par statut
-    status_stats = Project.objects.values("status").annotate(count=Count("id"))
-    stats["by_status"] = {item["status"]: item["count"] for item in status_stats}
 
-    # Projets par catégorie
-    category_stats = ProjectCategory.objects.annotate(
-        project_count=Count("projects", filter=Q(projects__is_published=True))
-    ).values("name", "color", "project_count")
-    stats["by_category"] = list(category_stats)
+def _portfolio_filters(request):
+    """Normalise les paramètres de filtrage de l'API portfolio"""
+    category_slug = request.GET.get("category") or None
+    client_slug = request.GET.get("client") or None
+    featured_only = request.GET.get("featured") == "true"
+    order_by = request.GET.get("order_by", "order")  # Ordre par défaut
+    cursor = request.GET.get("cursor") or None
 
-    # Clients les plus actifs
-    client_stats = (
-        Client.objects.annotate(
-            project_count=Count("projects", filter=Q(projects__is_published=True))
-        )
-        .filter(project_count__gt=0)
-        .order_by("-project_count")[:5]
-    )
+    # Taille de page bornée côté serveur
+    try:
+        limit = int(request.GET.get("limit", 20))
+    except ValueError:
+        limit = 20
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
 
-    stats["top_clients"] = [
-        {
-            "name": client.name,
-            "slug": client.slug,
-            "project_count": client.project_count,
-            "logo_url": client.logo_urls["thumbnail"] if client.logo else None,
-        }
-        for client in client_stats
-    ]
-
-    # Projets récents
-    recent_projects = (
-        Project.objects.filter(is_published=True)
-        .select_related("client")
-        .order_by("order")[:5]
-    )
-    stats["recent_projects"] = [
-        {
-            "title": project.title,
-            "slug": project.slug,
-            "client": project.client.name,
-            "status": project.status,
-            "created_at": project.created_at.isoformat(),
-            "thumbnail_url": (
-                project.featured_image_urls["thumbnail"]
-                if project.featured_image
-                else None
-            ),
-        }
-        for project in recent_projects
-    ]
+    # Validation du paramètre order_by
+    if order_by not in KEYSET_ORDERINGS:
+        order_by = "order"  # Valeur par défaut sécurisée
 
-    return JsonResponse({"stats": stats})
+    return category_slug, client_slug, featured_only, limit, order_by, cursor
 
 
-def project_portfolio_api(request):
-    """API pour le portfolio complet avec filtres optionnels"""
-    # Paramètres de filtrage
-    category_slug = request.GET.get("category")
-    client_slug = request.GET.get("client")
-    featured_only = request.GET.get("featured") == "true"
-    limit = int(request.GET.get("limit", 20))
-    order_by = request.GET.get("order_by", "order")  # Ordre par défaut
-
+def _build_portfolio_payload(
+    category_slug, client_slug, featured_only, limit, order_by, cursor
+):
+    """Construit le payload de l'API portfolio pour des filtres normalisés"""
     # Construction de la requête
     projects = Project.objects.filter(is_published=True)
 
@@ -371,21 +451,15 @@ def project_portfolio_api(request):
     if featured_only:
         projects = projects.filter(is_featured=True)
 
-    # Validation du paramètre order_by
-    valid_order_fields = ["order", "-order", "-created_at", "title"]
-    if order_by not in valid_order_fields:
-        order_by = "order"  # Valeur par défaut sécurisée
-
-    # Appliquer le tri et les relations
-    projects = (
-        projects.select_related("client")
-        .prefetch_related("categories")
-        .order_by(order_by)[:limit]
+    # Appliquer les relations puis le tri/la pagination par curseur
+    projects = projects.select_related("client", "metrics", "testimonial").prefetch_related(
+        "categories"
     )
+    page = KeysetPaginator(projects, KEYSET_ORDERINGS[order_by], limit).page(cursor)
 
     # Formatage des données
     portfolio_data = []
-    for project in projects:
+    for project in page:
         project_data = {
             "id": project.id,
             "title": project.title,
@@ -429,15 +503,34 @@ def project_portfolio_api(request):
 
         portfolio_data.append(project_data)
 
-    return JsonResponse(
-        {
-            "projects": portfolio_data,
-            "total_count": projects.count(),
-            "filters_applied": {
-                "category": category_slug,
-                "client": client_slug,
-                "featured_only": featured_only,
-                "limit": limit,
-            },
-        }
-    )
+    return {
+        "projects": portfolio_data,
+        # Le queryset est déjà tronqué à `limit` : inutile de relancer un COUNT
+        "total_count": len(portfolio_data),
+        "next_cursor": page.next_cursor,
+        "filters_applied": {
+            "category": category_slug,
+            "client": client_slug,
+            "featured_only": featured_only,
+            "limit": limit,
+        },
+    }
+
+
+def project_portfolio_api(request):
+    """
+    API pour le portfolio complet avec filtres optionnels.
+
+    Les réponses sont mises en cache par combinaison de filtres et invalidées
+    par la génération du portfolio (voir projects/cache.py).
+    """
+    filters = _portfolio_filters(request)
+    try:
+        return cached_json_response(
+            request,
+            PORTFOLIO_NAMESPACE,
+            filters,
+            lambda: _build_portfolio_payload(*filters),
+        )
+    except InvalidCursor:
+        return JsonResponse({"error": "Curseur invalide"}, status=400)
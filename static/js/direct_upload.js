@@ -0,0 +1,314 @@
+/**
+ * Envois d'images directs du navigateur vers Cloudinary (voir core/direct_uploads.py)
+ *
+ * 1. Paramètres signés demandés à /uploads/signature/ pour un profil, avec
+ *    l'empreinte SHA-256 du fichier : une image identique déjà envoyée est
+ *    réutilisée sans envoi
+ * 2. Fichier envoyé directement à Cloudinary
+ * 3. Réponse de Cloudinary vérifiée et enregistrée par /uploads/callback/
+ *
+ * - CKEditor5 : l'adaptateur d'upload des éditeurs est remplacé ; les fichiers de
+ *   plus de 10MB sont envoyés au serveur par morceaux, avec reprise, puis
+ *   envoyés à Cloudinary par une tâche (voir core/chunked_uploads.py)
+ * - Champs image de l'admin (input[data-direct-upload]) : le fichier est envoyé
+ *   dès sa sélection ; le jeton signé de l'envoi est placé dans le champ caché
+ *   "<nom>_direct_upload"
+ */
+
+"use strict";
+(function () {
+
+    const SIGNATURE_URL = "/uploads/signature/";
+    const CALLBACK_URL = "/uploads/callback/";
+    const CHUNKED_URL = "/ckeditor5/upload/chunked/";
+    const CKEDITOR_PROFILE = "ckeditor";
+
+    // Au-delà, les images sont envoyées par morceaux de PART_SIZE
+    const LARGE_FILE_SIZE = 10 * 1024 * 1024;
+    const PART_SIZE = 5 * 1024 * 1024;
+    const PART_RETRIES = 3;
+    const CONFLICT_RETRIES = 6;
+    // Intervalle d'interrogation de l'envoi à Cloudinary (tâche en arrière-plan)
+    const POLL_INTERVAL = 2000;
+
+    function getCookie(name) {
+        const cookie = document.cookie.split(";").map(c => c.trim()).find(c => c.startsWith(name + "="));
+        return cookie ? decodeURIComponent(cookie.substring(name.length + 1)) : null;
+    }
+
+    function postJSON(url, body, isJSON) {
+        return fetch(url, {
+            method: "POST",
+            credentials: "same-origin",
+            headers: Object.assign(
+                {"X-CSRFToken": getCookie("csrftoken")},
+                isJSON ? {"Content-Type": "application/json"} : {}
+            ),
+            body: body,
+        }).then(response => response.json().then(data => {
+            if (!response.ok || data.uploaded === false) {
+                throw new Error((data.error && data.error.message) || "Erreur lors de l'upload");
+            }
+            return data;
+        }));
+    }
+
+    /**
+     * Empreinte SHA-256 (hexadécimale) d'un fichier, ou "" si l'API Web Crypto
+     * n'est pas disponible (contexte non sécurisé)
+     */
+    function sha256(file) {
+        if (!window.crypto || !window.crypto.subtle) {
+            return Promise.resolve("");
+        }
+        return file.arrayBuffer()
+            .then(buffer => window.crypto.subtle.digest("SHA-256", buffer))
+            .then(digest => Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, "0")).join(""))
+            .catch(() => "");
+    }
+
+    /**
+     * Envoie un fichier à Cloudinary ; `xhr` permet l'annulation et le suivi
+     * de la progression. Retourne {url, value, token}.
+     */
+    function directUpload(file, profile, xhr, onProgress) {
+        return sha256(file).then(digest => {
+            const form = new FormData();
+            form.append("profile", profile);
+            form.append("sha256", digest);
+            return postJSON(SIGNATURE_URL, form);
+        }).then(signed => {
+            if (signed.reused) {
+                return signed;
+            }
+            if (file.size > signed.max_file_size) {
+                throw new Error(`Fichier trop volumineux. Taille maximale: ${signed.max_file_size / (1024 * 1024)}MB`);
+            }
+
+            const upload = new FormData();
+            Object.entries(signed.fields).forEach(([name, value]) => upload.append(name, value));
+            upload.append("file", file);
+
+            return new Promise((resolve, reject) => {
+                xhr.open("POST", signed.upload_url, true);
+                xhr.responseType = "json";
+                xhr.upload.addEventListener("progress", event => {
+                    if (onProgress && event.lengthComputable) {
+                        onProgress(event.loaded, event.total);
+                    }
+                });
+                xhr.addEventListener("load", () => {
+                    const result = xhr.response || {};
+                    if (xhr.status !== 200) {
+                        reject(new Error((result.error && result.error.message) || "Erreur Cloudinary"));
+                    } else {
+                        resolve(result);
+                    }
+                });
+                xhr.addEventListener("error", () => reject(new Error("Erreur réseau lors de l'upload")));
+                xhr.addEventListener("abort", () => reject());
+                xhr.send(upload);
+            }).then(result => postJSON(CALLBACK_URL, JSON.stringify({token: signed.token, result: result}), true));
+        });
+    }
+
+    /**
+     * Identifiant stable d'un fichier : un nouvel essai reprend l'upload interrompu
+     */
+    function uploadIdFor(file) {
+        const name = file.name.replace(/[^A-Za-z0-9_-]/g, "");
+        return `${file.size}-${file.lastModified}-${name}`.substring(0, 64);
+    }
+
+    function wait(delay) {
+        return new Promise(resolve => window.setTimeout(resolve, delay));
+    }
+
+    /**
+     * Envoie un fichier au serveur par parties (Content-Range), en reprenant à la
+     * position déjà reçue, puis attend l'envoi à Cloudinary fait par une tâche en
+     * arrière-plan. Retourne {url}.
+     */
+    function chunkedUpload(file, state, onProgress) {
+        const url = `${CHUNKED_URL}${uploadIdFor(file)}/`;
+
+        function send(headers, body, retries) {
+            if (state.aborted) {
+                return Promise.reject();
+            }
+            return fetch(url, {
+                method: "POST",
+                credentials: "same-origin",
+                headers: Object.assign({
+                    "X-CSRFToken": getCookie("csrftoken"),
+                    "Content-Type": "application/octet-stream",
+                    "X-File-Name": encodeURIComponent(file.name),
+                }, headers),
+                body: body,
+            }).catch(error => {
+                // Erreur réseau : nouvel essai de la même partie
+                if (retries > 0) {
+                    return wait(1000).then(() => send(headers, body, retries - 1));
+                }
+                throw error;
+            });
+        }
+
+        /**
+         * Reprend selon l'état du serveur : image envoyée, envoi à Cloudinary
+         * en cours, ou parties à envoyer
+         */
+        function resume(status, conflicts) {
+            if (status.uploaded) {
+                return status;
+            }
+            if (status.processing) {
+                return wait(POLL_INTERVAL).then(poll);
+            }
+            return sendFrom(status.offset || 0, conflicts);
+        }
+
+        function poll() {
+            if (state.aborted) {
+                return Promise.reject();
+            }
+            return fetch(url, {credentials: "same-origin"})
+                .then(response => response.json())
+                .then(status => {
+                    if (!status.uploaded && !status.processing && status.offset >= file.size) {
+                        throw new Error("Erreur lors de l'envoi à Cloudinary, réessayez");
+                    }
+                    return resume(status, 0);
+                });
+        }
+
+        function sendFrom(offset, conflicts) {
+            onProgress(offset, file.size);
+            const headers = {};
+            let body = null;
+            if (offset >= file.size) {
+                // Fichier déjà reçu : seul l'envoi à Cloudinary est relancé
+                headers["Content-Range"] = `bytes */${file.size}`;
+            } else {
+                const end = Math.min(offset + PART_SIZE, file.size);
+                headers["Content-Range"] = `bytes ${offset}-${end - 1}/${file.size}`;
+                body = file.slice(offset, end);
+            }
+
+            return send(headers, body, PART_RETRIES).then(response => response.json().then(data => {
+                if (response.status === 409 && data.offset !== undefined) {
+                    // Position inattendue ou partie en cours de réception par une autre
+                    // requête : nouvel essai après un délai croissant
+                    if (conflicts >= CONFLICT_RETRIES) {
+                        throw new Error("Upload occupé par une autre requête, réessayez");
+                    }
+                    return wait(Math.min(500 * 2 ** conflicts, 8000))
+                        .then(() => sendFrom(data.offset, conflicts + 1));
+                }
+                if (response.ok) {
+                    return resume(data, 0);
+                }
+                throw new Error((data.error && data.error.message) || "Erreur lors de l'upload");
+            }));
+        }
+
+        return fetch(url, {credentials: "same-origin"})
+            .then(response => response.json())
+            .then(status => resume(status, 0));
+    }
+
+    // ===============================
+    // CKEDITOR5
+    // ===============================
+
+    class DirectUploadAdapter {
+        constructor(loader) {
+            this.loader = loader;
+            this.xhr = new XMLHttpRequest();
+            this.state = {aborted: false};
+        }
+
+        upload() {
+            const onProgress = (loaded, total) => {
+                this.loader.uploadTotal = total;
+                this.loader.uploaded = loaded;
+            };
+            return this.loader.file.then(file => file.size > LARGE_FILE_SIZE
+                ? chunkedUpload(file, this.state, onProgress)
+                : directUpload(file, CKEDITOR_PROFILE, this.xhr, onProgress)
+            ).then(data => ({default: data.url}));
+        }
+
+        abort() {
+            this.state.aborted = true;
+            this.xhr.abort();
+        }
+    }
+
+    function patchEditors() {
+        (window.editors || []).forEach(editor => {
+            if (editor.directUpload || !editor.plugins.has("FileRepository")) {
+                return;
+            }
+            editor.plugins.get("FileRepository").createUploadAdapter = loader => new DirectUploadAdapter(loader);
+            editor.directUpload = true;
+        });
+    }
+
+    // ===============================
+    // CHAMPS IMAGE DE L'ADMIN
+    // ===============================
+
+    function setStatus(input, message, isError) {
+        let status = input.parentNode.querySelector(".direct-upload-status");
+        if (!status) {
+            status = document.createElement("span");
+            status.className = "direct-upload-status";
+            status.style.marginLeft = "8px";
+            input.insertAdjacentElement("afterend", status);
+        }
+        status.textContent = message;
+        status.style.color = isError ? "#dc3545" : "#28a745";
+    }
+
+    function onFileSelected(event) {
+        const input = event.target;
+        const file = input.files && input.files[0];
+        if (!file) {
+            return;
+        }
+
+        setStatus(input, "Envoi en cours...");
+        directUpload(file, input.dataset.directUpload, new XMLHttpRequest(), (loaded, total) => {
+            setStatus(input, `Envoi en cours... ${Math.round(loaded / total * 100)}%`);
+        }).then(data => {
+            const name = `${input.name}_direct_upload`;
+            let hidden = input.form.querySelector(`input[type=hidden][name="${name}"]`);
+            if (!hidden) {
+                hidden = document.createElement("input");
+                hidden.type = "hidden";
+                hidden.name = name;
+                input.insertAdjacentElement("afterend", hidden);
+            }
+            hidden.value = data.token;
+            // Le fichier n'est plus transmis avec le formulaire
+            input.value = "";
+            setStatus(input, `✓ ${file.name} envoyé`);
+        }).catch(error => {
+            setStatus(input, error ? error.message : "Envoi annulé", true);
+        });
+    }
+
+    document.addEventListener("change", event => {
+        if (event.target.matches("input[type=file][data-direct-upload]")) {
+            onFileSelected(event);
+        }
+    });
+
+    document.addEventListener("DOMContentLoaded", () => {
+        // Les éditeurs sont créés de façon asynchrone, y compris dans les inlines ajoutés
+        patchEditors();
+        window.setInterval(patchEditors, 1000);
+    });
+
+})();
@@ -1,3 +1,82 @@
 from django.contrib import admin
+from django.utils import timezone
+from django.utils.html import format_html
 
-# Register your models here.
+from .models import Job, JobStatus
+
+
+STATUS_COLORS = {
+    JobStatus.PENDING: "#6c757d",
+    JobStatus.RUNNING: "#ffc107",
+    JobStatus.SUCCEEDED: "#28a745",
+    JobStatus.FAILED: "#dc3545",
+}
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = [
+        "id",
+        "name",
+        "status_badge",
+        "attempts_display",
+        "run_at",
+        "locked_by",
+        "updated_at",
+    ]
+    list_filter = ["status", "name"]
+    search_fields = ["name", "idempotency_key", "last_error"]
+    date_hierarchy = "created_at"
+    readonly_fields = [
+        "name",
+        "payload",
+        "idempotency_key",
+        "attempts",
+        "locked_at",
+        "locked_by",
+        "last_error",
+        "created_at",
+        "updated_at",
+        "finished_at",
+    ]
+
+    def status_badge(self, obj):
+        """Affiche le statut avec sa couleur"""
+        return format_html(
+            '<span style="background-color: {}; color: white; padding: 3px 8px; border-radius: 12px; font-size: 11px;">{}</span>',
+            STATUS_COLORS.get(obj.status, "#6c757d"),
+            obj.get_status_display(),
+        )
+
+    status_badge.short_description = "Statut"
+    status_badge.admin_order_field = "status"
+
+    def attempts_display(self, obj):
+        return f"{obj.attempts}/{obj.max_attempts}"
+
+    attempts_display.short_description = "Tentatives"
+
+    # Actions personnalisées
+    def retry_jobs(modeladmin, request, queryset):
+        """Replanifie immédiatement les tâches échouées sélectionnées"""
+        # Une tâche en attente portant la même clé d'idempotence a priorité
+        pending_keys = Job.objects.pending().exclude(idempotency_key=None).values(
+            "idempotency_key"
+        )
+        updated = (
+            queryset.filter(status=JobStatus.FAILED)
+            .exclude(idempotency_key__in=pending_keys)
+            .update(
+                status=JobStatus.PENDING,
+                attempts=0,
+                run_at=timezone.now(),
+                finished_at=None,
+            )
+        )
+        modeladmin.message_user(
+            request, f"{updated} tâche(s) replanifiée(s).", level="success"
+        )
+
+    retry_jobs.short_description = "Relancer les tâches échouées"
+
+    actions = [retry_jobs]
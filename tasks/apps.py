@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
 
 
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tasks'
+    verbose_name = 'File de tâches'
+
+    def ready(self):
+        # Enregistre les tâches déclarées dans les modules <app>/tasks.py
+        autodiscover_modules('tasks')
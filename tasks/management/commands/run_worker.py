@@ -0,0 +1,58 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from tasks.queue import default_worker_id, run_pending
+
+
+class Command(BaseCommand):
+    help = 'Exécute les tâches de la file en base de données'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10,
+            help='Nombre de tâches réclamées à la fois (default: 10)'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Attente en secondes quand la file est vide (default: 2)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Traite les tâches disponibles puis s\'arrête'
+        )
+
+    def handle(self, *args, **options):
+        worker_id = default_worker_id()
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.stdout.write(f'👷 Worker {worker_id} démarré')
+
+        total_succeeded = total_failed = 0
+        while not self.stopping:
+            succeeded, failed = run_pending(worker_id, options['batch_size'])
+            total_succeeded += succeeded
+            total_failed += failed
+            if succeeded or failed:
+                self.stdout.write(f'   ✅ {succeeded} réussie(s)  ❌ {failed} en échec')
+            elif options['once']:
+                break
+            else:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Worker arrêté: {total_succeeded} tâche(s) réussie(s), {total_failed} en échec'
+            )
+        )
+
+    def stop(self, signum, frame):
+        """Termine le lot en cours avant de s'arrêter"""
+        self.stopping = True
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='job',
+            name='tasks_job_active_idempotency_key',
+        ),
+        migrations.AlterField(
+            model_name='job',
+            name='idempotency_key',
+            field=models.CharField(blank=True, help_text='Une seule tâche en attente par clé', max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('idempotency_key',), name='tasks_job_pending_idempotency_key'),
+        ),
+    ]
@@ -1,3 +1,73 @@
 from django.db import models
+from django.db.models import Q
 
-# Create your models here.
+
+class JobStatus(models.TextChoices):
+    """Statuts possibles d'une tâche"""
+
+    PENDING = "pending", "En attente"
+    RUNNING = "running", "En cours"
+    SUCCEEDED = "succeeded", "Terminée"
+    FAILED = "failed", "Échouée"
+
+
+class JobQuerySet(models.QuerySet):
+    """QuerySet des tâches de la file"""
+
+    def pending(self):
+        return self.filter(status=JobStatus.PENDING)
+
+
+class Job(models.Model):
+    """
+    Tâche de la file d'attente en base de données (voir tasks/queue.py).
+
+    Une tâche est réclamée par un worker au moyen d'un UPDATE conditionnel,
+    puis exécutée ; en cas d'erreur elle est replanifiée avec un délai
+    exponentiel jusqu'à `max_attempts` tentatives.
+    """
+
+    name = models.CharField(max_length=200, help_text="Nom de la tâche enregistrée")
+    payload = models.JSONField(default=dict, blank=True)
+    idempotency_key = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        help_text="Une seule tâche en attente par clé",
+    )
+
+    status = models.CharField(
+        max_length=20, choices=JobStatus.choices, default=JobStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(help_text="Exécution au plus tôt")
+    locked_at = models.DateTimeField(blank=True, null=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Tâche"
+        verbose_name_plural = "Tâches"
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["idempotency_key"],
+                # Une tâche en cours a pu lire ses données avant une nouvelle
+                # demande : seule une tâche en attente la couvre encore
+                condition=Q(status=JobStatus.PENDING),
+                name="tasks_job_pending_idempotency_key",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="tasks_job_claim_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
@@ -0,0 +1,213 @@
+"""
+File de tâches en base de données.
+
+Les fonctions décorées par @task sont enregistrées sous un nom ; enqueue()
+crée une ligne Job que le worker (commande run_worker) réclame puis exécute.
+
+- Réclamation : UPDATE conditionnel sur le statut, sûr entre plusieurs workers
+- Reprise : une tâche "running" dont le verrou a expiré (TASKS_LOCK_TIMEOUT)
+  est de nouveau réclamable
+- Nouvelles tentatives : délai exponentiel (TASKS_RETRY_BASE_DELAY,
+  TASKS_RETRY_MAX_DELAY) jusqu'à `max_attempts`
+- Idempotence : une seule tâche en attente par clé ; une tâche déjà en cours
+  ne couvre pas une nouvelle demande, qui crée une nouvelle tâche
+- TASKS_EAGER : exécute la tâche dès la validation de la transaction, sans
+  worker (développement, tests)
+"""
+
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name, max_attempts=5):
+    """Enregistre une fonction comme tâche exécutable par le worker"""
+
+    def decorator(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        _registry[name] = func
+        return func
+
+    return decorator
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(name, payload=None, idempotency_key=None, run_at=None, max_attempts=None):
+    """
+    Ajoute une tâche à la file et la retourne. Si une tâche en attente possède
+    déjà `idempotency_key`, c'est elle qui est retournée.
+    """
+    if idempotency_key:
+        existing = Job.objects.pending().filter(idempotency_key=idempotency_key).first()
+        if existing:
+            return existing
+
+    func = get_task(name)
+    if max_attempts is None:
+        max_attempts = func.max_attempts if func else 5
+
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(
+                name=name,
+                payload=payload or {},
+                idempotency_key=idempotency_key or None,
+                run_at=run_at or timezone.now(),
+                max_attempts=max_attempts,
+            )
+    except IntegrityError:
+        # Course avec un autre processus sur la même clé
+        return Job.objects.pending().get(idempotency_key=idempotency_key)
+
+    if _setting("TASKS_EAGER", False):
+        transaction.on_commit(lambda: run_job_now(job.pk))
+    return job
+
+
+def _lock_expiry(now):
+    return now - timedelta(seconds=_setting("TASKS_LOCK_TIMEOUT", 10 * 60))
+
+
+def _claimable(now):
+    return Q(status=JobStatus.PENDING, run_at__lte=now) | Q(
+        status=JobStatus.RUNNING, locked_at__lt=_lock_expiry(now)
+    )
+
+
+def is_running(idempotency_key):
+    """Indique si une tâche portant cette clé est en cours (verrou non expiré)"""
+    return Job.objects.filter(
+        idempotency_key=idempotency_key,
+        status=JobStatus.RUNNING,
+        locked_at__gte=_lock_expiry(timezone.now()),
+    ).exists()
+
+
+def _claim_one(pk, worker_id, now):
+    """Fait passer une tâche à "running" ; un seul worker peut y parvenir"""
+    return Job.objects.filter(_claimable(now), pk=pk).update(
+        status=JobStatus.RUNNING,
+        locked_at=now,
+        locked_by=worker_id,
+        attempts=F("attempts") + 1,
+        updated_at=now,
+    )
+
+
+def claim(worker_id, limit=10):
+    """Réclame jusqu'à `limit` tâches exécutables pour `worker_id`"""
+    now = timezone.now()
+    candidates = list(
+        Job.objects.filter(_claimable(now))
+        .order_by("run_at", "pk")
+        .values_list("pk", flat=True)[:limit]
+    )
+
+    claimed = [pk for pk in candidates if _claim_one(pk, worker_id, now)]
+    return list(Job.objects.filter(pk__in=claimed).order_by("run_at", "pk"))
+
+
+def retry_delay(attempts):
+    """Délai avant la tentative suivante (exponentiel, plafonné)"""
+    base = _setting("TASKS_RETRY_BASE_DELAY", 30)
+    return min(base * 2 ** max(attempts - 1, 0), _setting("TASKS_RETRY_MAX_DELAY", 60 * 60))
+
+
+def execute(job):
+    """Exécute une tâche réclamée et enregistre son résultat ; retourne True si réussie"""
+    now = timezone.now()
+    owned = Job.objects.filter(pk=job.pk, status=JobStatus.RUNNING, locked_by=job.locked_by)
+
+    func = get_task(job.name)
+    try:
+        if func is None:
+            raise LookupError(f"Tâche inconnue: {job.name}")
+        func(**job.payload)
+    except Exception as e:
+        error = traceback.format_exc()
+        if func is not None and job.attempts < job.max_attempts:
+            delay = retry_delay(job.attempts)
+            try:
+                with transaction.atomic():
+                    owned.update(
+                        status=JobStatus.PENDING,
+                        run_at=now + timedelta(seconds=delay),
+                        locked_at=None,
+                        locked_by="",
+                        last_error=error,
+                        updated_at=now,
+                    )
+            except IntegrityError:
+                # Une tâche en attente porte déjà la même clé : elle reprendra le travail
+                owned.update(
+                    status=JobStatus.FAILED,
+                    locked_at=None,
+                    last_error=error,
+                    finished_at=now,
+                    updated_at=now,
+                )
+                logger.warning(f"Tâche {job} en échec, remplacée par une tâche en attente: {e}")
+            else:
+                logger.warning(f"Tâche {job} en échec, nouvelle tentative dans {delay}s: {e}")
+        else:
+            owned.update(
+                status=JobStatus.FAILED,
+                locked_at=None,
+                last_error=error,
+                finished_at=now,
+                updated_at=now,
+            )
+            logger.error(f"Tâche {job} abandonnée après {job.attempts} tentatives: {e}")
+        return False
+
+    owned.update(
+        status=JobStatus.SUCCEEDED,
+        locked_at=None,
+        last_error="",
+        finished_at=now,
+        updated_at=now,
+    )
+    return True
+
+
+def run_pending(worker_id=None, limit=10):
+    """Réclame et exécute un lot de tâches ; retourne (réussies, échouées)"""
+    succeeded = failed = 0
+    for job in claim(worker_id or default_worker_id(), limit):
+        if execute(job):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+def run_job_now(pk, worker_id="eager"):
+    """Réclame et exécute immédiatement une tâche précise (mode TASKS_EAGER)"""
+    if _claim_one(pk, worker_id, timezone.now()):
+        return execute(Job.objects.get(pk=pk))
+    return False
@@ -1,3 +1,137 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import queue
+from .models import Job, JobStatus
+
+calls = []
+
+
+@queue.task("tests.record")
+def record(value):
+    calls.append(value)
+
+
+@queue.task("tests.fail", max_attempts=2)
+def fail():
+    raise RuntimeError("boom")
+
+
+class JobQueueTest(TestCase):
+    """Test suite for the database-backed job queue."""
+
+    def setUp(self):
+        """Set up test data."""
+        calls.clear()
+
+    def test_enqueue_is_idempotent_while_pending(self):
+        """Test a pending job is reused for the same idempotency key."""
+        first = queue.enqueue("tests.record", {"value": 1}, idempotency_key="key")
+        second = queue.enqueue("tests.record", {"value": 2}, idempotency_key="key")
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+        queue.run_pending()
+        third = queue.enqueue("tests.record", {"value": 3}, idempotency_key="key")
+        self.assertNotEqual(third.pk, first.pk)
+
+    def test_running_job_does_not_absorb_new_requests(self):
+        """Test enqueueing while the same key is running schedules a new job."""
+        first = queue.enqueue("tests.record", {"value": 1}, idempotency_key="key")
+        queue.claim("worker-a")
+
+        second = queue.enqueue("tests.record", {"value": 2}, idempotency_key="key")
+
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(second.status, JobStatus.PENDING)
+
+    def test_failed_running_job_yields_to_pending_duplicate(self):
+        """Test a retry is dropped when a pending job already holds the key."""
+        first = queue.enqueue("tests.fail", idempotency_key="key")
+        [claimed] = queue.claim("worker-a")
+        second = queue.enqueue("tests.fail", idempotency_key="key")
+
+        self.assertFalse(queue.execute(claimed))
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, JobStatus.FAILED)
+        self.assertEqual(Job.objects.pending().get().pk, second.pk)
+
+    def test_claimed_job_cannot_be_claimed_twice(self):
+        """Test a job is claimed by a single worker."""
+        queue.enqueue("tests.record", {"value": 1})
+
+        self.assertEqual(len(queue.claim("worker-a")), 1)
+        self.assertEqual(queue.claim("worker-b"), [])
+
+    def test_expired_lock_is_reclaimed(self):
+        """Test a running job whose lock expired is claimable again."""
+        job = queue.enqueue("tests.record", {"value": 1})
+        queue.claim("worker-a")
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        claimed = queue.claim("worker-b")
+
+        self.assertEqual([j.pk for j in claimed], [job.pk])
+        self.assertEqual(claimed[0].attempts, 2)
+
+    def test_run_pending_executes_job(self):
+        """Test a pending job is executed and marked as succeeded."""
+        job = queue.enqueue("tests.record", {"value": 42})
+
+        self.assertEqual(queue.run_pending(), (1, 0))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(calls, [42])
+
+    @override_settings(TASKS_RETRY_BASE_DELAY=30)
+    def test_failure_is_retried_with_backoff_then_failed(self):
+        """Test a failing job is rescheduled, then abandoned after max_attempts."""
+        job = queue.enqueue("tests.fail")
+
+        self.assertEqual(queue.run_pending(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.PENDING)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=25))
+        self.assertIn("boom", job.last_error)
+
+        # Pas encore exécutable
+        self.assertEqual(queue.run_pending(), (0, 0))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        queue.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    @override_settings(TASKS_RETRY_BASE_DELAY=30, TASKS_RETRY_MAX_DELAY=100)
+    def test_retry_delay_is_exponential_and_capped(self):
+        """Test the retry delay doubles per attempt up to the maximum."""
+        self.assertEqual(
+            [queue.retry_delay(n) for n in (1, 2, 3, 4)], [30, 60, 100, 100]
+        )
+
+    def test_unknown_task_fails_immediately(self):
+        """Test a job without a registered task is not retried."""
+        job = queue.enqueue("tests.unknown")
+
+        queue.run_pending()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.FAILED)
+        self.assertEqual(job.attempts, 1)
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode_runs_on_commit(self):
+        """Test eager mode runs the job once the transaction commits."""
+        with self.captureOnCommitCallbacks(execute=True):
+            job = queue.enqueue("tests.record", {"value": 7})
+            self.assertEqual(calls, [])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.SUCCEEDED)
+        self.assertEqual(calls, [7])